@@ -1,9 +1,11 @@
 import streamlit as st
-import pandas as pd
 
-# Import pages
-from pages import home, energetico, predicciones, predicciones_pv, train_pv, weather
-from utils import load_data, apply_custom_css
+# Las páginas se importan al visitarlas por primera vez
+from page_loader import import_time_report, load_page
+from schema import memory_report
+from data_store import get_store
+from profiler import finish_run, render_profile, section, start_run
+from utils import apply_custom_css
 
 # Configuración de página
 st.set_page_config(
@@ -16,38 +18,65 @@ st.set_page_config(
 # Aplicar CSS personalizado
 apply_custom_css()
 
-# Cargar datos
-data = load_data()
-data['Datetime'] = pd.to_datetime(data['Datetime'])
+# Gestión de páginas
+page = st.session_state.setdefault("page", "Inicio")
 
-# Calcular métricas globales
-temp_min = data['temperature'].min()
-temp_max = data['temperature'].max()
+# Perfil de tiempos por sección del rerun (?profile=1)
+start_run(page)
 
-prec_min = data['precipitation'].loc[data['precipitation'] != 0].min()
-prec_max = data['precipitation'].max()
+# Enrutamiento de páginas
+with section("importación de la página", 'datos'):
+    page_module = load_page(page)
 
-wind_min = data['WindSpeed'].loc[data['WindSpeed'] != 0].min()
-wind_max = data['WindSpeed'].max()
+if page in ("Energético", "Weather", "Predicciones"):
+    # Cargar datos (almacén de solo lectura compartido entre sesiones)
+    with section("almacén de datos", 'datos'):
+        store = get_store()
 
-radiation_min = data['radiation'].loc[data['radiation'] != 0].min()
-radiation_max = data['radiation'].max()
+with section(page):
+    if page == "Energético":
+        page_module.render(store)
+    elif page == "Predicciones":
+        page_module.render(store.frame)
+    elif page == "Weather":
+        # Métricas globales leídas del perfil del dataset (calculado una vez por versión)
+        profile = store.profile
+        page_module.render(
+            store,
+            profile.min('temperature'), profile.max('temperature'),
+            profile.min('precipitation', nonzero=True), profile.max('precipitation'),
+            profile.min('WindSpeed', nonzero=True), profile.max('WindSpeed'),
+            profile.min('radiation', nonzero=True), profile.max('radiation')
+        )
+    else:
+        page_module.render()
 
-YEARS = data['Datetime'].dt.year.unique()
+if finish_run() is not None:
+    with st.expander("⏱️ Perfil de renderizado", expanded=True):
+        render_profile()
 
-# Gestión de páginas
-page = st.session_state.setdefault("page", "Inicio")
+# Memoria de los DataFrames del dataset (?memory_report=1)
+if st.query_params.get("memory_report") and page in ("Energético", "Weather", "Predicciones"):
+    from utils import compute_pv_data, compute_scatter_data, compute_weekly_consumption, compute_weekly_weather
 
-# Enrutamiento de páginas
-if page == "Inicio":
-    home.render()
-elif page == "Energético":
-    energetico.render(data)
-elif page == "Predicciones":
-    predicciones.render(data)
-elif page == "Entrenar PV":
-    train_pv.render()
-elif page == "Predicciones PV":
-    predicciones_pv.render()
-elif page == "Weather":
-    weather.render(data, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, radiation_min, radiation_max)
+    data, version = store.snapshot()
+    with st.expander("💾 Memoria por DataFrame"):
+        st.dataframe(memory_report({
+            'Dataset (almacén)': data,
+            'Scatter de correlación': compute_scatter_data(data, version),
+            'Scatter PV': compute_pv_data(data, version),
+            'Consumo semanal': compute_weekly_consumption(data, version),
+            'Meteorología semanal': compute_weekly_weather(data, version),
+        }), hide_index=True)
+
+# Diagnóstico de cachés: tamaños, aciertos, límites y vaciado (?cache_report=1)
+if st.query_params.get("cache_report"):
+    from cache_panel import render_cache_panel
+
+    with st.expander("🗄️ Cachés", expanded=True):
+        render_cache_panel()
+
+# Informe de tiempos de importación (?import_report=1)
+if st.query_params.get("import_report"):
+    with st.expander("⏱️ Tiempos de importación de páginas"):
+        st.table(import_time_report())
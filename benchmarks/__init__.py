@@ -0,0 +1,2 @@
+# Benchmarks de los procesadores de datos del dashboard
+# Uso: python -m benchmarks.processors (ver benchmarks/processors.py)
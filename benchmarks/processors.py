@@ -0,0 +1,217 @@
+"""Benchmarks de los procesadores de datos con 1, 5 y 20 años de datos sintéticos
+
+Uso:
+    python -m benchmarks.processors [--years 1 5 20] [--repeat 5] [--out benchmarks/results/local.json]
+    python -m benchmarks.processors --compare base.json [nuevo.json] [--threshold 0.25]
+
+Mide el tiempo (mediana y mínimo de `repeat` ejecuciones tras una de
+calentamiento) y el pico de memoria (tracemalloc, en una ejecución aparte) de:
+los compute_* de utils, los Sankey, el almacén (hash de versión, perfil e
+índice de sumas acumuladas) y las agregaciones de las páginas. Las funciones
+cacheadas se llaman sin caché (la función original) para medir el cálculo.
+
+Con --compare se comparan los resultados con una ejecución anterior (la
+ejecución actual o un segundo JSON) y el proceso termina con código 1 si algún
+caso es más lento o usa más memoria de la permitida por los umbrales.
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import utils
+from cleaning import clean_readings
+from data_store import INDEXED_COLUMNS, DatasetProfile, DatasetStore, PrefixSumIndex
+from profiler import BUILD_ID
+from schema import DATASET_SCHEMA, apply_schema
+from synthetic_data import generate_dataset
+
+
+DEFAULT_YEARS = (1, 5, 20)
+DEFAULT_REPEAT = 5
+DEFAULT_RESULTS_DIR = "benchmarks/results"
+
+# Umbrales de regresión del modo comparación: fracción de aumento permitida y
+# diferencia mínima en términos absolutos (por debajo es ruido de medida)
+TIME_THRESHOLD = 0.25
+MIN_SECONDS = 0.002
+MEMORY_THRESHOLD = 0.25
+MIN_MEGABYTES = 1.0
+
+
+def benchmark_frame(years: int, seed: int = 0):
+    """Dataset sintético de un edificio, limpio y tipado como lo carga get_store"""
+    inverter, _ = generate_dataset(buildings=1, years=years, seed=seed)[0]
+    return apply_schema(clean_readings(inverter), DATASET_SCHEMA, compact=True)
+
+
+def _raw(function):
+    # Función original, sin st.cache_data ni caché en disco
+    return inspect.unwrap(function)
+
+
+def benchmark_cases(store: DatasetStore):
+    """Casos {nombre: función sin argumentos} sobre el almacén dado"""
+    from pages.weather import _daily_weather_frames
+
+    df, version = store.snapshot()
+    timestamps = df['Datetime']
+    day = timestamps.iloc[len(df) // 2].date()
+    window_start = pd.Timestamp(day)
+    window_end = window_start + pd.Timedelta(days=30)
+    columns = {name: store.column(name) for name in store.columns}
+    indexed = {name: columns[name] for name in INDEXED_COLUMNS if name in columns}
+    prefix_sums = store.prefix_sums
+    totals = prefix_sums.totals()
+    scatter = _raw(utils.compute_scatter_data)(df, version)
+    weather_columns = ('temperature', 'precipitation', 'radiation')
+
+    return {
+        # Procesadores de utils
+        'utils.compute_weekly_sources': lambda: _raw(utils.compute_weekly_sources)(df, version),
+        'utils.compute_daily_stack': lambda: _raw(utils.compute_daily_stack)(df, version, day),
+        'utils.compute_stack_full': lambda: _raw(utils.compute_stack_full)(df),
+        'utils.compute_weekly_consumption': lambda: _raw(utils.compute_weekly_consumption)(df, version),
+        'utils.compute_daily_consumption': lambda: _raw(utils.compute_daily_consumption)(df, version, day),
+        'utils.compute_consumption_full': lambda: _raw(utils.compute_consumption_full)(df),
+        'utils.compute_weekly_weather': lambda: _raw(utils.compute_weekly_weather)(df, version),
+        'utils.compute_daily_means': lambda: _raw(utils.compute_daily_means)(df, version, weather_columns),
+        'utils.compute_downsampled': lambda: _raw(utils.compute_downsampled)(
+            df, version, weather_columns, window_start, window_end),
+        'utils.compute_scatter_data': lambda: _raw(utils.compute_scatter_data)(df, version),
+        'utils.compute_pv_data': lambda: _raw(utils.compute_pv_data)(df, version),
+        'utils.compute_scatter_bins': lambda: _raw(utils.compute_scatter_bins)(
+            scatter, version, 'consumo', None, 'Temperatura (°C)', 'Consumo Total (W)'),
+        # Sankey (totales del periodo completo)
+        'utils.create_sankey_diagram': lambda: _raw(utils.create_sankey_diagram)(totals),
+        'utils.create_sankey_diagram_heating_system': lambda: _raw(utils.create_sankey_diagram_heating_system)(totals),
+        # Almacén: versión, perfil de las métricas de Weather e índice de los Sankey
+        'data_store.DatasetStore': lambda: DatasetStore(df),
+        'data_store.DatasetProfile': lambda: DatasetProfile(columns, timestamps),
+        'data_store.PrefixSumIndex': lambda: PrefixSumIndex(timestamps, indexed, tz=timestamps.dt.tz),
+        # Agregaciones de las páginas
+        'energetico.totales_rango': lambda: (prefix_sums.totals(window_start, window_end),
+                                             prefix_sums.means(window_start, window_end)),
+        'weather._daily_weather_frames': lambda: _daily_weather_frames(df, version, day, _raw(utils.compute_daily_weather)),
+    }
+
+
+def measure(function, repeat: int = DEFAULT_REPEAT):
+    """Mediana y mínimo del tiempo (s) y pico de memoria (MB) de una función"""
+    function()
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds_median': statistics.median(seconds),
+        'seconds_min': min(seconds),
+        'peak_mb': round(peak / 1024 ** 2, 3),
+    }
+
+
+def run_suite(years=DEFAULT_YEARS, repeat: int = DEFAULT_REPEAT, cases=None, seed: int = 0):
+    """Ejecuta los casos para cada tamaño de datos; devuelve el documento de resultados"""
+    results = []
+    for size in years:
+        store = DatasetStore(benchmark_frame(size, seed))
+        selected = benchmark_cases(store)
+        if cases:
+            selected = {name: function for name, function in selected.items()
+                        if any(pattern in name for pattern in cases)}
+        for name, function in selected.items():
+            result = {'case': name, 'years': size, 'rows': len(store), **measure(function, repeat)}
+            results.append(result)
+            print(f"{name:<45} {size:>3} años  {result['seconds_median'] * 1000:>10.2f} ms  {result['peak_mb']:>9.2f} MB")
+    return {
+        'meta': {
+            'build': BUILD_ID,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'backend': utils.DATA_BACKEND,
+            'repeat': repeat,
+            'seed': seed,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+
+
+def compare(base: dict, current: dict, time_threshold: float = TIME_THRESHOLD, memory_threshold: float = MEMORY_THRESHOLD,
+            min_seconds: float = MIN_SECONDS, min_megabytes: float = MIN_MEGABYTES):
+    """Filas de comparación por (caso, años) presentes en ambos; la última columna indica regresión"""
+    baseline = {(row['case'], row['years']): row for row in base['results']}
+    rows = []
+    for row in current['results']:
+        previous = baseline.get((row['case'], row['years']))
+        if previous is None:
+            continue
+        time_ratio = row['seconds_median'] / previous['seconds_median'] if previous['seconds_median'] else float('inf')
+        memory_ratio = row['peak_mb'] / previous['peak_mb'] if previous['peak_mb'] else float('inf')
+        slower = (time_ratio > 1 + time_threshold
+                  and row['seconds_median'] - previous['seconds_median'] > min_seconds)
+        larger = (memory_ratio > 1 + memory_threshold
+                  and row['peak_mb'] - previous['peak_mb'] > min_megabytes)
+        rows.append((row['case'], row['years'], time_ratio, memory_ratio, slower or larger))
+    return rows
+
+
+def _load(path: str):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de los procesadores de datos del dashboard")
+    parser.add_argument('--years', type=int, nargs='+', default=list(DEFAULT_YEARS), help="Años de datos sintéticos")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Ejecuciones medidas por caso")
+    parser.add_argument('--cases', nargs='+', help="Solo los casos cuyo nombre contenga alguno de estos textos")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla de los datos sintéticos")
+    parser.add_argument('--out', help=f"JSON de resultados (por defecto {DEFAULT_RESULTS_DIR}/<BUILD_ID>.json)")
+    parser.add_argument('--compare', nargs='+', metavar='JSON',
+                        help="Base con la que comparar; con dos ficheros no se ejecuta la suite")
+    parser.add_argument('--threshold', type=float, default=TIME_THRESHOLD, help="Aumento de tiempo permitido (0.25 = 25 %%)")
+    parser.add_argument('--memory-threshold', type=float, default=MEMORY_THRESHOLD, help="Aumento de memoria permitido")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        current = _load(args.compare[1])
+    else:
+        current = run_suite(args.years, args.repeat, args.cases, args.seed)
+        out = args.out or os.path.join(DEFAULT_RESULTS_DIR, f"{BUILD_ID}.json")
+        os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"Resultados en {out}")
+
+    if not args.compare:
+        return
+    rows = compare(_load(args.compare[0]), current, args.threshold, args.memory_threshold)
+    regressions = 0
+    for case, years, time_ratio, memory_ratio, regressed in rows:
+        regressions += regressed
+        print(f"{'REGRESIÓN' if regressed else 'OK       '} {case:<45} {years:>3} años  "
+              f"tiempo ×{time_ratio:.2f}  memoria ×{memory_ratio:.2f}")
+    print(f"{regressions} regresiones en {len(rows)} casos comparados")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
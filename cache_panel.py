@@ -0,0 +1,198 @@
+"""Panel de diagnóstico de las cachés (?cache_report=1)
+
+Muestra por caché las entradas, la memoria, los aciertos y el tiempo de
+cálculo. Vaciar las cachés y cambiar sus límites afecta a todas las sesiones
+(y la caché en disco a todas las réplicas): esos controles solo aparecen tras
+introducir el token de CACHE_ADMIN_TOKEN. Sin la variable el panel es de solo
+lectura.
+
+Solo los límites de las cachés LRU y de la caché en disco se cambian desde el
+panel. Los de st.cache_data se fijan al decorar la función (las vistas diarias
+con DAILY_CACHE_MAX_ENTRIES) y solo cambian al reiniciar: se muestran como
+información.
+"""
+import hmac
+import os
+
+import pandas as pd
+import streamlit as st
+
+from cache_stats import CACHE_COUNTERS, streamlit_cache_sizes
+
+
+CACHE_ADMIN_TOKEN = os.environ.get('CACHE_ADMIN_TOKEN')
+
+
+def _lru_caches():
+    """Cachés LRU del proceso por nombre"""
+    from chart_cache import get_chart_cache, get_prefetch_cache
+    from paged_table import get_order_cache
+    from uploads import get_upload_cache
+
+    return {
+        'Specs de gráficos': get_chart_cache(),
+        'Precálculo de días vecinos': get_prefetch_cache(),
+        'Subidas y predicciones': get_upload_cache(),
+        'Órdenes de tablas paginadas': get_order_cache(),
+    }
+
+
+def _hit_rate(hits: int, calls: int):
+    return round(hits / calls * 100, 1) if calls else None
+
+
+def _megabytes(size):
+    return None if size is None else round(size / 1024 ** 2, 2)
+
+
+def cache_report():
+    """Una fila por caché: entradas, memoria, límites, aciertos y tiempo de cálculo
+
+    La columna Límites indica si se pueden cambiar desde el panel o se fijan al arrancar.
+    """
+    from disk_cache import get_disk_cache
+
+    rows = []
+    sizes = streamlit_cache_sizes()
+    for name, counters in CACHE_COUNTERS.items():
+        entries, size = sizes.get(name, (0, 0))
+        rows.append({
+            'Caché': name,
+            'Tipo': 'st.cache_data',
+            'Entradas': entries,
+            'Límite entradas': counters.max_entries,
+            'Memoria (MB)': _megabytes(size),
+            'Límite (MB)': None,
+            'Límites': 'Al arrancar',
+            'Llamadas': counters.calls,
+            'Aciertos (%)': _hit_rate(counters.hits, counters.calls),
+            'Cálculos': counters.computes,
+            'Cálculo medio (ms)': round(counters.compute_seconds / counters.computes * 1000, 1) if counters.computes else None,
+            'Desalojos': None,
+        })
+    for name, cache in _lru_caches().items():
+        stats = cache.stats()
+        calls = stats['hits'] + stats['misses']
+        rows.append({
+            'Caché': name,
+            'Tipo': 'LRU',
+            'Entradas': stats['entries'],
+            'Límite entradas': stats['max_entries'],
+            'Memoria (MB)': _megabytes(stats['bytes']),
+            'Límite (MB)': _megabytes(stats['max_bytes']),
+            'Límites': 'Panel',
+            'Llamadas': calls,
+            'Aciertos (%)': _hit_rate(stats['hits'], calls),
+            'Cálculos': stats['misses'],
+            'Cálculo medio (ms)': None,
+            'Desalojos': stats['evictions'],
+        })
+    disk = get_disk_cache()
+    if disk is not None:
+        stats = disk.stats()
+        calls = stats['hits'] + stats['misses']
+        rows.append({
+            'Caché': f"Disco ({disk.path})",
+            'Tipo': 'SQLite',
+            'Entradas': stats['entries'],
+            'Límite entradas': None,
+            'Memoria (MB)': _megabytes(stats['bytes']),
+            'Límite (MB)': _megabytes(stats['max_bytes']),
+            'Límites': 'Panel',
+            'Llamadas': calls,
+            'Aciertos (%)': _hit_rate(stats['hits'], calls),
+            'Cálculos': stats['misses'],
+            'Cálculo medio (ms)': None,
+            'Desalojos': stats['evictions'],
+        })
+    return pd.DataFrame(rows).astype({'Límite entradas': 'Int64'})
+
+
+def _is_admin():
+    """Si se ha introducido el token de administración de las cachés"""
+    if not CACHE_ADMIN_TOKEN:
+        st.caption("Solo lectura: define CACHE_ADMIN_TOKEN para poder vaciar las cachés o cambiar sus límites.")
+        return False
+    token = st.text_input("Token de administración", type='password', key="cache_panel_token")
+    if not token:
+        return False
+    if not hmac.compare_digest(token.encode(), CACHE_ADMIN_TOKEN.encode()):
+        st.error("Token incorrecto.")
+        return False
+    return True
+
+
+def render_cache_panel():
+    """Tabla de cachés y, con el token de administración, controles para vaciarlas o acotarlas"""
+    from prefetch import get_prefetcher
+
+    st.dataframe(cache_report(), hide_index=True)
+    prefetch = get_prefetcher().stats()
+    st.caption(
+        f"Precálculo en segundo plano: {prefetch['completed']} completados, "
+        f"{prefetch['pending']} en cola, {prefetch['failed']} con error. "
+        "Los límites de st.cache_data se fijan al arrancar (las vistas diarias con DAILY_CACHE_MAX_ENTRIES): "
+        "el panel solo cambia los de las cachés LRU y la caché en disco."
+    )
+    if _is_admin():
+        _render_controls()
+
+
+def _render_controls():
+    """Vaciado de cachés, límites y reinicio de contadores"""
+    from disk_cache import get_disk_cache
+
+    lru_caches = _lru_caches()
+    disk = get_disk_cache()
+    names = [*CACHE_COUNTERS, *lru_caches, *(['Disco'] if disk is not None else [])]
+
+    col_select, col_entries, col_bytes = st.columns([2, 1, 1])
+    with col_select:
+        selected = st.selectbox("Caché", names, key="cache_panel_selected")
+
+    if selected in lru_caches:
+        cache = lru_caches[selected]
+        with col_entries:
+            max_entries = st.number_input("Máx. entradas", min_value=1, value=int(cache.max_entries), step=1,
+                                          key=f"cache_panel_entries_{selected}")
+        with col_bytes:
+            max_mb = st.number_input("Máx. MB (0 = sin límite)", min_value=0, value=int((cache.max_bytes or 0) / 1024 ** 2),
+                                     step=16, key=f"cache_panel_mb_{selected}")
+        if st.button("Aplicar límites", key="cache_panel_apply"):
+            cache.resize(int(max_entries), int(max_mb) * 1024 ** 2 or None)
+            st.rerun()
+    elif selected in CACHE_COUNTERS:
+        max_entries = CACHE_COUNTERS[selected].max_entries
+        with col_entries:
+            st.caption(f"Máx. entradas: {max_entries if max_entries is not None else 'sin límite'} "
+                       "(solo lectura; cambia al reiniciar)")
+    elif selected == 'Disco':
+        with col_bytes:
+            max_mb = st.number_input("Máx. MB", min_value=1, value=int(disk.max_bytes / 1024 ** 2), step=64,
+                                     key="cache_panel_mb_disk")
+        if st.button("Aplicar límites", key="cache_panel_apply"):
+            disk.resize(int(max_mb) * 1024 ** 2)
+            st.rerun()
+
+    col_clear, col_clear_all, col_reset = st.columns(3)
+    with col_clear:
+        if st.button(f"Vaciar «{selected}»", key="cache_panel_clear"):
+            if selected in CACHE_COUNTERS:
+                CACHE_COUNTERS[selected].clear()
+            elif selected in lru_caches:
+                lru_caches[selected].clear()
+            else:
+                disk.clear()
+            st.rerun()
+    with col_clear_all:
+        if st.button("Vaciar todas las cachés en memoria", key="cache_panel_clear_all"):
+            for counters in CACHE_COUNTERS.values():
+                counters.clear()
+            for cache in lru_caches.values():
+                cache.clear()
+            st.rerun()
+    with col_reset:
+        if st.button("Reiniciar contadores", key="cache_panel_reset"):
+            for counters in CACHE_COUNTERS.values():
+                counters.reset()
+            st.rerun()
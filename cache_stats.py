@@ -0,0 +1,103 @@
+"""Contadores de las cachés st.cache_data del dashboard
+
+tracked_cache_data sustituye a @st.cache_data y registra por función las
+llamadas, los cálculos (fallos de caché) y su tiempo. Con las entradas y bytes
+que guarda Streamlit se obtiene el informe del panel de cachés (cache_panel.py).
+"""
+import functools
+import threading
+import time
+
+import streamlit as st
+
+from profiler import section
+
+
+class CacheCounters:
+    """Llamadas y cálculos de una función cacheada"""
+
+    def __init__(self, name: str, module: str, max_entries=None):
+        self.name = name
+        self.module = module
+        self.max_entries = max_entries
+        self.calls = 0
+        self.computes = 0
+        self.compute_seconds = 0.0
+        self.clear = None
+        self._lock = threading.Lock()
+
+    def record_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def record_compute(self, seconds: float):
+        with self._lock:
+            self.computes += 1
+            self.compute_seconds += seconds
+
+    @property
+    def hits(self):
+        return max(self.calls - self.computes, 0)
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.computes = 0
+            self.compute_seconds = 0.0
+
+
+# Contadores por nombre de función (el mismo con el que Streamlit publica sus bytes)
+CACHE_COUNTERS = {}
+
+
+def tracked_cache_data(function=None, **cache_kwargs):
+    """@st.cache_data que además cuenta llamadas, cálculos y tiempo de cálculo
+
+    Con el perfil de renderizado activo cada llamada es una sección 'agregación'.
+    `__wrapped__` sigue apuntando a la función original sin caché.
+    """
+    def decorator(function):
+        counters = CacheCounters(function.__name__, function.__module__, cache_kwargs.get('max_entries'))
+        CACHE_COUNTERS[counters.name] = counters
+
+        @functools.wraps(function)
+        def compute(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                counters.record_compute(time.perf_counter() - start)
+
+        cached = st.cache_data(**cache_kwargs)(compute)
+
+        @functools.wraps(function)
+        def call(*args, **kwargs):
+            counters.record_call()
+            with section(counters.name, 'agregación'):
+                return cached(*args, **kwargs)
+
+        call.__wrapped__ = function
+        call.clear = cached.clear
+        counters.clear = cached.clear
+        return call
+
+    return decorator if function is None else decorator(function)
+
+
+def streamlit_cache_sizes():
+    """Entradas y bytes en memoria de cada función st.cache_data: {función: (entradas, bytes)}"""
+    from streamlit.runtime.caching import cache_data_api
+
+    sizes = {}
+    # Streamlit solo publica los bytes agrupados por función; las entradas se
+    # cuentan recorriendo las cachés de cada función
+    caches = getattr(cache_data_api._data_caches, '_function_caches', {})
+    for function_caches in list(caches.values()):
+        for cache in list(function_caches.values()):
+            for family in cache.get_stats().values():
+                for stat in family:
+                    # cache_name es 'módulo.función'
+                    name = stat.cache_name.rsplit('.', 1)[-1]
+                    entries, size = sizes.get(name, (0, 0))
+                    sizes[name] = (entries + 1, size + stat.byte_length)
+    return sizes
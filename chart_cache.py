@@ -0,0 +1,171 @@
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+import altair as alt
+import streamlit as st
+
+from profiler import record_payload, section
+
+
+CHART_CACHE_MAX_ENTRIES = 256
+CHART_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+# Presupuesto de las specs precalculadas en segundo plano (ver prefetch.py)
+PREFETCH_CACHE_MAX_ENTRIES = 128
+PREFETCH_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+class LRUCache:
+    """Caché LRU acotada por número de entradas y por tamaño en bytes"""
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value, size: int = 0):
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            self._evict()
+
+    def pop(self, key, default=None):
+        """Saca una entrada de la caché (sin contar acierto ni fallo)"""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value, size = self._entries.pop(key)
+            self.total_bytes -= size
+            return value
+
+    def _evict(self):
+        # Siempre se conserva la entrada más reciente aunque supere el límite
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def resize(self, max_entries: int, max_bytes: int = None):
+        """Cambia los límites y desaloja lo que sobre"""
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def size_of(self, key, default=0):
+        """Tamaño con el que se guardó una entrada (sin contar acierto ni fallo)"""
+        entry = self._entries.get(key)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+        }
+
+
+@st.cache_resource
+def get_chart_cache():
+    """Caché de specs de gráficos compartida por todas las sesiones"""
+    return LRUCache(CHART_CACHE_MAX_ENTRIES, CHART_CACHE_MAX_BYTES)
+
+
+@st.cache_resource
+def get_prefetch_cache():
+    """Specs de los días vecinos precalculadas en segundo plano, con su propio límite"""
+    return LRUCache(PREFETCH_CACHE_MAX_ENTRIES, PREFETCH_CACHE_MAX_BYTES)
+
+
+_altair_lock = threading.Lock()
+
+
+def _altair_spec(chart):
+    # Tema "none" como hace st.altair_chart y sin el límite de 5000 filas:
+    # los datos quedan embebidos en spec['datasets']
+    with _altair_lock, alt.theme.enable('none'), alt.data_transformers.enable('default', max_rows=None):
+        spec = chart.to_dict()
+    return spec, len(json.dumps(spec, default=str))
+
+
+def _plotly_spec(fig):
+    spec_json = fig.to_json()
+    return json.loads(spec_json), len(spec_json)
+
+
+def cached_spec(chart_id: str, key: tuple, build, serialize):
+    """Spec serializada del gráfico; solo se llama a `build` si no está en caché
+
+    La clave debe incluir todo lo que determina el gráfico (versión del
+    dataset, modo de vista, fechas seleccionadas...).
+    """
+    cache = get_chart_cache()
+    cache_key = (chart_id, *key)
+    spec = cache.get(cache_key)
+    if spec is not None:
+        record_payload(chart_id, cache.size_of(cache_key), 'caché')
+        return spec
+    # Si ya se precalculó en segundo plano se pasa a la caché principal
+    prefetched = get_prefetch_cache().pop(cache_key)
+    if prefetched is not None:
+        spec, size = prefetched
+        origin = 'precálculo'
+    else:
+        with section(f"{chart_id} · construcción", 'spec'):
+            chart = build()
+        with section(f"{chart_id} · serialización", 'serialización'):
+            spec, size = serialize(chart)
+        origin = 'calculada'
+    cache.put(cache_key, spec, size or sys.getsizeof(spec))
+    record_payload(chart_id, size, origin)
+    return spec
+
+
+def altair_chart(chart_id: str, key: tuple, build, **kwargs):
+    """Equivalente a st.altair_chart con la spec cacheada"""
+    spec = cached_spec(chart_id, key, build, _altair_spec)
+    with section(f"{chart_id} · envío", 'envío'):
+        return st.vega_lite_chart(spec, **kwargs)
+
+
+def plotly_chart(chart_id: str, key: tuple, build, **kwargs):
+    """Equivalente a st.plotly_chart con la figura serializada cacheada"""
+    spec = cached_spec(chart_id, key, build, _plotly_spec)
+    with section(f"{chart_id} · envío", 'envío'):
+        return st.plotly_chart(spec, **kwargs)
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+
+# Paso de la rejilla regular del dataset
+GRID_FREQ = '15min'
+
+# Huecos de hasta este número de lecturas seguidas se interpolan (1 hora)
+MAX_INTERPOLATED_GAP = 4
+
+# Zona horaria de las exportaciones sin zona (None: ya vienen en UTC)
+SOURCE_TIMEZONE = None
+
+# Máscara de calidad por fila (columna 'Quality', se combinan con OR)
+QUALITY_SNAPPED = 1         # fecha desplazada al punto de rejilla más cercano
+QUALITY_DUPLICATE = 2       # varias lecturas en el mismo punto, promediadas
+QUALITY_INTERPOLATED = 4    # fila inexistente rellenada por interpolación
+QUALITY_GAP = 8             # fila inexistente en un hueco demasiado largo (NaN)
+
+QUALITY_LABELS = {
+    QUALITY_SNAPPED: 'Ajustada a rejilla',
+    QUALITY_DUPLICATE: 'Duplicada',
+    QUALITY_INTERPOLATED: 'Interpolada',
+    QUALITY_GAP: 'Hueco',
+}
+
+
+def _to_utc_naive(timestamps: pd.Series, source_tz):
+    # Las fechas se guardan sin zona, en UTC: sin horas repetidas ni saltadas por DST
+    if timestamps.dt.tz is None and source_tz is not None:
+        timestamps = timestamps.dt.tz_localize(source_tz, ambiguous='NaT', nonexistent='NaT')
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+    return timestamps
+
+
+def _run_lengths(missing: np.ndarray):
+    """Longitud del tramo de valores True consecutivos al que pertenece cada posición"""
+    if not missing.any():
+        return np.zeros(len(missing), dtype='int64')
+    # Identificador de tramo: cambia en cada transición
+    run_ids = np.concatenate(([0], np.cumsum(missing[1:] != missing[:-1])))
+    lengths = np.bincount(run_ids)
+    return np.where(missing, lengths[run_ids], 0)
+
+
+def clean_readings(df: pd.DataFrame, previous: pd.DataFrame = None, source_tz=SOURCE_TIMEZONE,
+                   freq: str = GRID_FREQ, max_gap: int = MAX_INTERPOLATED_GAP):
+    """Lleva las lecturas a una rejilla regular de 15 minutos en UTC
+
+    Ajusta cada fecha al punto de rejilla más cercano, promedia duplicados,
+    interpola huecos cortos y deja como NaN los largos. Devuelve el DataFrame
+    ordenado con una columna 'Quality' (máscara QUALITY_*).
+
+    `previous` es la última fila ya almacenada: con ella un lote añadido
+    continúa la rejilla y los huecos entre lotes también se detectan.
+    """
+    df = df.copy()
+    df['Datetime'] = _to_utc_naive(pd.to_datetime(df['Datetime']), source_tz)
+    df = df.dropna(subset=['Datetime'])
+    value_columns = [name for name in df.columns if name not in ('Datetime', 'Quality')]
+
+    snapped = df['Datetime'].dt.round(freq)
+    quality = np.where(snapped != df['Datetime'], QUALITY_SNAPPED, 0).astype('uint8')
+    df['Datetime'] = snapped
+
+    # Duplicados: media de las lecturas de cada punto de rejilla
+    numeric = [name for name in value_columns if pd.api.types.is_numeric_dtype(df[name])]
+    grouped = df.groupby('Datetime', sort=True)
+    sizes = grouped.size()
+    cleaned = grouped[numeric].mean() if numeric else pd.DataFrame(index=sizes.index)
+    for name in value_columns:
+        if name not in numeric:
+            cleaned[name] = grouped[name].last()
+    cleaned = cleaned[value_columns]
+    cleaned_quality = pd.Series(quality, index=df.index).groupby(df['Datetime']).max()
+    cleaned_quality = cleaned_quality.to_numpy() | np.where(sizes.to_numpy() > 1, QUALITY_DUPLICATE, 0)
+
+    # Rejilla completa (desde la fila anterior ya almacenada si la hay)
+    if previous is not None and len(previous):
+        start = pd.Timestamp(previous['Datetime'].iloc[-1]) + pd.Timedelta(freq)
+        cleaned = cleaned[cleaned.index >= start]
+        cleaned_quality = cleaned_quality[-len(cleaned):] if len(cleaned) else cleaned_quality[:0]
+    else:
+        start = cleaned.index.min()
+    if cleaned.empty:
+        return pd.DataFrame(columns=['Datetime', *value_columns, 'Quality'])
+
+    grid = pd.date_range(start, cleaned.index.max(), freq=freq, name='Datetime')
+    missing = ~grid.isin(cleaned.index)
+    quality_grid = pd.Series(0, index=grid, dtype='uint8')
+    quality_grid[cleaned.index] = cleaned_quality
+    cleaned = cleaned.reindex(grid)
+
+    if missing.any():
+        run_lengths = _run_lengths(missing)
+        short_gap = missing & (run_lengths <= max_gap)
+        if numeric:
+            # Se interpola con la fila anterior como ancla para los huecos entre lotes
+            anchor = previous[numeric].iloc[-1:] if previous is not None and len(previous) else None
+            values = cleaned[numeric]
+            if anchor is not None:
+                anchor.index = pd.DatetimeIndex([start - pd.Timedelta(freq)], name='Datetime')
+                values = pd.concat([anchor, values])
+            interpolated = values.interpolate(method='time', limit_area='inside').iloc[-len(grid):]
+            cleaned.loc[short_gap, numeric] = interpolated.loc[short_gap].to_numpy()
+        quality = quality_grid.to_numpy()
+        quality[short_gap] |= QUALITY_INTERPOLATED
+        quality[missing & ~short_gap] |= QUALITY_GAP
+        quality_grid[:] = quality
+
+    cleaned['Quality'] = quality_grid.to_numpy()
+    return cleaned.reset_index()
+
+
+def quality_summary(quality: np.ndarray):
+    """Número de filas afectadas por cada indicador de calidad"""
+    quality = np.asarray(quality)
+    return {label: int(np.count_nonzero(quality & flag)) for flag, label in QUALITY_LABELS.items()}
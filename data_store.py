@@ -0,0 +1,395 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cleaning import clean_readings
+from schema import DATASET_SCHEMA, apply_schema
+
+
+DEFAULT_DATA_PATH = "data/inversor_data_with_heating.csv"
+
+# Columnas indexadas con sumas acumuladas (energía y meteorología)
+INDEXED_COLUMNS = (
+    'DirectConsumption(W)', 'BatteryDischarging(W)', 'ExternalEnergySupply(W)',
+    'TotalConsumption(W)', 'HeatingSystem(W)', 'PV_PowerGeneration(W)',
+    'temperature', 'precipitation', 'radiation'
+)
+
+
+def _freeze(values):
+    """Devuelve el array marcado como solo lectura"""
+    array = np.asarray(values)
+    array.flags.writeable = False
+    return array
+
+
+class _ColumnBuffer:
+    """Array con capacidad de reserva: añadir filas cuesta O(filas nuevas) amortizado
+
+    Las vistas publicadas cubren solo [0, longitud) y son de solo lectura, así que
+    escribir detrás de ellas no altera lo que ya tienen otras sesiones.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values)
+        self._data = values.copy()
+        self._length = len(values)
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    def append(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        needed = self._length + len(values)
+        if needed > len(self._data):
+            # Crecimiento geométrico para amortizar las copias
+            grown = np.empty(max(needed, 2 * len(self._data), 16), dtype=self._data.dtype)
+            grown[:self._length] = self._data[:self._length]
+            self._data = grown
+        self._data[self._length:needed] = values
+        self._length = needed
+
+    def last(self):
+        return self._data[self._length - 1]
+
+    def view(self):
+        return _freeze(self._data[:self._length].view())
+
+
+def _content_hash(columns: dict):
+    """Hash del contenido de todas las columnas (se calcula una vez al cargar)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for name, values in columns.items():
+        digest.update(f"{name}:{values.dtype.str}:{len(values)}".encode())
+        if values.dtype == object:
+            values = pd.util.hash_array(values)
+        digest.update(np.ascontiguousarray(values).view(np.uint8))
+    return digest.hexdigest()
+
+
+def frame_view(df: pd.DataFrame, columns: dict):
+    """Construye un DataFrame con columnas renombradas sin copiar los datos"""
+    return pd.DataFrame(
+        {new_name: df[name].to_numpy() for name, new_name in columns.items()},
+        copy=False
+    )
+
+
+def _to_epoch_ns(timestamps):
+    """Convierte una serie de fechas a enteros epoch (ns, UTC si hay zona horaria)"""
+    timestamps = pd.to_datetime(pd.Series(timestamps))
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+    return timestamps.to_numpy(dtype='datetime64[ns]').view('i8')
+
+
+class PrefixSumIndex:
+    """Sumas acumuladas por columna: totales y medias de cualquier [inicio, fin) en O(1)"""
+
+    def __init__(self, timestamps, columns: dict, tz=None):
+        self._tz = tz
+        # Se antepone un 0 para que total[i:j] = sums[j] - sums[i]
+        self._epoch_buffer = _ColumnBuffer(np.empty(0, dtype='int64'))
+        self._sum_buffers = {name: _ColumnBuffer(np.zeros(1)) for name in columns}
+        self._count_buffers = {name: _ColumnBuffer(np.zeros(1, dtype='int64')) for name in columns}
+        self.extend(timestamps, columns)
+
+    def extend(self, timestamps, columns: dict):
+        """Añade filas al final del índice; coste proporcional a las filas nuevas"""
+        self._epoch_buffer.append(_to_epoch_ns(timestamps))
+        for name in self._sum_buffers:
+            values = np.asarray(columns[name], dtype='float64')
+            valid = ~np.isnan(values)
+            sums, counts = self._sum_buffers[name], self._count_buffers[name]
+            sums.append(sums.last() + np.cumsum(np.where(valid, values, 0.0)))
+            counts.append(counts.last() + np.cumsum(valid, dtype='int64'))
+        self._publish()
+
+    def _publish(self):
+        # Las fechas se publican las últimas: una consulta concurrente nunca
+        # obtiene una posición fuera de las sumas ya publicadas
+        self._sums = {name: buffer.view() for name, buffer in self._sum_buffers.items()}
+        self._counts = {name: buffer.view() for name, buffer in self._count_buffers.items()}
+        self._epochs = self._epoch_buffer.view()
+
+    @property
+    def columns(self):
+        return list(self._sums)
+
+    def _position(self, value, default):
+        if value is None:
+            return default
+        timestamp = pd.Timestamp(value)
+        if self._tz is not None:
+            timestamp = timestamp.tz_localize(self._tz) if timestamp.tz is None else timestamp
+            timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+        elif timestamp.tz is not None:
+            timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+        return int(np.searchsorted(self._epochs, timestamp.value, side='left'))
+
+    def bounds(self, start=None, end=None):
+        """Posiciones [i, j) de las filas con start <= Datetime < end"""
+        i = self._position(start, 0)
+        j = self._position(end, len(self._epochs))
+        return i, max(i, j)
+
+    def count(self, start=None, end=None):
+        i, j = self.bounds(start, end)
+        return j - i
+
+    def totals(self, start=None, end=None, columns=None):
+        i, j = self.bounds(start, end)
+        return {name: float(self._sums[name][j] - self._sums[name][i]) for name in (columns or self._sums)}
+
+    def means(self, start=None, end=None, columns=None):
+        i, j = self.bounds(start, end)
+        means = {}
+        for name in (columns or self._sums):
+            count = self._counts[name][j] - self._counts[name][i]
+            means[name] = float(self._sums[name][j] - self._sums[name][i]) / count if count else float('nan')
+        return means
+
+
+class DatasetProfile:
+    """Resumen del dataset (extremos, medias, nulos, años) calculado una vez por versión"""
+
+    def __init__(self, columns: dict, timestamps: pd.Series):
+        self.rows = 0
+        self.start = None
+        self.end = None
+        self.years = []
+        self.months = []
+        self._stats = {}
+        self.update(columns, timestamps)
+
+    def update(self, columns: dict, timestamps: pd.Series):
+        """Incorpora filas nuevas combinando sus estadísticas con las acumuladas"""
+        self.rows += len(timestamps)
+        for name, values in columns.items():
+            stats = self._stats.setdefault(name, {'nulls': 0})
+            if not np.issubdtype(values.dtype, np.number):
+                stats['nulls'] += int(pd.isna(values).sum())
+                continue
+            values = np.asarray(values, dtype='float64')
+            valid = values[~np.isnan(values)]
+            nonzero = valid[valid != 0]
+            stats['nulls'] += int(len(values) - len(valid))
+            stats['sum'] = stats.get('sum', 0.0) + float(valid.sum())
+            stats['count'] = stats.get('count', 0) + len(valid)
+            if len(valid):
+                stats['min'] = min(stats.get('min', np.inf), float(valid.min()))
+                stats['max'] = max(stats.get('max', -np.inf), float(valid.max()))
+            if len(nonzero):
+                stats['nonzero_min'] = min(stats.get('nonzero_min', np.inf), float(nonzero.min()))
+
+        valid_timestamps = timestamps.dropna()
+        if len(valid_timestamps):
+            start, end = valid_timestamps.min(), valid_timestamps.max()
+            self.start = start if self.start is None else min(self.start, start)
+            self.end = end if self.end is None else max(self.end, end)
+            self.years = sorted(set(self.years) | {int(year) for year in valid_timestamps.dt.year.unique()})
+            self.months = sorted(set(self.months) | {int(month) for month in valid_timestamps.dt.month.unique()})
+
+    def __getitem__(self, name: str):
+        stats = self._stats[name]
+        summary = {'nulls': stats['nulls']}
+        if 'count' in stats:
+            summary.update({
+                'min': stats.get('min', float('nan')),
+                'max': stats.get('max', float('nan')),
+                'nonzero_min': stats.get('nonzero_min', float('nan')),
+                'mean': stats['sum'] / stats['count'] if stats['count'] else float('nan'),
+            })
+        return summary
+
+    @property
+    def columns(self):
+        return list(self._stats)
+
+    def min(self, name: str, nonzero: bool = False):
+        return self[name]['nonzero_min' if nonzero else 'min']
+
+    def max(self, name: str):
+        return self[name]['max']
+
+    def mean(self, name: str):
+        return self[name]['mean']
+
+
+class DatasetStore:
+    """Almacén columnar del dataset, compartido por todas las sesiones
+
+    Las columnas publicadas son de solo lectura; las filas nuevas solo pueden
+    añadirse al final (`append`), lo que genera una nueva versión.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._buffers = {name: _ColumnBuffer(df[name].to_numpy()) for name in df.columns}
+        self._lock = threading.RLock()
+        self._prefix_sums = None
+        self._profile = None
+        self._columns = {}
+        self.source_path = None
+        self.source_offset = 0
+        # Token de versión: clave barata para las cachés de datos derivados
+        self._publish(None)
+
+    def _publish(self, new_columns):
+        self._columns = {name: buffer.view() for name, buffer in self._buffers.items()}
+        if new_columns is None:
+            version = _content_hash(self._columns)
+            appends = ()
+            self._base_version = version
+        else:
+            # Versión encadenada: solo se hashean las filas nuevas
+            version = _content_hash({'previous': np.frombuffer(self.version.encode(), dtype=np.uint8), **new_columns})
+            # Primera fecha añadida y versión resultante de cada append
+            appends = self._state[2] + ((pd.Timestamp(new_columns['Datetime'][0]), version),)
+        frame = self.view()
+        # Vista, versión e historial de añadidos se sustituyen juntos para que
+        # ninguna lectura los mezcle
+        self._state = (frame, version, appends)
+
+    def __len__(self):
+        return len(self._state[0])
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def column(self, name: str):
+        """Array de solo lectura de una columna"""
+        return self._columns[name]
+
+    def view(self, columns=None):
+        """DataFrame de solo lectura que comparte memoria con el almacén"""
+        if columns is None:
+            columns = self.columns
+        if not isinstance(columns, dict):
+            columns = {name: name for name in columns}
+        store_columns = self._columns
+        return pd.DataFrame(
+            {new_name: store_columns[name] for name, new_name in columns.items()},
+            copy=False
+        )
+
+    @property
+    def frame(self):
+        """Vista completa del dataset"""
+        return self._state[0]
+
+    @property
+    def version(self):
+        return self._state[1]
+
+    def snapshot(self):
+        """Vista completa y su versión, leídas de forma consistente"""
+        frame, version, _ = self._state
+        return frame, version
+
+    def range_version(self, end=None):
+        """Versión de las filas anteriores a `end`
+
+        Como solo se añaden filas al final, un intervalo cerrado antes de la
+        primera fila de un append no cambia con él: las cachés de ese intervalo
+        pueden seguir usando la versión anterior.
+        """
+        _, version, appends = self._state
+        if end is None:
+            return version
+        end = pd.Timestamp(end)
+        range_version = self._base_version
+        for first_new, appended_version in appends:
+            if first_new < end:
+                range_version = appended_version
+        return range_version
+
+    @property
+    def high_water_mark(self):
+        """Fecha de la última fila del almacén (None si está vacío)"""
+        timestamps = self._buffers['Datetime']
+        return pd.Timestamp(timestamps.last()) if len(timestamps) else None
+
+    @property
+    def profile(self):
+        """Estadísticas por columna del dataset (un único recorrido por versión)"""
+        if self._profile is None:
+            with self._lock:
+                if self._profile is None:
+                    self._profile = DatasetProfile(self._columns, self.frame['Datetime'])
+        return self._profile
+
+    @property
+    def prefix_sums(self):
+        """Índice de sumas acumuladas de las columnas de energía y meteorología"""
+        if self._prefix_sums is None:
+            with self._lock:
+                if self._prefix_sums is None:
+                    timestamps = self.frame['Datetime']
+                    self._prefix_sums = PrefixSumIndex(
+                        timestamps,
+                        {name: self._columns[name] for name in INDEXED_COLUMNS if name in self._columns},
+                        tz=timestamps.dt.tz
+                    )
+        return self._prefix_sums
+
+    def append(self, df: pd.DataFrame):
+        """Añade las filas posteriores a la marca de agua y devuelve cuántas se han añadido
+
+        Columnas, sumas acumuladas y perfil se extienden con coste proporcional
+        a las filas nuevas. Las filas con fecha igual o anterior a la última
+        ya almacenada se descartan.
+        """
+        missing = [name for name in self.columns if name not in df.columns]
+        if missing:
+            raise ValueError(f"Faltan columnas en las filas nuevas: {', '.join(missing)}")
+
+        with self._lock:
+            new_rows = apply_schema(df[self.columns], DATASET_SCHEMA, compact=True)
+            high_water_mark = self.high_water_mark
+            if high_water_mark is not None:
+                new_rows = new_rows[new_rows['Datetime'] > high_water_mark]
+            new_rows = (
+                new_rows.sort_values('Datetime', kind='stable')
+                .drop_duplicates('Datetime', keep='last')
+                .reset_index(drop=True)
+            )
+            if new_rows.empty:
+                return 0
+
+            new_columns = {name: new_rows[name].to_numpy() for name in self.columns}
+            for name, buffer in self._buffers.items():
+                buffer.append(new_columns[name])
+
+            if self._prefix_sums is not None:
+                self._prefix_sums.extend(
+                    new_rows['Datetime'],
+                    {name: new_columns[name] for name in INDEXED_COLUMNS if name in new_columns}
+                )
+            if self._profile is not None:
+                self._profile.update(new_columns, new_rows['Datetime'])
+
+            self._publish({name: self._buffers[name].view()[-len(new_rows):] for name in self.columns})
+            return len(new_rows)
+
+
+@st.cache_resource(show_spinner="Cargando datos...")
+def get_store(path: str = DEFAULT_DATA_PATH):
+    """Carga el CSV una vez por proceso y lo expone como almacén compartido"""
+    # Tamaño antes de leer: el modo en vivo continúa desde aquí (las filas
+    # repetidas se descartan por la marca de agua)
+    offset = os.path.getsize(path)
+    df = pd.read_csv(path)
+    # Rejilla regular ordenada: el índice de sumas acumuladas y los agregados
+    # pueden asumir un paso fijo de 15 minutos
+    store = DatasetStore(apply_schema(clean_readings(df), DATASET_SCHEMA, compact=True))
+    store.source_path, store.source_offset = path, offset
+    return store
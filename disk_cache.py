@@ -0,0 +1,236 @@
+"""Caché en disco de datos derivados, compartida entre procesos y reinicios
+
+Las cachés de Streamlit viven en la memoria de cada proceso: tras un reinicio
+o en otra réplica se recalcula todo. Esta caché guarda los resultados en un
+fichero SQLite en modo WAL, que varios procesos (y varios hilos) pueden leer y
+escribir a la vez. Cada entrada lleva su tamaño y la fecha de último uso; al
+superar el límite de bytes se borran las menos usadas recientemente.
+
+Se activa con la variable de entorno DISK_CACHE_PATH (p. ej. un volumen
+compartido por las réplicas); sin ella no se usa el disco. Las claves incluyen
+la versión (hash de contenido) del dataset o del modelo, así que un mismo
+fichero nunca sirve resultados de otros datos. También incluyen el código de la
+función cacheada, las versiones de pandas y numpy y CACHE_SCHEMA_VERSION: tras
+un despliegue que cambia el cálculo o las librerías no se leen entradas viejas
+(quedan sin uso y el desalojo LRU las acaba borrando).
+"""
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+DISK_CACHE_PATH = os.environ.get('DISK_CACHE_PATH')
+DISK_CACHE_MAX_BYTES = int(os.environ.get('DISK_CACHE_MAX_BYTES', 1024 ** 3))
+# Las entradas mayores no se guardan: desplazarían a todas las demás
+DISK_CACHE_MAX_ENTRY_BYTES = 64 * 1024 ** 2
+# Segundos mínimos entre actualizaciones de la fecha de uso de una entrada al leerla
+TOUCH_INTERVAL_SECONDS = 60
+
+# Subir al cambiar el formato de los datos derivados o el código que llaman
+# las funciones cacheadas (el código de la propia función ya forma parte de la clave)
+CACHE_SCHEMA_VERSION = 2
+# Entorno que determina si un pickle guardado sigue siendo válido
+_ENVIRONMENT = (CACHE_SCHEMA_VERSION, pd.__version__, np.__version__)
+
+_LOGGER = logging.getLogger(__name__)
+_MISSING = object()
+
+
+class DiskCache:
+    """Caché clave → objeto (pickle) en SQLite con desalojo LRU por tamaño"""
+
+    def __init__(self, path: str, max_bytes: int = DISK_CACHE_MAX_BYTES,
+                 max_entry_bytes: int = DISK_CACHE_MAX_ENTRY_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._local = threading.local()
+        # Los contadores se actualizan desde los hilos de todas las sesiones
+        self._counters_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._counters_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _connection(self):
+        # Una conexión por hilo: sqlite3 no comparte conexiones entre hilos
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str, default=None):
+        """Valor guardado o `default`; los errores de disco cuentan como fallo"""
+        try:
+            connection = self._connection()
+            row = connection.execute("SELECT value, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count('misses')
+                return default
+            value = pickle.loads(row[0])
+            now = time.time()
+            if now - row[1] > TOUCH_INTERVAL_SECONDS:
+                connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            self._count('errors')
+            _LOGGER.warning("Caché en disco: no se pudo leer %s", key, exc_info=True)
+            return default
+        self._count('hits')
+        return value
+
+    def put(self, key: str, value):
+        """Guarda el valor y desaloja las entradas menos usadas; devuelve si se guardó"""
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            self._count('errors')
+            return False
+        if len(blob) > self.max_entry_bytes:
+            return False
+        try:
+            connection = self._connection()
+            # BEGIN IMMEDIATE: un solo escritor a la vez entre todos los procesos
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time())
+                )
+                self._evict(connection)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self._count('errors')
+            _LOGGER.warning("Caché en disco: no se pudo escribir %s", key, exc_info=True)
+            return False
+        return True
+
+    def _evict(self, connection):
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in connection.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            evicted += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._count('evictions', evicted)
+
+    def resize(self, max_bytes: int):
+        """Cambia el límite de bytes (de este proceso) y desaloja lo que sobre"""
+        self.max_bytes = max_bytes
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._evict(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._connection().execute("DELETE FROM entries")
+
+    def stats(self):
+        entries, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        with self._counters_lock:
+            counters = {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'errors': self.errors}
+        return {'entries': entries, 'bytes': total, **counters, 'max_bytes': self.max_bytes}
+
+
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache():
+    """Caché en disco del proceso, o None si DISK_CACHE_PATH no está definida
+
+    No usa st.cache_resource para poder llamarse desde los hilos de fondo.
+    """
+    global _disk_cache
+    if DISK_CACHE_PATH is None:
+        return None
+    with _disk_cache_lock:
+        if _disk_cache is None:
+            _disk_cache = DiskCache(DISK_CACHE_PATH)
+        return _disk_cache
+
+
+def cache_key(name: str, *parts):
+    """Clave estable entre procesos a partir de repr de sus partes y del entorno"""
+    text = '\x1f'.join([name, repr(_ENVIRONMENT), *(repr(part) for part in parts)])
+    return hashlib.blake2b(text.encode(), digest_size=20).hexdigest()
+
+
+def code_version(function):
+    """Hash del código fuente de la función (del bytecode si no hay fuente)"""
+    try:
+        source = inspect.getsource(function).encode()
+    except (OSError, TypeError):
+        source = function.__code__.co_code
+    return hashlib.blake2b(source, digest_size=8).hexdigest()
+
+
+def disk_cached(name: str, context=None):
+    """Decorador: guarda en disco el resultado de una función de datos derivados
+
+    La clave es `name` con el hash del código de la función, los argumentos
+    que no empiezan por '_' (la misma convención que st.cache_data) y, si se
+    indica, lo que devuelva `context()`.
+    Se coloca debajo del decorador de caché en memoria, que responde primero.
+    """
+    def decorator(function):
+        signature = inspect.signature(function)
+        version = code_version(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            cache = get_disk_cache()
+            if cache is None:
+                return function(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            parts = [(arg, value) for arg, value in bound.arguments.items() if not arg.startswith('_')]
+            if context is not None:
+                parts.append(('context', context()))
+            key = cache_key(name, version, *parts)
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = function(*args, **kwargs)
+                cache.put(key, value)
+            return value
+
+        return wrapper
+
+    return decorator
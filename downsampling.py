@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+
+# Presupuesto de puntos por traza enviados al navegador
+WINDOW_POINTS = 2000    # detalle dentro del rango visible
+CONTEXT_POINTS = 800    # resumen del resto del histórico (rangeslider / desplazamiento)
+
+
+def lttb_indices(x, y, n_out: int):
+    """Índices seleccionados por Largest-Triangle-Three-Buckets
+
+    Conserva el primer y último punto y, en cada bucket, el punto que forma el
+    triángulo de mayor área con el anterior seleccionado y la media del
+    siguiente bucket, por lo que los picos se mantienen.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    # Los huecos no deben decidir la selección
+    y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(y).any() else 0.0, y)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype('int64')
+    selected = np.empty(n_out, dtype='int64')
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if hi <= lo:
+            selected[i + 1] = a
+            continue
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+        else:
+            next_lo, next_hi = n - 1, n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return np.unique(selected)
+
+
+def _union_indices(x, frame: pd.DataFrame, y_cols, n_out: int):
+    # Unión de las selecciones de cada columna: todas las trazas comparten eje X
+    # (necesario para áreas apiladas) y ninguna pierde sus picos
+    indices = [lttb_indices(x, frame[col].to_numpy(), n_out) for col in y_cols]
+    return np.unique(np.concatenate(indices)) if indices else np.arange(len(x))
+
+
+def downsample_frame(df: pd.DataFrame, x_col: str, y_cols, start=None, end=None,
+                     window_points: int = WINDOW_POINTS, context_points: int = CONTEXT_POINTS):
+    """Reduce un DataFrame temporal a un número acotado de puntos por traza
+
+    Dentro de [start, end) se envía detalle (hasta `window_points`, resolución
+    completa si cabe) y fuera un resumen de `context_points` para que el
+    rangeslider siga mostrando todo el histórico.
+    """
+    x = df[x_col].to_numpy()
+    x_numeric = x.view('i8') if np.issubdtype(x.dtype, np.datetime64) else np.asarray(x, dtype='float64')
+
+    if start is None and end is None:
+        return df.iloc[_union_indices(x_numeric, df, y_cols, window_points)].reset_index(drop=True)
+
+    lo = 0 if start is None else int(np.searchsorted(x, np.datetime64(pd.Timestamp(start), 'ns'), side='left'))
+    hi = len(x) if end is None else int(np.searchsorted(x, np.datetime64(pd.Timestamp(end), 'ns'), side='left'))
+    hi = max(lo, hi)
+
+    parts = []
+    before, inside, after = (0, lo), (lo, hi), (hi, len(x))
+    outside_rows = lo + (len(x) - hi)
+    for (a, b), budget in ((before, None), (inside, window_points), (after, None)):
+        if b <= a:
+            continue
+        if budget is None:
+            # Reparto proporcional del presupuesto de contexto a cada lado
+            budget = max(3, int(context_points * (b - a) / max(outside_rows, 1)))
+        segment = df.iloc[a:b]
+        parts.append(a + _union_indices(x_numeric[a:b], segment, y_cols, budget))
+
+    indices = np.concatenate(parts) if parts else np.arange(0)
+    return df.iloc[indices].reset_index(drop=True)
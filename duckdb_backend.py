@@ -0,0 +1,248 @@
+"""Backend SQL embebido (DuckDB) para las agregaciones del dashboard
+
+Responde las mismas agregaciones que utils.compute_* con SQL vectorizado y
+multihilo, sobre las particiones Parquet o sobre el DataFrame del almacén.
+DuckDB es opcional: se activa con la variable de entorno DATA_BACKEND=duckdb.
+
+Comprobación de paridad con pandas:
+    python duckdb_backend.py [--data data/inversor_data_with_heating.csv] [--partitions data/particiones]
+    python -m pytest tests/test_duckdb_parity.py
+"""
+import argparse
+import importlib.util
+import inspect
+import os
+import threading
+
+import pandas as pd
+
+
+STACK_COLUMNS = {
+    'DirectConsumption(W)': 'Consumo Directo (W)',
+    'ExternalEnergySupply(W)': 'Suministro Externo (W)',
+    'BatteryDischarging(W)': 'Descarga Batería (W)',
+}
+CONSUMPTION_COLUMNS = {
+    'TotalConsumption(W)': 'Consumo Total (W)',
+    'HeatingSystem(W)': 'Calefacción (W)',
+}
+WEATHER_COLUMNS = ('temperature', 'precipitation', 'radiation')
+
+
+def duckdb_available():
+    return importlib.util.find_spec('duckdb') is not None
+
+
+def _quote(name: str):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBBackend:
+    """Conexión DuckDB en memoria con la vista `readings` sobre los datos"""
+
+    def __init__(self, connection, partitioned: bool = False):
+        self.connection = connection
+        # Con particiones la vista `partitions` conserva las columnas year/month
+        self.partitioned = partitioned
+        self._types = None
+        # Una conexión DuckDB no admite consultas simultáneas desde varios hilos
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        """Consulta un DataFrame en memoria (vía Arrow, NaN como NULL)"""
+        import duckdb
+        import pyarrow as pa
+
+        connection = duckdb.connect()
+        connection.register('readings', pa.Table.from_pandas(df, preserve_index=False))
+        return cls(connection)
+
+    @classmethod
+    def from_partitions(cls, root: str, until=None):
+        """Consulta directamente los Parquet particionados por año/mes
+
+        Con `until` la vista solo incluye las filas con Datetime <= until (las
+        del almacén en memoria aunque las particiones vayan por delante).
+        """
+        import duckdb
+
+        connection = duckdb.connect()
+        pattern = os.path.join(root, 'year=*', 'month=*', '*.parquet').replace("'", "''")
+        bound = f" WHERE Datetime <= TIMESTAMP '{pd.Timestamp(until).isoformat(sep=' ')}'" if until is not None else ""
+        connection.execute(
+            f"CREATE VIEW partitions AS SELECT * "
+            f"FROM read_parquet('{pattern}', hive_partitioning = true){bound}"
+        )
+        connection.execute("CREATE VIEW readings AS SELECT * EXCLUDE (year, month) FROM partitions")
+        return cls(connection, partitioned=True)
+
+    def _query(self, sql: str, parameters=None):
+        with self._lock:
+            return self.connection.execute(sql, parameters or []).df()
+
+    def _averages(self, columns):
+        # Mismos tipos que pandas: la media de una columna float32 sigue en
+        # float32; la de cualquier otra columna, en float64
+        if self._types is None:
+            described = self._query("DESCRIBE readings")
+            self._types = dict(zip(described['column_name'], described['column_type']))
+        return ', '.join(
+            f"avg({_quote(name)})::{'FLOAT' if self._types.get(name) == 'FLOAT' else 'DOUBLE'} AS {_quote(name)}"
+            for name in columns
+        )
+
+    def _weekly_means(self, columns):
+        # date_trunc('week') empieza en lunes, igual que to_period('W').start_time
+        return self._query(
+            f"SELECT date_trunc('week', Datetime)::TIMESTAMP_NS AS Fecha, {self._averages(columns)} "
+            f"FROM readings GROUP BY 1 ORDER BY 1"
+        )
+
+    def _melt(self, frame: pd.DataFrame):
+        # Mismo orden que pd.melt: todas las filas de cada fuente seguidas
+        return pd.melt(frame, id_vars=['Fecha'], value_vars=list(STACK_COLUMNS.values()),
+                       var_name='Fuente', value_name='Potencia (W)')
+
+    def _day(self, columns, selected_date):
+        start = pd.Timestamp(selected_date)
+        selected = ', '.join(_quote(name) for name in columns)
+        source, conditions = "readings", "Datetime >= ? AND Datetime < ?"
+        if self.partitioned:
+            # Filtro sobre year/month para que solo se abra la partición del día
+            source = "partitions"
+            conditions = f"year = {start.year} AND month = '{start.month:02d}' AND {conditions}"
+        return self._query(
+            f"SELECT Datetime, {selected} FROM {source} WHERE {conditions} ORDER BY Datetime",
+            [start.to_pydatetime(), (start + pd.Timedelta(days=1)).to_pydatetime()]
+        )
+
+    def weekly_sources(self):
+        weekly = self._weekly_means(STACK_COLUMNS)
+        weekly.columns = ['Fecha', *STACK_COLUMNS.values()]
+        return self._melt(weekly)
+
+    def daily_stack(self, selected_date):
+        daily = self._day(STACK_COLUMNS, selected_date)
+        daily.columns = ['Fecha', *STACK_COLUMNS.values()]
+        return self._melt(daily)
+
+    def weekly_consumption(self):
+        weekly = self._weekly_means(CONSUMPTION_COLUMNS)
+        weekly.columns = ['Fecha', *CONSUMPTION_COLUMNS.values()]
+        return weekly
+
+    def daily_consumption(self, selected_date):
+        daily = self._day(CONSUMPTION_COLUMNS, selected_date)
+        daily.columns = ['Fecha', *CONSUMPTION_COLUMNS.values()]
+        return daily
+
+    def weekly_weather(self):
+        weekly = self._weekly_means(WEATHER_COLUMNS)
+        weekly.columns = ['Fecha', *WEATHER_COLUMNS]
+        return weekly
+
+    def daily_means(self, columns: tuple):
+        return self._query(
+            f"SELECT date_trunc('day', Datetime)::TIMESTAMP_NS AS Fecha, {self._averages(columns)} "
+            f"FROM readings GROUP BY 1 ORDER BY 1"
+        )
+
+
+# Tolerancia relativa de la paridad, solo para las columnas que son medias:
+# las de float32 pueden diferir en el último bit según el orden de suma. El
+# resto (fechas, fuentes y lecturas de un día) debe coincidir exactamente
+MEAN_RTOL = 1e-6
+WEEKLY_SOURCES_RTOL = {'Potencia (W)': MEAN_RTOL}
+WEEKLY_CONSUMPTION_RTOL = {name: MEAN_RTOL for name in CONSUMPTION_COLUMNS.values()}
+WEEKLY_WEATHER_RTOL = {name: MEAN_RTOL for name in WEATHER_COLUMNS}
+
+
+def compare_frames(expected: pd.DataFrame, actual: pd.DataFrame, rtol: dict = None):
+    """None si los DataFrames coinciden, o el mensaje de la primera diferencia
+
+    Columnas, orden, número de filas y tipos deben ser idénticos (sin
+    conversiones). Los valores se comparan exactamente salvo en las columnas
+    de `rtol` ({columna: tolerancia relativa}).
+    """
+    rtol = rtol or {}
+    expected = expected.reset_index(drop=True)
+    actual = actual.reset_index(drop=True)
+    try:
+        pd.testing.assert_index_equal(expected.columns, actual.columns)
+        for name in expected.columns:
+            if name in rtol:
+                pd.testing.assert_series_equal(expected[name], actual[name], check_exact=False, rtol=rtol[name])
+            else:
+                pd.testing.assert_series_equal(expected[name], actual[name], check_exact=True)
+    except AssertionError as e:
+        return str(e).strip().splitlines()[0]
+    return None
+
+
+def parity_report(df: pd.DataFrame, backend: DuckDBBackend, dates=None):
+    """Compara cada agregación de DuckDB con la versión pandas de utils
+
+    Devuelve una lista de (agregación, None | mensaje de diferencia); ver
+    compare_frames para los criterios.
+    """
+    import utils
+    from data_store import _content_hash
+
+    # Versión real de los datos: la caché en disco de utils la usa como clave
+    version = _content_hash({name: df[name].to_numpy() for name in df.columns})
+
+    def pandas_version(function, *args):
+        # Las funciones de utils van con st.cache_data: se llama a la original,
+        # forzando el camino pandas aunque DATA_BACKEND sea duckdb
+        configured, utils.DATA_BACKEND = utils.DATA_BACKEND, 'pandas'
+        try:
+            return inspect.unwrap(function)(df, version, *args)
+        finally:
+            utils.DATA_BACKEND = configured
+
+    dates = dates or [df['Datetime'].iloc[0].date(), df['Datetime'].iloc[len(df) // 2].date()]
+    columns = ('temperature', 'TotalConsumption(W)', 'radiation')
+    checks = [
+        ('weekly_sources', pandas_version(utils.compute_weekly_sources), backend.weekly_sources(),
+         WEEKLY_SOURCES_RTOL),
+        ('weekly_consumption', pandas_version(utils.compute_weekly_consumption), backend.weekly_consumption(),
+         WEEKLY_CONSUMPTION_RTOL),
+        ('weekly_weather', pandas_version(utils.compute_weekly_weather), backend.weekly_weather(),
+         WEEKLY_WEATHER_RTOL),
+        ('daily_means', pandas_version(utils.compute_daily_means, columns), backend.daily_means(columns),
+         {name: MEAN_RTOL for name in columns}),
+    ]
+    for selected_date in dates:
+        checks.append((f'daily_stack {selected_date}', pandas_version(utils.compute_daily_stack, selected_date),
+                       backend.daily_stack(selected_date), None))
+        checks.append((f'daily_consumption {selected_date}', pandas_version(utils.compute_daily_consumption, selected_date),
+                       backend.daily_consumption(selected_date), None))
+
+    return [(name, compare_frames(expected, actual, rtol)) for name, expected, actual, rtol in checks]
+
+
+def main():
+    from cleaning import clean_readings
+    from data_store import DEFAULT_DATA_PATH
+    from schema import DATASET_SCHEMA, apply_schema
+
+    parser = argparse.ArgumentParser(description="Paridad de las agregaciones DuckDB frente a pandas")
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="CSV del dataset")
+    parser.add_argument('--partitions', help="Consultar las particiones Parquet en lugar del DataFrame")
+    args = parser.parse_args()
+
+    df = apply_schema(clean_readings(pd.read_csv(args.data)), DATASET_SCHEMA, compact=True)
+    backend = DuckDBBackend.from_partitions(args.partitions) if args.partitions else DuckDBBackend.from_frame(df)
+
+    failures = 0
+    for name, difference in parity_report(df, backend):
+        print(f"{'OK  ' if difference is None else 'FAIL'} {name}")
+        if difference is not None:
+            failures += 1
+            print(f"     {difference}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import gzip
+import importlib.util
+import io
+
+import pandas as pd
+import streamlit as st
+
+
+# Filas por bloque al exportar: cada bloque se comprime (csv.gz) o se
+# convierte a un row group (Parquet) y se descarta antes de pasar al siguiente
+EXPORT_CHUNK_ROWS = 10_000
+
+# Por debajo de este tamaño estimado se entrega CSV plano (abre directo en Excel)
+PLAIN_CSV_MAX_BYTES = 5 * 1024 ** 2
+# Por encima de este tamaño estimado se entrega Parquet si pyarrow está disponible
+PARQUET_MIN_BYTES = 50 * 1024 ** 2
+
+# Formato: (extensión, tipo MIME)
+EXPORT_FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'csv.gz': ('csv.gz', 'application/gzip'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def estimate_csv_bytes(df: pd.DataFrame, sample_rows: int = 1000):
+    """Tamaño aproximado del CSV extrapolando el de las primeras filas"""
+    if df.empty:
+        return 0
+    sample = df.head(sample_rows).to_csv(index=False)
+    return int(len(sample.encode()) * len(df) / min(len(df), sample_rows))
+
+
+def choose_format(df: pd.DataFrame):
+    """CSV plano si es pequeño, CSV comprimido si es mediano, Parquet si es grande"""
+    size = estimate_csv_bytes(df)
+    if size <= PLAIN_CSV_MAX_BYTES:
+        return 'csv'
+    if size >= PARQUET_MIN_BYTES and importlib.util.find_spec('pyarrow') is not None:
+        return 'parquet'
+    return 'csv.gz'
+
+
+def _write_csv(df: pd.DataFrame, stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    text.write(df.head(0).to_csv(index=False))
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        text.write(df.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(index=False, header=False))
+    text.flush()
+    # El wrapper no debe cerrar el flujo de debajo al recogerse
+    text.detach()
+
+
+def _write_parquet(df: pd.DataFrame, stream):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df.head(0), preserve_index=False)
+    with pq.ParquetWriter(stream, schema, compression='zstd') as writer:
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def export_frame(df: pd.DataFrame, fmt: str = 'csv'):
+    """Contenido del fichero exportado en el formato indicado
+
+    st.download_button no admite streaming: necesita los bytes completos. Por
+    eso se escribe en memoria, por bloques: en csv.gz y Parquet nunca existe el
+    CSV sin comprimir ni una copia Arrow completa, solo el resultado final.
+    El tamaño de lo que se entrega lo acotan los umbrales de choose_format.
+    """
+    buffer = io.BytesIO()
+    if fmt == 'parquet':
+        _write_parquet(df, buffer)
+    elif fmt == 'csv.gz':
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as compressed:
+            _write_csv(df, compressed)
+    else:
+        _write_csv(df, buffer)
+    return buffer.getvalue()
+
+
+def download_button(label: str, df: pd.DataFrame, base_name: str, key: str = None, fmt: str = None):
+    """Botón de descarga que exporta el DataFrame solo al pulsarlo
+
+    El formato se elige según el tamaño estimado salvo que se indique `fmt`.
+    """
+    fmt = fmt or choose_format(df)
+    extension, mime = EXPORT_FORMATS[fmt]
+
+    return st.download_button(
+        label=label if fmt == 'csv' else f"{label} · {extension}",
+        # Se exporta solo al pulsar el botón
+        data=lambda: export_frame(df, fmt),
+        file_name=f"{base_name}.{extension}",
+        mime=mime,
+        key=key,
+        # La descarga no relanza el script: los resultados siguen en pantalla
+        on_click='ignore',
+    )
@@ -0,0 +1,128 @@
+"""Ingesta incremental de lecturas nuevas del inversor
+
+Uso:
+    python ingestion.py nuevas_lecturas.csv [--data data/inversor_data_with_heating.csv] [--partitions data/particiones]
+
+Solo se añaden al CSV del dataset las filas posteriores a su última fecha,
+sin volver a leer el histórico completo.
+"""
+import argparse
+import io
+import os
+
+import pandas as pd
+
+from cleaning import clean_readings
+from data_store import DEFAULT_DATA_PATH
+from schema import DATASET_SCHEMA, apply_schema
+
+
+def read_rows(source):
+    """Lee filas del inversor (ruta o buffer CSV) con la columna Datetime parseada"""
+    df = pd.read_csv(source)
+    df['Datetime'] = pd.to_datetime(df['Datetime'])
+    return df
+
+
+def _last_line(path: str, block_size: int = 4096):
+    # Lee el final del fichero hacia atrás hasta encontrar una línea completa
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        position, tail = end, b''
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            lines = tail.rstrip(b'\r\n').split(b'\n')
+            if len(lines) > 1 or position == 0:
+                return lines[-1].decode()
+    return ''
+
+
+def csv_last_row(path: str):
+    """Última fila del CSV (DataFrame de una fila) leyendo solo la cabecera y la última línea"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path) as f:
+        header_line = f.readline().rstrip('\r\n')
+    last_line = _last_line(path)
+    if not last_line or last_line == header_line:
+        return None
+    last_row = pd.read_csv(io.StringIO(last_line), header=None, names=header_line.split(','))
+    last_row['Datetime'] = pd.to_datetime(last_row['Datetime'])
+    return last_row
+
+
+def csv_high_water_mark(path: str):
+    """Última fecha del CSV"""
+    last_row = csv_last_row(path)
+    return None if last_row is None else last_row['Datetime'].iloc[0]
+
+
+def rows_after(df: pd.DataFrame, high_water_mark):
+    """Filas posteriores a la marca de agua, ordenadas y sin fechas repetidas"""
+    if high_water_mark is not None:
+        df = df[df['Datetime'] > high_water_mark]
+    return df.sort_values('Datetime', kind='stable').drop_duplicates('Datetime', keep='last')
+
+
+def append_to_csv(df: pd.DataFrame, path: str = DEFAULT_DATA_PATH):
+    """Añade al CSV las filas posteriores a su marca de agua; devuelve cuántas"""
+    high_water_mark = csv_high_water_mark(path)
+    df = rows_after(df, high_water_mark)
+    if df.empty:
+        return 0
+
+    if high_water_mark is not None:
+        columns = list(pd.read_csv(path, nrows=0).columns)
+        missing = [name for name in columns if name not in df.columns]
+        if missing:
+            raise ValueError(f"Faltan columnas en las filas nuevas: {', '.join(missing)}")
+        df = df[columns]
+
+    df.to_csv(path, mode='a', header=high_water_mark is None, index=False,
+              date_format='%Y-%m-%d %H:%M:%S')
+    return len(df)
+
+
+def ingest(df: pd.DataFrame, store, persist_path: str = None):
+    """Añade filas nuevas al almacén en memoria (y opcionalmente al CSV)
+
+    Devuelve el número de filas incorporadas al almacén.
+    """
+    previous = store.frame.iloc[-1:] if len(store) else None
+    appended = store.append(clean_readings(df, previous=previous))
+    if appended and persist_path:
+        append_to_csv(store.view().iloc[-appended:], persist_path)
+    return appended
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Añade lecturas nuevas del inversor al dataset")
+    parser.add_argument('source', help="CSV con las filas nuevas (mismas columnas que el dataset)")
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="CSV del dataset")
+    parser.add_argument('--partitions', help="Raíz de las particiones Parquet a actualizar (opcional)")
+    args = parser.parse_args()
+
+    # Marca de agua leída una sola vez: el CSV y las particiones reciben las
+    # mismas filas nuevas y nunca se sobrescriben lecturas ya guardadas
+    last_row = csv_last_row(args.data)
+    high_water_mark = None if last_row is None else last_row['Datetime'].iloc[0]
+    rows = rows_after(read_rows(args.source), high_water_mark)
+    appended = append_to_csv(rows, args.data)
+    print(f"{appended} filas añadidas a {args.data} (última fecha: {csv_high_water_mark(args.data)})")
+
+    if args.partitions and not rows.empty:
+        from partitions import append_partitions
+
+        # Limpieza con la última fila guardada como ancla, igual que get_store
+        # sobre el CSV completo; solo se reescriben los meses que reciben filas
+        cleaned = clean_readings(rows, previous=last_row)
+        months = append_partitions(apply_schema(cleaned, DATASET_SCHEMA, compact=True), args.partitions)
+        print(f"Particiones actualizadas: {', '.join(f'{year}-{month:02d}' for year, month in months)}")
+
+
+if __name__ == '__main__':
+    main()
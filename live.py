@@ -0,0 +1,91 @@
+import io
+import os
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from cleaning import clean_readings
+
+
+# Intervalo de sondeo del CSV en modo en vivo (el logger escribe cada 15 minutos)
+LIVE_REFRESH_SECONDS = 30
+
+
+class CsvTail:
+    """Lee solo las líneas completas añadidas a un CSV desde el último sondeo"""
+
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        with open(path) as f:
+            self.header = f.readline().rstrip('\r\n').split(',')
+        self.offset = offset
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """DataFrame con las filas nuevas (vacío si no hay ninguna)"""
+        with self._lock:
+            size = os.path.getsize(self.path)
+            if size < self.offset:
+                # El fichero se ha truncado o rotado: se relee entero y la marca
+                # de agua del almacén descarta lo ya cargado
+                self.offset = 0
+            if size == self.offset:
+                return pd.DataFrame(columns=self.header)
+
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                chunk = f.read(size - self.offset)
+            # Una línea a medio escribir se deja para el siguiente sondeo
+            complete = chunk[:chunk.rfind(b'\n') + 1]
+            self.offset += len(complete)
+
+        lines = [line for line in complete.decode().splitlines() if line and line.split(',') != self.header]
+        if not lines:
+            return pd.DataFrame(columns=self.header)
+        df = pd.read_csv(io.StringIO('\n'.join(lines)), header=None, names=self.header)
+        df['Datetime'] = pd.to_datetime(df['Datetime'])
+        return df
+
+
+_poll_lock = threading.Lock()
+
+
+@st.cache_resource
+def get_tail(path: str, offset: int):
+    """Un único lector por fichero y proceso, compartido por todas las sesiones"""
+    return CsvTail(path, offset)
+
+
+def poll_store(store):
+    """Incorpora al almacén las filas nuevas del CSV de origen; devuelve cuántas"""
+    # Lectura y append juntos: un lote nunca adelanta a otro anterior
+    with _poll_lock:
+        new_rows = get_tail(store.source_path, store.source_offset).poll()
+        if new_rows.empty:
+            return 0
+        # El lote continúa la rejilla desde la última fila almacenada
+        return store.append(clean_readings(new_rows, previous=store.frame.iloc[-1:]))
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def _live_poll(store):
+    poll_store(store)
+    st.caption(f"🔴 En vivo · última lectura: {store.high_water_mark:%d/%m/%Y %H:%M} · {len(store):,} filas")
+
+    # Otra sesión puede haber incorporado las filas: se compara con la versión que
+    # pintó esta sesión. Las cachés de datos y gráficos van por versión, así que
+    # solo se recalcula lo que depende de las filas nuevas
+    if st.session_state.get('live_version') != store.version:
+        st.session_state['live_version'] = store.version
+        st.rerun(scope='app')
+
+
+def live_mode_toggle(store):
+    """Interruptor del modo en vivo: sondea el CSV de origen y refresca la página"""
+    if store.source_path is None:
+        return
+    if st.toggle("🔴 Modo en vivo", key="live_mode",
+                 help=f"Lee las filas nuevas de {store.source_path} cada {LIVE_REFRESH_SECONDS} s"):
+        st.session_state.setdefault('live_version', store.version)
+        _live_poll(store)
@@ -0,0 +1,47 @@
+import importlib
+import sys
+import time
+
+
+# Módulo de cada página: solo se importa la primera vez que se visita
+PAGES = {
+    "Inicio": "pages.home",
+    "Energético": "pages.energetico",
+    "Predicciones": "pages.predicciones",
+    "Entrenar PV": "pages.train_pv",
+    "Predicciones PV": "pages.predicciones_pv",
+    "Weather": "pages.weather",
+}
+
+# Dependencias pesadas cuya carga se atribuye a la primera página que las usa
+HEAVY_MODULES = ('plotly', 'altair', 'sklearn', 'joblib', 'bentoml')
+
+# Tiempo de importación por página (una vez por proceso)
+_import_times = {}
+
+
+def load_page(name: str):
+    """Importa el módulo de la página bajo demanda y registra cuánto tarda"""
+    module_name = PAGES[name]
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    already_loaded = {dep for dep in HEAVY_MODULES if dep in sys.modules}
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _import_times[name] = {
+        'module': module_name,
+        'seconds': time.perf_counter() - start,
+        'dependencies': [dep for dep in HEAVY_MODULES if dep in sys.modules and dep not in already_loaded],
+    }
+    return module
+
+
+def import_time_report():
+    """Filas con el tiempo de importación de cada página cargada, de mayor a menor"""
+    rows = [
+        {'Página': name, 'Módulo': info['module'], 'Importación (ms)': round(info['seconds'] * 1000, 1),
+         'Dependencias cargadas': ', '.join(info['dependencies'])}
+        for name, info in _import_times.items()
+    ]
+    return sorted(rows, key=lambda row: row['Importación (ms)'], reverse=True)
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from chart_cache import LRUCache
+
+
+# Tamaños de página disponibles (filas enviadas al navegador por rerun)
+PAGE_SIZES = [50, 100, 250, 500]
+
+# Órdenes y filtros calculados en caché (posiciones int64 sobre la tabla)
+ORDER_CACHE_MAX_ENTRIES = 32
+ORDER_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+_NO_SORT = "(orden original)"
+_NO_FILTER = "(sin filtro)"
+
+
+@st.cache_resource
+def get_order_cache():
+    """Caché LRU de las posiciones filtradas y ordenadas de las tablas paginadas"""
+    return LRUCache(ORDER_CACHE_MAX_ENTRIES, ORDER_CACHE_MAX_BYTES)
+
+
+def _filter_positions(values: pd.Series, condition):
+    """Posiciones de las filas que cumplen el filtro
+
+    `condition` es (desde, hasta) para fechas y números o un texto a buscar.
+    Las fechas ordenadas (el dataset lo está) se filtran por búsqueda binaria.
+    """
+    if isinstance(condition, str):
+        mask = values.astype(str).str.contains(condition, case=False, regex=False, na=False)
+        return np.flatnonzero(mask.to_numpy())
+    low, high = condition
+    if pd.api.types.is_datetime64_any_dtype(values) and values.is_monotonic_increasing:
+        i, j = np.searchsorted(values.to_numpy(), np.array([low, high], dtype='datetime64[ns]'))
+        return np.arange(i, j)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        mask = (values >= low) & (values < high)
+    else:
+        mask = values.between(low, high)
+    return np.flatnonzero(mask.to_numpy())
+
+
+def table_positions(df: pd.DataFrame, sort_by=None, descending: bool = False,
+                    filter_column=None, condition=None, version=None, table: str = None, columns=None):
+    """Posiciones de las filas visibles tras filtrar y ordenar, en orden
+
+    Devuelve None si no hay filtro ni orden (la tabla tal cual). Con `version`
+    (identificador de los datos) el resultado se guarda en caché y paginar no
+    vuelve a ordenar. La clave incluye la tabla (`table`) y sus columnas: dos
+    tablas sobre la misma versión de datos no comparten posiciones.
+    """
+    if sort_by is None and filter_column is None:
+        return None
+    key = (table, tuple(columns or df.columns), version, sort_by, descending, filter_column, condition)
+    cache = get_order_cache()
+    if version is not None:
+        positions = cache.get(key)
+        if positions is not None:
+            return positions
+
+    positions = np.arange(len(df))
+    if filter_column is not None:
+        positions = _filter_positions(df[filter_column], condition)
+    if sort_by is not None:
+        values = df[sort_by].iloc[positions].reset_index(drop=True)
+        order = values.sort_values(ascending=not descending, kind='stable', na_position='last').index.to_numpy()
+        positions = positions[order]
+
+    if version is not None:
+        cache.put(key, positions, positions.nbytes)
+    return positions
+
+
+def _filter_input(values: pd.Series, key: str):
+    """Control del filtro según el tipo de la columna; None si no hay condición"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        first, last = values.min(), values.max()
+        if pd.isna(first):
+            return None
+        selected = st.date_input("Rango de fechas", value=(first.date(), last.date()),
+                                 min_value=first.date(), max_value=last.date(), key=f"{key}_dates")
+        if not isinstance(selected, (tuple, list)) or len(selected) != 2:
+            return None
+        return pd.Timestamp(selected[0]), pd.Timestamp(selected[1]) + pd.Timedelta(days=1)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        low, high = values.min(), values.max()
+        if pd.isna(low) or low == high:
+            return None
+        selected = st.slider("Rango de valores", float(low), float(high), (float(low), float(high)),
+                             key=f"{key}_range")
+        return None if selected == (float(low), float(high)) else selected
+    text = st.text_input("Contiene", key=f"{key}_text")
+    return text or None
+
+
+def paged_table(df: pd.DataFrame, key: str, columns=None, version=None, height='auto'):
+    """Tabla paginada: solo se envían al navegador las filas de la página actual
+
+    El orden y el filtro se calculan en el servidor sobre la tabla completa.
+    `version` identifica el contenido de `df` para cachear el orden entre reruns.
+    """
+    columns = list(columns or df.columns)
+
+    col_sort, col_filter, col_condition = st.columns([2, 2, 3])
+    with col_sort:
+        sort_choice = st.selectbox("Ordenar por", [_NO_SORT, *columns], key=f"{key}_sort")
+        descending = st.toggle("Descendente", key=f"{key}_desc", disabled=sort_choice == _NO_SORT)
+    with col_filter:
+        filter_choice = st.selectbox("Filtrar por", [_NO_FILTER, *columns], key=f"{key}_filter")
+    condition = None
+    if filter_choice != _NO_FILTER:
+        with col_condition:
+            condition = _filter_input(df[filter_choice], f"{key}_{filter_choice}")
+
+    sort_by = None if sort_choice == _NO_SORT else sort_choice
+    filter_column = None if condition is None else filter_choice
+    positions = table_positions(df, sort_by, descending, filter_column, condition, version, key, columns)
+    total = len(df) if positions is None else len(positions)
+
+    col_size, col_page, col_info = st.columns([1, 1, 3])
+    with col_size:
+        page_size = st.selectbox("Filas por página", PAGE_SIZES, index=1, key=f"{key}_size")
+    pages = max(1, -(-total // page_size))
+    # Si el filtro reduce las filas, la página guardada puede quedar fuera de rango
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    with col_page:
+        page = st.number_input("Página", min_value=1, max_value=pages, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    end = min(start + page_size, total)
+    window = df.iloc[start:end] if positions is None else df.iloc[positions[start:end]]
+    with col_info:
+        st.write("")
+        filtered = f" (filtradas de {len(df):,})" if total != len(df) else ""
+        st.caption(f"Filas {start + 1 if total else 0:,}–{end:,} de {total:,}{filtered} · página {page} de {pages}")
+
+    st.dataframe(window[columns], width='stretch', height=height)
+    return window
@@ -1,4 +1,4 @@
 # Pages package
-from . import home, energetico, predicciones, predicciones_pv, train_pv, weather
+# Los módulos se importan bajo demanda desde page_loader.load_page
 
 __all__ = ['home', 'energetico', 'predicciones', 'predicciones_pv', 'train_pv', 'weather']
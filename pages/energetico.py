@@ -1,3 +1,5 @@
+import functools
+
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -5,58 +7,275 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import altair as alt
 from utils import *
+from chart_cache import altair_chart, plotly_chart
+from live import live_mode_toggle
+from prefetch import neighbor_days, prefetch_altair, prefetch_plotly
+from profiler import profiled
 
 
-def render(data):
-    """Renderiza la página de datos energéticos"""
-    st.title("📊 Datos Energéticos")
-    
-    # Menú de navegación
-    show_navigation_menu()
-    
+# Colores para cada franja horaria (paleta distinguible)
+TIME_SLOT_COLORS = [
+    '#1E3A5F',  # 00-04: Azul oscuro (noche profunda)
+    '#6366F1',  # 04-08: Índigo (amanecer)
+    '#F59E0B',  # 08-12: Ámbar (mañana)
+    '#EF4444',  # 12-16: Rojo (mediodía)
+    '#F97316',  # 16-20: Naranja (tarde)
+    '#8B5CF6'   # 20-24: Violeta (noche)
+]
+
+
+def density_mode_note(num_points):
+    """Aviso que se añade al contador de puntos cuando se usa el modo densidad"""
+    if num_points > SCATTER_POINT_THRESHOLD:
+        return " — modo densidad (puntos agrupados en celdas, tamaño = nº de lecturas)"
+    return ""
+
+
+def correlation_scatter(points, version, source, period, x_field, y_field, y_title, title):
+    """Scatter de correlación coloreado por franja horaria
+
+    Por encima de SCATTER_POINT_THRESHOLD se envían conteos por celda
+    (temperatura/radiación × potencia × franja) en lugar de cada lectura, de
+    modo que el tamaño del gráfico no depende del periodo de datos.
+    """
+    # Selección interactiva para filtrar por franja horaria (clickable en leyenda)
+    selection = alt.selection_point(fields=['Franja Horaria'], bind='legend')
+    color = alt.Color('Franja Horaria:N',
+                      scale=alt.Scale(domain=TIME_SLOTS, range=TIME_SLOT_COLORS),
+                      legend=alt.Legend(title='Franja Horaria (click para filtrar)', orient='right'))
+    x = alt.X(f'{x_field}:Q',
+              title=x_field,
+              axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15))
+    y = alt.Y(f'{y_field}:Q',
+              title=y_title,
+              axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15))
+
+    if len(points) > SCATTER_POINT_THRESHOLD:
+        cells = compute_scatter_bins(points, version, source, period, x_field, y_field)
+        chart = alt.Chart(cells).mark_circle().encode(
+            x=x,
+            y=y,
+            color=color,
+            size=alt.Size('Puntos:Q', scale=alt.Scale(range=[15, 400]), legend=None),
+            opacity=alt.condition(selection, alt.value(0.7), alt.value(0.05)),
+            tooltip=[
+                alt.Tooltip('Franja Horaria:N', title='Hora'),
+                alt.Tooltip(f'{x_field}:Q', format='.2f'),
+                alt.Tooltip(f'{y_field}:Q', format='.2f'),
+                alt.Tooltip('Puntos:Q', title='Lecturas')
+            ]
+        )
+    else:
+        chart = alt.Chart(points).mark_circle(
+            size=30
+        ).encode(
+            x=x,
+            y=y,
+            color=color,
+            opacity=alt.condition(selection, alt.value(0.6), alt.value(0.05)),
+            tooltip=[
+                alt.Tooltip('Franja Horaria:N', title='Hora'),
+                alt.Tooltip(f'{x_field}:Q', format='.2f'),
+                alt.Tooltip(f'{y_field}:Q', format='.2f')
+            ]
+        )
+
+    return chart.add_params(
+        selection
+    ).properties(
+        height=400,
+        title=alt.TitleParams(text=title, fontSize=18, color='#2d3748', anchor='middle')
+    ).configure(
+        background='white'
+    ).configure_view(
+        strokeWidth=0,
+        fill='white'
+    ).configure_axis(
+        gridColor='#f7fafc',
+        domainColor='#e2e8f0'
+    ).configure_legend(
+        labelColor='#2d3748',
+        titleColor='#2d3748'
+    ).interactive()
+
+
+def _sankey_fig(totals, chart_title, diagram=create_sankey_diagram):
+    """Sankey de las fuentes de consumo con su título"""
+    sankey_fig = diagram(totals)
+    # Actualizar título del gráfico
+    sankey_fig.update_layout(title_text=chart_title)
+    return sankey_fig
+
+
+def _prefetch_sankey_days(store, selected_date):
+    """Precalcula los Sankey de los días vecinos del seleccionado
+
+    En el script solo se comprueba que el día tiene lecturas (dos búsquedas en
+    el índice); los totales se calculan en el hilo de fondo, y solo si alguno
+    de los dos gráficos falta en las cachés (submit lo comprueba antes).
+    """
+    prefix_sums = store.prefix_sums
+    for day in neighbor_days(selected_date, store.profile.start.date(), store.profile.end.date()):
+        range_start = pd.Timestamp(day)
+        range_end = range_start + pd.Timedelta(days=1)
+        if prefix_sums.count(range_start, range_end) == 0:
+            continue
+        range_version = store.range_version(range_end)
+        key = (range_version, "Por Día", range_start, range_end)
+        chart_title = f"Flujo de Energía - {day.strftime('%d/%m/%Y')}"
+        # Los dos gráficos del día comparten el cálculo; fuera del script se usan las funciones sin st.cache_data
+        totals = functools.cache(
+            lambda range_version=range_version, range_start=range_start, range_end=range_end:
+            compute_range_totals.__wrapped__(store, range_version, range_start, range_end)[1]
+        )
+        prefetch_plotly('energetico.sankey', key, lambda totals=totals, chart_title=chart_title: _sankey_fig(
+            totals(), chart_title, create_sankey_diagram.__wrapped__
+        ))
+        prefetch_plotly('energetico.sankey_calefaccion', key, lambda totals=totals: create_sankey_diagram_heating_system(totals()))
+
+
+@st.fragment
+@profiled('energetico.sankey')
+def _sankey_section(store):
+    """Diagramas Sankey de flujo de energía"""
+    data, version = store.snapshot()
+
     # Controles de filtrado
     col_filter1, col_filter2 = st.columns([1, 1])
     
     with col_filter1:
         view_mode = st.radio(
             "Modo de visualización:",
-            ["Total Histórico", "Por Día"],
+            ["Total Histórico", "Por Día", "Rango de Fechas"],
             horizontal=True
         )
     
-    filtered_data = data.copy()
+    # Intervalo [inicio, fin) que se resuelve con las particiones o el índice de sumas acumuladas
+    range_start, range_end = None, None
     chart_title = "Flujo de Energía - Total Histórico"
     
-    if view_mode == "Por Día":
+    if view_mode != "Total Histórico":
         with col_filter2:
             # Obtener límites de fechas
-            min_date = data['Datetime'].min().date()
-            max_date = data['Datetime'].max().date()
+            min_date = store.profile.start.date()
+            max_date = store.profile.end.date()
             
-            selected_date = st.date_input(
-                "Seleccionar día:",
-                value=min_date,
-                min_value=min_date,
-                max_value=max_date
-            )
-            
-            # Filtrar datos
-            filtered_data = data[data['Datetime'].dt.date == selected_date]
-            chart_title = f"Flujo de Energía - {selected_date.strftime('%d/%m/%Y')}"
+            if view_mode == "Por Día":
+                selected_date = st.date_input(
+                    "Seleccionar día:",
+                    value=min_date,
+                    min_value=min_date,
+                    max_value=max_date
+                )
+                range_start = pd.Timestamp(selected_date)
+                range_end = range_start + pd.Timedelta(days=1)
+                chart_title = f"Flujo de Energía - {selected_date.strftime('%d/%m/%Y')}"
+            else:
+                sankey_range = st.date_input(
+                    "Seleccionar rango:",
+                    value=(min_date, max_date),
+                    min_value=min_date,
+                    max_value=max_date,
+                    key="sankey_range_selector"
+                )
+                if isinstance(sankey_range, tuple) and len(sankey_range) == 2:
+                    first_date, last_date = sankey_range
+                else:
+                    first_date = last_date = sankey_range[0] if isinstance(sankey_range, tuple) else sankey_range
+                range_start = pd.Timestamp(first_date)
+                range_end = pd.Timestamp(last_date) + pd.Timedelta(days=1)
+                chart_title = f"Flujo de Energía - {first_date.strftime('%d/%m/%Y')} a {last_date.strftime('%d/%m/%Y')}"
+    
+    # Un día o rango ya cerrado no cambia con las filas nuevas del modo en vivo
+    sankey_version = store.range_version(range_end)
+    # Lecturas, totales y medias del intervalo
+    count, totals, means = compute_range_totals(store, sankey_version, range_start, range_end)
     
-    if filtered_data.empty:
+    if count == 0:
         st.warning(f"No hay datos disponibles para la fecha seleccionada.")
     else:
-        sankey_fig = create_sankey_diagram(filtered_data)
-        # Actualizar título del gráfico
-        sankey_fig.update_layout(title_text=chart_title)
-        st.plotly_chart(sankey_fig, width='stretch')
+        
+        kpi_cols = st.columns(4, gap='medium')
+        with kpi_cols[0]:
+            st.metric("⚡ Consumo Medio", f"{means['TotalConsumption(W)']:,.0f} W")
+        with kpi_cols[1]:
+            st.metric("🔥 Calefacción Media", f"{means['HeatingSystem(W)']:,.0f} W")
+        with kpi_cols[2]:
+            direct_share = totals['DirectConsumption(W)'] / totals['TotalConsumption(W)'] * 100 if totals['TotalConsumption(W)'] > 0 else 0
+            st.metric("☀️ Cobertura PV Directa", f"{direct_share:.1f} %")
+        with kpi_cols[3]:
+            st.metric("📋 Lecturas", f"{count:,}")
+        
+        plotly_chart('energetico.sankey', (sankey_version, view_mode, range_start, range_end),
+                     lambda: _sankey_fig(totals, chart_title), width='stretch')
 
-        sankey_heating_fig = create_sankey_diagram_heating_system(filtered_data)
-        st.plotly_chart(sankey_heating_fig, width='stretch')
+        plotly_chart('energetico.sankey_calefaccion', (sankey_version, view_mode, range_start, range_end),
+                     lambda: create_sankey_diagram_heating_system(totals), width='stretch')
         
+        if view_mode == "Por Día":
+            _prefetch_sankey_days(store, selected_date)
 
-    st.divider()
+
+def _stacked_chart(stack_data, stack_view_mode, date_format_stack, tooltip_date_format_stack, stack_title_suffix):
+    """Área apilada de las fuentes de energía (semanal o de un día)"""
+    stacked_chart = alt.Chart(stack_data).mark_area(
+        opacity=0.8
+    ).encode(
+        x=alt.X('Fecha:T', 
+                title='Fecha' if stack_view_mode == 'Semanal' else 'Hora',
+                axis=alt.Axis(format=date_format_stack, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        y=alt.Y('Potencia (W):Q', 
+                title='Potencia (W)',
+                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        color=alt.Color('Fuente:N',
+                        scale=alt.Scale(
+                            domain=['Consumo Directo (W)', 'Descarga Batería (W)', 'Suministro Externo (W)'],
+                            range=['#FF6347', '#1E90FF', '#3CB371']  # Tomato, DodgerBlue, MediumSeaGreen
+                        ),
+                        legend=alt.Legend(title='Fuente de Energía', orient='top')),
+        tooltip=[
+            alt.Tooltip('Fecha:T', 
+                        title='Semana' if stack_view_mode == 'Semanal' else 'Hora',
+                        format=tooltip_date_format_stack),
+            alt.Tooltip('Fuente:N', title='Fuente'),
+            alt.Tooltip('Potencia (W):Q', format='.2f', title='Potencia (W)')
+        ]
+    ).properties(
+        height=400,
+        title=alt.TitleParams(text=f'Fuentes de Energía{stack_title_suffix}', fontSize=18, color='#2d3748', anchor='middle')
+    ).configure(
+        background='white'
+    ).configure_view(
+        strokeWidth=0,
+        fill='white'
+    ).configure_axis(
+        gridColor='#f7fafc',
+        domainColor='#e2e8f0'
+    ).configure_legend(
+        labelColor='#2d3748',
+        titleColor='#2d3748'
+    ).interactive()
+    return stacked_chart
+
+
+def _prefetch_stack_days(store, data, selected_date):
+    """Precalcula las fuentes de energía de los días vecinos del seleccionado"""
+    for day in neighbor_days(selected_date, store.profile.start.date(), store.profile.end.date()):
+        day_version = store.range_version(pd.Timestamp(day) + pd.Timedelta(days=1))
+        prefetch_altair(
+            'energetico.fuentes', (day_version, "Diario", day),
+            lambda day=day, day_version=day_version: _stacked_chart(
+                compute_daily_stack.__wrapped__(data, day_version, day), "Diario", '%H:%M', '%H:%M',
+                f" - {day.strftime('%d/%m/%Y')}"
+            )
+        )
+
+
+@st.fragment
+@profiled('energetico.fuentes')
+def _sources_section(store):
+    """Desglose de fuentes de energía"""
+    data, version = store.snapshot()
 
     # Nueva sección: Stacked Area Chart de Fuentes de Energía
     st.subheader("📊 Desglose de Fuentes de Energía")
@@ -73,20 +292,19 @@ def render(data):
             key="stack_view_mode"
         )
     
-    # Preparar datos para stacked area chart
-    data_stack = data.copy()
-    
     if stack_view_mode == "Semanal":
         # Usar función cacheada para preparar datos semanales
-        stack_data = compute_weekly_sources(data)
+        stack_data = compute_weekly_sources(data, version)
+        stack_selection = None
+        stack_version = version
         date_format_stack = '%b %Y'
         tooltip_date_format_stack = '%d %b %Y'
         stack_title_suffix = " - Media Semanal"
     elif stack_view_mode == "Diario":
         # Vista diaria con granularidad de 15 minutos
         with col_stack2:
-            min_date = data['Datetime'].min().date()
-            max_date = data['Datetime'].max().date()
+            min_date = store.profile.start.date()
+            max_date = store.profile.end.date()
             
             selected_stack_date = st.date_input(
                 "Seleccionar día:",
@@ -97,14 +315,16 @@ def render(data):
             )
         
         # Filtrar datos para el día seleccionado (cacheado)
-        stack_data = compute_daily_stack(data, selected_stack_date)
+        stack_version = store.range_version(pd.Timestamp(selected_stack_date) + pd.Timedelta(days=1))
+        stack_data = compute_daily_stack(data, stack_version, selected_stack_date)
+        stack_selection = selected_stack_date
         date_format_stack = '%H:%M'
         tooltip_date_format_stack = '%H:%M'
         stack_title_suffix = f" - {selected_stack_date.strftime('%d/%m/%Y')}"
     else:  # Periodo Específico
         with col_stack2:
-            min_date = data['Datetime'].min().date()
-            max_date = data['Datetime'].max().date()
+            min_date = store.profile.start.date()
+            max_date = store.profile.end.date()
             
             date_range_stack = st.date_input(
                 "Seleccionar rango (zoom inicial):",
@@ -114,9 +334,6 @@ def render(data):
                 key="stack_range_selector"
             )
         
-        # Cargar TODOS los datos con granularidad de 15 minutos (cacheado)
-        stack_data_full = compute_stack_full(data)
-        
         if isinstance(date_range_stack, tuple) and len(date_range_stack) == 2:
             stack_x_range_start = pd.to_datetime(date_range_stack[0])
             stack_x_range_end = pd.to_datetime(date_range_stack[1]) + pd.Timedelta(days=1)
@@ -127,40 +344,49 @@ def render(data):
             stack_x_range_end = pd.to_datetime(single_date) + pd.Timedelta(days=1)
             days_stack = 1
         
-        st.markdown(f"<span style='color: #2d3748; font-size: 14px;'>📊 Granularidad: **15 minutos** ({days_stack} días) - Arrastra para desplazarte</span>", unsafe_allow_html=True)
+        # Detalle en el rango seleccionado y resumen del resto del histórico (cacheado)
+        stack_data_full = compute_stack_full(compute_downsampled(
+            data, version, ('DirectConsumption(W)', 'ExternalEnergySupply(W)', 'BatteryDischarging(W)'),
+            stack_x_range_start, stack_x_range_end
+        ))
+        
+        st.markdown(f"<span style='color: #2d3748; font-size: 14px;'>{downsampling_message(days_stack)}</span>", unsafe_allow_html=True)
         
         # Crear gráfico Plotly stacked area
-        fig_stack = go.Figure()
-        fig_stack.add_trace(go.Scatter(
-            x=stack_data_full['Fecha'], y=stack_data_full['Consumo Directo (W)'],
-            name='Consumo Directo', stackgroup='one', line=dict(color='#FF6347')
-        ))
-        fig_stack.add_trace(go.Scatter(
-            x=stack_data_full['Fecha'], y=stack_data_full['Descarga Batería (W)'],
-            name='Descarga Batería', stackgroup='one', line=dict(color='#1E90FF')
-        ))
-        fig_stack.add_trace(go.Scatter(
-            x=stack_data_full['Fecha'], y=stack_data_full['Suministro Externo (W)'],
-            name='Suministro Externo', stackgroup='one', line=dict(color='#3CB371')
-        ))
-        fig_stack.update_layout(
-            title={'text': 'Fuentes de Energía', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
-            xaxis=dict(
-                title=dict(text='Fecha', font=dict(color='#2d3748')),
-                range=[stack_x_range_start, stack_x_range_end],
-                rangeslider=dict(visible=True, thickness=0.05),
-                tickfont=dict(color='#2d3748')
-            ),
-            yaxis=dict(
-                title=dict(text='Potencia (W)', font=dict(color='#2d3748')),
-                gridcolor='rgba(200,200,200,0.3)',
-                tickfont=dict(color='#2d3748')
-            ),
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5, font=dict(color='#2d3748')),
-            height=500, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(l=60, r=20, t=80, b=80), hovermode='x unified'
-        )
-        st.plotly_chart(fig_stack, width='stretch')
+        def build_fig_stack():
+            fig_stack = go.Figure()
+            fig_stack.add_trace(go.Scatter(
+                x=stack_data_full['Fecha'], y=stack_data_full['Consumo Directo (W)'],
+                name='Consumo Directo', stackgroup='one', line=dict(color='#FF6347')
+            ))
+            fig_stack.add_trace(go.Scatter(
+                x=stack_data_full['Fecha'], y=stack_data_full['Descarga Batería (W)'],
+                name='Descarga Batería', stackgroup='one', line=dict(color='#1E90FF')
+            ))
+            fig_stack.add_trace(go.Scatter(
+                x=stack_data_full['Fecha'], y=stack_data_full['Suministro Externo (W)'],
+                name='Suministro Externo', stackgroup='one', line=dict(color='#3CB371')
+            ))
+            fig_stack.update_layout(
+                title={'text': 'Fuentes de Energía', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
+                xaxis=dict(
+                    title=dict(text='Fecha', font=dict(color='#2d3748')),
+                    range=[stack_x_range_start, stack_x_range_end],
+                    rangeslider=dict(visible=True, thickness=0.05),
+                    tickfont=dict(color='#2d3748')
+                ),
+                yaxis=dict(
+                    title=dict(text='Potencia (W)', font=dict(color='#2d3748')),
+                    gridcolor='rgba(200,200,200,0.3)',
+                    tickfont=dict(color='#2d3748')
+                ),
+                legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5, font=dict(color='#2d3748')),
+                height=500, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
+                margin=dict(l=60, r=20, t=80, b=80), hovermode='x unified'
+            )
+            return fig_stack
+        
+        plotly_chart('energetico.fuentes_periodo', (version, stack_x_range_start, stack_x_range_end), build_fig_stack, width='stretch')
         
         # Marcar que usamos Plotly
         stack_view_mode_plotly = True
@@ -168,47 +394,109 @@ def render(data):
     # Solo mostrar Altair si no es Periodo Específico
     if stack_view_mode != "Periodo Específico":
         # Crear stacked area chart con Altair
-        stacked_chart = alt.Chart(stack_data).mark_area(
-        opacity=0.8
+        altair_chart('energetico.fuentes', (stack_version, stack_view_mode, stack_selection),
+                     lambda: _stacked_chart(stack_data, stack_view_mode, date_format_stack, tooltip_date_format_stack, stack_title_suffix),
+                     width='stretch')
+        
+        if stack_view_mode == "Diario":
+            _prefetch_stack_days(store, data, selected_stack_date)
+
+
+def _consumption_total_chart(consumption_data, consumption_view_mode, date_format, tooltip_date_format, chart_title_suffix):
+    """Área del consumo total (semanal o de un día)"""
+    chart_total = alt.Chart(consumption_data).mark_area(
+        line={'color': '#805AD5'},  # Púrpura
+        color=alt.Gradient(
+            gradient='linear',
+            stops=[
+                alt.GradientStop(color='#805AD5', offset=0),
+                alt.GradientStop(color='rgba(128,90,213,0.1)', offset=1)
+            ],
+            x1=0, x2=0, y1=0, y2=1
+        )
     ).encode(
-        x=alt.X('Fecha:T', 
-                title='Fecha' if stack_view_mode == 'Semanal' else 'Hora',
-                axis=alt.Axis(format=date_format_stack, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-        y=alt.Y('Potencia (W):Q', 
-                title='Potencia (W)',
+        x=alt.X('Fecha:T', title='Fecha' if consumption_view_mode == 'Semanal' else 'Hora', 
+                axis=alt.Axis(format=date_format, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        y=alt.Y('Consumo Total (W):Q', title='Consumo Total (W)', 
                 axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-        color=alt.Color('Fuente:N',
-                        scale=alt.Scale(
-                            domain=['Consumo Directo (W)', 'Descarga Batería (W)', 'Suministro Externo (W)'],
-                            range=['#FF6347', '#1E90FF', '#3CB371']  # Tomato, DodgerBlue, MediumSeaGreen
-                        ),
-                        legend=alt.Legend(title='Fuente de Energía', orient='top')),
         tooltip=[
-            alt.Tooltip('Fecha:T', 
-                        title='Semana' if stack_view_mode == 'Semanal' else 'Hora',
-                        format=tooltip_date_format_stack),
-            alt.Tooltip('Fuente:N', title='Fuente'),
-            alt.Tooltip('Potencia (W):Q', format='.2f', title='Potencia (W)')
+            alt.Tooltip('Fecha:T', title='Semana' if consumption_view_mode == 'Semanal' else 'Hora', 
+                        format=tooltip_date_format),
+            alt.Tooltip('Consumo Total (W):Q', format='.2f', title='Consumo (W)')
         ]
     ).properties(
-            height=400,
-            title=alt.TitleParams(text=f'Fuentes de Energía{stack_title_suffix}', fontSize=18, color='#2d3748', anchor='middle')
-        ).configure(
-            background='white'
-        ).configure_view(
-            strokeWidth=0,
-            fill='white'
-        ).configure_axis(
-            gridColor='#f7fafc',
-            domainColor='#e2e8f0'
-        ).configure_legend(
-            labelColor='#2d3748',
-            titleColor='#2d3748'
-        ).interactive()
-        
-        st.altair_chart(stacked_chart, width='stretch')
+        height=400,
+        title=alt.TitleParams(text=f'Consumo Total{chart_title_suffix}', fontSize=18, color='#2d3748', anchor='middle')
+    ).configure(
+        background='white'
+    ).configure_view(
+        strokeWidth=0,
+        fill='white'
+    ).configure_axis(
+        gridColor='#f7fafc',
+        domainColor='#e2e8f0'
+    ).interactive()
+    return chart_total
 
-    st.divider()
+
+def _consumption_heating_chart(consumption_data, consumption_view_mode, date_format, tooltip_date_format, chart_title_suffix):
+    """Área del consumo de calefacción (semanal o de un día)"""
+    chart_heating = alt.Chart(consumption_data).mark_area(
+        line={'color': '#E53E3E'},  # Rojo para calefacción
+        color=alt.Gradient(
+            gradient='linear',
+            stops=[
+                alt.GradientStop(color='#E53E3E', offset=0),
+                alt.GradientStop(color='rgba(229,62,62,0.1)', offset=1)
+            ],
+            x1=0, x2=0, y1=0, y2=1
+        )
+    ).encode(
+        x=alt.X('Fecha:T', title='Fecha' if consumption_view_mode == 'Semanal' else 'Hora', 
+                axis=alt.Axis(format=date_format, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        y=alt.Y('Calefacción (W):Q', title='Consumo Calefacción (W)', 
+                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        tooltip=[
+            alt.Tooltip('Fecha:T', title='Semana' if consumption_view_mode == 'Semanal' else 'Hora', 
+                        format=tooltip_date_format),
+            alt.Tooltip('Calefacción (W):Q', format='.2f', title='Calefacción (W)')
+        ]
+    ).properties(
+        height=400,
+        title=alt.TitleParams(text=f'Sistema de Calefacción{chart_title_suffix}', fontSize=18, color='#2d3748', anchor='middle')
+    ).configure(
+        background='white'
+    ).configure_view(
+        strokeWidth=0,
+        fill='white'
+    ).configure_axis(
+        gridColor='#f7fafc',
+        domainColor='#e2e8f0'
+    ).interactive()
+    return chart_heating
+
+
+def _prefetch_consumption_days(store, data, selected_date):
+    """Precalcula los gráficos de consumo de los días vecinos del seleccionado"""
+    for day in neighbor_days(selected_date, store.profile.start.date(), store.profile.end.date()):
+        day_version = store.range_version(pd.Timestamp(day) + pd.Timedelta(days=1))
+        key = (day_version, "Diario", day)
+        title_suffix = f" - {day.strftime('%d/%m/%Y')}"
+        for chart_id, build_chart in (('energetico.consumo_total', _consumption_total_chart),
+                                      ('energetico.calefaccion', _consumption_heating_chart)):
+            prefetch_altair(
+                chart_id, key,
+                lambda build_chart=build_chart, day=day, day_version=day_version, title_suffix=title_suffix: build_chart(
+                    compute_daily_consumption.__wrapped__(data, day_version, day), "Diario", '%H:%M', '%H:%M', title_suffix
+                )
+            )
+
+
+@st.fragment
+@profiled('energetico.consumo')
+def _consumption_section(store):
+    """Evolución del consumo"""
+    data, version = store.snapshot()
 
     st.subheader("📈 Evolución del Consumo (2024 - 2025)")
     st.write("")
@@ -224,21 +512,20 @@ def render(data):
             key="consumption_view_mode"
         )
     
-    # Preparar datos para gráficos de consumo
-    data_hist = data.copy()
-    
     if consumption_view_mode == "Semanal":
         # Vista semanal (comportamiento actual) - cacheada
-        weekly_consumption = compute_weekly_consumption(data)
+        weekly_consumption = compute_weekly_consumption(data, version)
         consumption_data = weekly_consumption
+        consumption_selection = None
+        consumption_version = version
         date_format = '%b %Y'
         tooltip_date_format = '%d %b %Y'
         chart_title_suffix = " - Media Semanal"
     elif consumption_view_mode == "Diario":
         # Vista diaria con granularidad de 15 minutos
         with col_view2:
-            min_date = data['Datetime'].min().date()
-            max_date = data['Datetime'].max().date()
+            min_date = store.profile.start.date()
+            max_date = store.profile.end.date()
             
             selected_consumption_date = st.date_input(
                 "Seleccionar día:",
@@ -249,14 +536,16 @@ def render(data):
             )
         
         # Filtrar datos para el día seleccionado (cacheado)
-        consumption_data = compute_daily_consumption(data, selected_consumption_date)
+        consumption_version = store.range_version(pd.Timestamp(selected_consumption_date) + pd.Timedelta(days=1))
+        consumption_data = compute_daily_consumption(data, consumption_version, selected_consumption_date)
+        consumption_selection = selected_consumption_date
         date_format = '%H:%M'
         tooltip_date_format = '%H:%M'
         chart_title_suffix = f" - {selected_consumption_date.strftime('%d/%m/%Y')}"
     else:  # Periodo Específico
         with col_view2:
-            min_date = data['Datetime'].min().date()
-            max_date = data['Datetime'].max().date()
+            min_date = store.profile.start.date()
+            max_date = store.profile.end.date()
             
             date_range = st.date_input(
                 "Seleccionar rango (zoom inicial):",
@@ -266,9 +555,6 @@ def render(data):
                 key="consumption_range_selector"
             )
         
-        # Cargar TODOS los datos con granularidad de 15 minutos (cacheado)
-        consumption_data_full = compute_consumption_full(data)
-        
         if isinstance(date_range, tuple) and len(date_range) == 2:
             cons_x_range_start = pd.to_datetime(date_range[0])
             cons_x_range_end = pd.to_datetime(date_range[1]) + pd.Timedelta(days=1)
@@ -279,138 +565,96 @@ def render(data):
             cons_x_range_end = pd.to_datetime(single_date) + pd.Timedelta(days=1)
             days_cons = 1
         
-        st.markdown(f"<span style='color: #2d3748; font-size: 14px;'>📊 Granularidad: **15 minutos** ({days_cons} días) - Arrastra para desplazarte</span>", unsafe_allow_html=True)
+        # Detalle en el rango seleccionado y resumen del resto del histórico (cacheado)
+        consumption_data_full = compute_consumption_full(compute_downsampled(
+            data, version, ('TotalConsumption(W)', 'HeatingSystem(W)'),
+            cons_x_range_start, cons_x_range_end
+        ))
+        
+        st.markdown(f"<span style='color: #2d3748; font-size: 14px;'>{downsampling_message(days_cons)}</span>", unsafe_allow_html=True)
         
         # Crear gráficos Plotly
         cols_plotly_cons = st.columns(2, gap='large')
         
         with cols_plotly_cons[0]:
-            fig_cons_total = go.Figure()
-            fig_cons_total.add_trace(go.Scatter(
-                x=consumption_data_full['Fecha'], y=consumption_data_full['Consumo Total (W)'],
-                mode='lines', name='Consumo Total', line=dict(color='#805AD5', width=2),
-                fill='tozeroy', fillcolor='rgba(128, 90, 213, 0.1)'
-            ))
-            fig_cons_total.update_layout(
-                title={'text': 'Consumo Total', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
-                xaxis=dict(
-                    title=dict(text='Fecha', font=dict(color='#2d3748')),
-                    range=[cons_x_range_start, cons_x_range_end],
-                    rangeslider=dict(visible=True, thickness=0.05),
-                    tickfont=dict(color='#2d3748')
-                ),
-                yaxis=dict(
-                    title=dict(text='Consumo Total (W)', font=dict(color='#2d3748')),
-                    gridcolor='rgba(200,200,200,0.3)',
-                    tickfont=dict(color='#2d3748')
-                ),
-                height=450, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
-                margin=dict(l=60, r=20, t=60, b=80)
-            )
-            st.plotly_chart(fig_cons_total, width='stretch')
+            def build_fig_cons_total():
+                fig_cons_total = go.Figure()
+                fig_cons_total.add_trace(go.Scatter(
+                    x=consumption_data_full['Fecha'], y=consumption_data_full['Consumo Total (W)'],
+                    mode='lines', name='Consumo Total', line=dict(color='#805AD5', width=2),
+                    fill='tozeroy', fillcolor='rgba(128, 90, 213, 0.1)'
+                ))
+                fig_cons_total.update_layout(
+                    title={'text': 'Consumo Total', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
+                    xaxis=dict(
+                        title=dict(text='Fecha', font=dict(color='#2d3748')),
+                        range=[cons_x_range_start, cons_x_range_end],
+                        rangeslider=dict(visible=True, thickness=0.05),
+                        tickfont=dict(color='#2d3748')
+                    ),
+                    yaxis=dict(
+                        title=dict(text='Consumo Total (W)', font=dict(color='#2d3748')),
+                        gridcolor='rgba(200,200,200,0.3)',
+                        tickfont=dict(color='#2d3748')
+                    ),
+                    height=450, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
+                    margin=dict(l=60, r=20, t=60, b=80)
+                )
+                return fig_cons_total
+            
+            plotly_chart('energetico.consumo_total_periodo', (version, cons_x_range_start, cons_x_range_end), build_fig_cons_total, width='stretch')
         
         with cols_plotly_cons[1]:
-            fig_cons_heating = go.Figure()
-            fig_cons_heating.add_trace(go.Scatter(
-                x=consumption_data_full['Fecha'], y=consumption_data_full['Calefacción (W)'],
-                mode='lines', name='Calefacción', line=dict(color='#E53E3E', width=2),
-                fill='tozeroy', fillcolor='rgba(229, 62, 62, 0.1)'
-            ))
-            fig_cons_heating.update_layout(
-                title={'text': 'Sistema de Calefacción', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
-                xaxis=dict(
-                    title=dict(text='Fecha', font=dict(color='#2d3748')),
-                    range=[cons_x_range_start, cons_x_range_end],
-                    rangeslider=dict(visible=True, thickness=0.05),
-                    tickfont=dict(color='#2d3748')
-                ),
-                yaxis=dict(
-                    title=dict(text='Calefacción (W)', font=dict(color='#2d3748')),
-                    gridcolor='rgba(200,200,200,0.3)',
-                    tickfont=dict(color='#2d3748')
-                ),
-                height=450, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
-                margin=dict(l=60, r=20, t=60, b=80)
-            )
-            st.plotly_chart(fig_cons_heating, width='stretch')
+            def build_fig_cons_heating():
+                fig_cons_heating = go.Figure()
+                fig_cons_heating.add_trace(go.Scatter(
+                    x=consumption_data_full['Fecha'], y=consumption_data_full['Calefacción (W)'],
+                    mode='lines', name='Calefacción', line=dict(color='#E53E3E', width=2),
+                    fill='tozeroy', fillcolor='rgba(229, 62, 62, 0.1)'
+                ))
+                fig_cons_heating.update_layout(
+                    title={'text': 'Sistema de Calefacción', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
+                    xaxis=dict(
+                        title=dict(text='Fecha', font=dict(color='#2d3748')),
+                        range=[cons_x_range_start, cons_x_range_end],
+                        rangeslider=dict(visible=True, thickness=0.05),
+                        tickfont=dict(color='#2d3748')
+                    ),
+                    yaxis=dict(
+                        title=dict(text='Calefacción (W)', font=dict(color='#2d3748')),
+                        gridcolor='rgba(200,200,200,0.3)',
+                        tickfont=dict(color='#2d3748')
+                    ),
+                    height=450, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
+                    margin=dict(l=60, r=20, t=60, b=80)
+                )
+                return fig_cons_heating
+            
+            plotly_chart('energetico.calefaccion_periodo', (version, cons_x_range_start, cons_x_range_end), build_fig_cons_heating, width='stretch')
     
     # Solo mostrar Altair si no es Periodo Específico
     if consumption_view_mode != "Periodo Específico":
         cols = st.columns(2, gap='large')
 
         with cols[0]:
-            chart_total = alt.Chart(consumption_data).mark_area(
-                line={'color': '#805AD5'},  # Púrpura
-                color=alt.Gradient(
-                    gradient='linear',
-                    stops=[
-                        alt.GradientStop(color='#805AD5', offset=0),
-                        alt.GradientStop(color='rgba(128,90,213,0.1)', offset=1)
-                    ],
-                    x1=0, x2=0, y1=0, y2=1
-                )
-            ).encode(
-                x=alt.X('Fecha:T', title='Fecha' if consumption_view_mode == 'Semanal' else 'Hora', 
-                        axis=alt.Axis(format=date_format, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-                y=alt.Y('Consumo Total (W):Q', title='Consumo Total (W)', 
-                        axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-                tooltip=[
-                    alt.Tooltip('Fecha:T', title='Semana' if consumption_view_mode == 'Semanal' else 'Hora', 
-                                format=tooltip_date_format),
-                    alt.Tooltip('Consumo Total (W):Q', format='.2f', title='Consumo (W)')
-                ]
-            ).properties(
-                height=400,
-                title=alt.TitleParams(text=f'Consumo Total{chart_title_suffix}', fontSize=18, color='#2d3748', anchor='middle')
-            ).configure(
-                background='white'
-            ).configure_view(
-                strokeWidth=0,
-                fill='white'
-            ).configure_axis(
-                gridColor='#f7fafc',
-                domainColor='#e2e8f0'
-            ).interactive()
-        
-            st.altair_chart(chart_total, width='stretch')
+            altair_chart('energetico.consumo_total', (consumption_version, consumption_view_mode, consumption_selection),
+                         lambda: _consumption_total_chart(consumption_data, consumption_view_mode, date_format, tooltip_date_format, chart_title_suffix),
+                         width='stretch')
 
         with cols[1]:
-            chart_heating = alt.Chart(consumption_data).mark_area(
-                line={'color': '#E53E3E'},  # Rojo para calefacción
-                color=alt.Gradient(
-                    gradient='linear',
-                    stops=[
-                        alt.GradientStop(color='#E53E3E', offset=0),
-                        alt.GradientStop(color='rgba(229,62,62,0.1)', offset=1)
-                    ],
-                    x1=0, x2=0, y1=0, y2=1
-                )
-            ).encode(
-                x=alt.X('Fecha:T', title='Fecha' if consumption_view_mode == 'Semanal' else 'Hora', 
-                        axis=alt.Axis(format=date_format, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-                y=alt.Y('Calefacción (W):Q', title='Consumo Calefacción (W)', 
-                        axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-                tooltip=[
-                    alt.Tooltip('Fecha:T', title='Semana' if consumption_view_mode == 'Semanal' else 'Hora', 
-                                format=tooltip_date_format),
-                    alt.Tooltip('Calefacción (W):Q', format='.2f', title='Calefacción (W)')
-                ]
-            ).properties(
-                height=400,
-                title=alt.TitleParams(text=f'Sistema de Calefacción{chart_title_suffix}', fontSize=18, color='#2d3748', anchor='middle')
-            ).configure(
-                background='white'
-            ).configure_view(
-                strokeWidth=0,
-                fill='white'
-            ).configure_axis(
-                gridColor='#f7fafc',
-                domainColor='#e2e8f0'
-            ).interactive()
+            altair_chart('energetico.calefaccion', (consumption_version, consumption_view_mode, consumption_selection),
+                         lambda: _consumption_heating_chart(consumption_data, consumption_view_mode, date_format, tooltip_date_format, chart_title_suffix),
+                         width='stretch')
         
-            st.altair_chart(chart_heating, width='stretch')
+        if consumption_view_mode == "Diario":
+            _prefetch_consumption_days(store, data, selected_consumption_date)
 
-    st.divider()
+
+@st.fragment
+@profiled('energetico.correlacion')
+def _correlation_section(store):
+    """Correlación consumo vs meteorología"""
+    data, version = store.snapshot()
 
     # Nueva sección: Scatter Plots de Correlación
     st.subheader("🔗 Correlación Consumo vs Variables Meteorológicas")
@@ -427,8 +671,8 @@ def render(data):
         }
         
         # Obtener meses disponibles en los datos
-        available_months = sorted(data['Datetime'].dt.month.unique())
-        available_years = sorted(data['Datetime'].dt.year.unique())
+        available_months = store.profile.months
+        available_years = store.profile.years
         
         # Selector de mes (por defecto Enero)
         selected_month = st.selectbox(
@@ -450,115 +694,36 @@ def render(data):
         </div>
         """, unsafe_allow_html=True)
 
-    # Preparar datos para scatter plots con franja horaria (cacheado)
-    scatter_data_full = compute_scatter_data(data)
-    
-    # Filtrar datos por el mes seleccionado
-    scatter_data = scatter_data_full[scatter_data_full['Datetime'].dt.month == selected_month].copy()
+    # Puntos del mes seleccionado: el filtrado solo se hace si falta alguna spec en caché
+    scatter_data = functools.cache(lambda: month_rows(compute_scatter_data(data, version), selected_month))
+    points = compute_month_counts(data, version, 'consumo').get(selected_month, 0)
     
     # Mostrar contador de puntos
-    st.markdown(f"<span style='color: #718096; font-size: 13px;'>Total de puntos en {month_names[selected_month]}: {len(scatter_data):,}</span>", unsafe_allow_html=True)
+    st.markdown(f"<span style='color: #718096; font-size: 13px;'>Total de puntos en {month_names[selected_month]}: {points:,}{density_mode_note(points)}</span>", unsafe_allow_html=True)
     st.write("")
-    
-    # Colores para cada franja horaria (paleta distinguible)
-    time_slot_colors = [
-        '#1E3A5F',  # 00-04: Azul oscuro (noche profunda)
-        '#6366F1',  # 04-08: Índigo (amanecer)
-        '#F59E0B',  # 08-12: Ámbar (mañana)
-        '#EF4444',  # 12-16: Rojo (mediodía)
-        '#F97316',  # 16-20: Naranja (tarde)
-        '#8B5CF6'   # 20-24: Violeta (noche)
-    ]
-    
-    time_slot_domain = ['00:00 - 04:00', '04:00 - 08:00', '08:00 - 12:00', 
-                        '12:00 - 16:00', '16:00 - 20:00', '20:00 - 24:00']
-
-    # Selección interactiva para filtrar por franja horaria (clickable en leyenda)
-    selection1 = alt.selection_point(fields=['Franja Horaria'], bind='legend')
-    selection2 = alt.selection_point(fields=['Franja Horaria'], bind='legend')
-    selection3 = alt.selection_point(fields=['Franja Horaria'], bind='legend')
-    selection4 = alt.selection_point(fields=['Franja Horaria'], bind='legend')
 
     # Primera fila: Consumo Total vs Temperatura y Radiación
     scatter_cols1 = st.columns(2, gap='large')
 
     with scatter_cols1[0]:
-        scatter_temp_total = alt.Chart(scatter_data).mark_circle(
-            size=30
-        ).encode(
-            x=alt.X('Temperatura (°C):Q', 
-                    title='Temperatura (°C)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            y=alt.Y('Consumo Total (W):Q', 
-                    title='Consumo Total (W)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            color=alt.Color('Franja Horaria:N',
-                            scale=alt.Scale(domain=time_slot_domain, range=time_slot_colors),
-                            legend=alt.Legend(title='Franja Horaria (click para filtrar)', orient='right')),
-            opacity=alt.condition(selection1, alt.value(0.6), alt.value(0.05)),
-            tooltip=[
-                alt.Tooltip('Franja Horaria:N', title='Hora'),
-                alt.Tooltip('Temperatura (°C):Q', format='.2f'),
-                alt.Tooltip('Consumo Total (W):Q', format='.2f')
-            ]
-        ).add_params(
-            selection1
-        ).properties(
-            height=400,
-            title=alt.TitleParams(text='Consumo Total vs Temperatura', fontSize=18, color='#2d3748', anchor='middle')
-        ).configure(
-            background='white'
-        ).configure_view(
-            strokeWidth=0,
-            fill='white'
-        ).configure_axis(
-            gridColor='#f7fafc',
-            domainColor='#e2e8f0'
-        ).configure_legend(
-            labelColor='#2d3748',
-            titleColor='#2d3748'
-        ).interactive()
+        def build_scatter_temp_total():
+            scatter_temp_total = correlation_scatter(
+                scatter_data(), version, 'consumo', selected_month,
+                'Temperatura (°C)', 'Consumo Total (W)', 'Consumo Total (W)', 'Consumo Total vs Temperatura'
+            )
+            return scatter_temp_total
         
-        st.altair_chart(scatter_temp_total, width='stretch')
+        altair_chart('energetico.scatter_consumo_temperatura', (version, selected_month), build_scatter_temp_total, width='stretch')
 
     with scatter_cols1[1]:
-        scatter_rad_total = alt.Chart(scatter_data).mark_circle(
-            size=30
-        ).encode(
-            x=alt.X('Radiación (W/m²):Q', 
-                    title='Radiación (W/m²)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            y=alt.Y('Consumo Total (W):Q', 
-                    title='Consumo Total (W)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            color=alt.Color('Franja Horaria:N',
-                            scale=alt.Scale(domain=time_slot_domain, range=time_slot_colors),
-                            legend=alt.Legend(title='Franja Horaria (click para filtrar)', orient='right')),
-            opacity=alt.condition(selection2, alt.value(0.6), alt.value(0.05)),
-            tooltip=[
-                alt.Tooltip('Franja Horaria:N', title='Hora'),
-                alt.Tooltip('Radiación (W/m²):Q', format='.2f'),
-                alt.Tooltip('Consumo Total (W):Q', format='.2f')
-            ]
-        ).add_params(
-            selection2
-        ).properties(
-            height=400,
-            title=alt.TitleParams(text='Consumo Total vs Radiación', fontSize=18, color='#2d3748', anchor='middle')
-        ).configure(
-            background='white'
-        ).configure_view(
-            strokeWidth=0,
-            fill='white'
-        ).configure_axis(
-            gridColor='#f7fafc',
-            domainColor='#e2e8f0'
-        ).configure_legend(
-            labelColor='#2d3748',
-            titleColor='#2d3748'
-        ).interactive()
+        def build_scatter_rad_total():
+            scatter_rad_total = correlation_scatter(
+                scatter_data(), version, 'consumo', selected_month,
+                'Radiación (W/m²)', 'Consumo Total (W)', 'Consumo Total (W)', 'Consumo Total vs Radiación'
+            )
+            return scatter_rad_total
         
-        st.altair_chart(scatter_rad_total, width='stretch')
+        altair_chart('energetico.scatter_consumo_radiacion', (version, selected_month), build_scatter_rad_total, width='stretch')
 
     st.write("")
 
@@ -566,84 +731,31 @@ def render(data):
     scatter_cols2 = st.columns(2, gap='large')
 
     with scatter_cols2[0]:
-        scatter_temp_heating = alt.Chart(scatter_data).mark_circle(
-            size=30
-        ).encode(
-            x=alt.X('Temperatura (°C):Q', 
-                    title='Temperatura (°C)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            y=alt.Y('Calefacción (W):Q', 
-                    title='Consumo Calefacción (W)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            color=alt.Color('Franja Horaria:N',
-                            scale=alt.Scale(domain=time_slot_domain, range=time_slot_colors),
-                            legend=alt.Legend(title='Franja Horaria (click para filtrar)', orient='right')),
-            opacity=alt.condition(selection3, alt.value(0.6), alt.value(0.05)),
-            tooltip=[
-                alt.Tooltip('Franja Horaria:N', title='Hora'),
-                alt.Tooltip('Temperatura (°C):Q', format='.2f'),
-                alt.Tooltip('Calefacción (W):Q', format='.2f')
-            ]
-        ).add_params(
-            selection3
-        ).properties(
-            height=400,
-            title=alt.TitleParams(text='Calefacción vs Temperatura', fontSize=18, color='#2d3748', anchor='middle')
-        ).configure(
-            background='white'
-        ).configure_view(
-            strokeWidth=0,
-            fill='white'
-        ).configure_axis(
-            gridColor='#f7fafc',
-            domainColor='#e2e8f0'
-        ).configure_legend(
-            labelColor='#2d3748',
-            titleColor='#2d3748'
-        ).interactive()
+        def build_scatter_temp_heating():
+            scatter_temp_heating = correlation_scatter(
+                scatter_data(), version, 'consumo', selected_month,
+                'Temperatura (°C)', 'Calefacción (W)', 'Consumo Calefacción (W)', 'Calefacción vs Temperatura'
+            )
+            return scatter_temp_heating
         
-        st.altair_chart(scatter_temp_heating, width='stretch')
+        altair_chart('energetico.scatter_calefaccion_temperatura', (version, selected_month), build_scatter_temp_heating, width='stretch')
 
     with scatter_cols2[1]:
-        scatter_rad_heating = alt.Chart(scatter_data).mark_circle(
-            size=30
-        ).encode(
-            x=alt.X('Radiación (W/m²):Q', 
-                    title='Radiación (W/m²)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            y=alt.Y('Calefacción (W):Q', 
-                    title='Consumo Calefacción (W)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            color=alt.Color('Franja Horaria:N',
-                            scale=alt.Scale(domain=time_slot_domain, range=time_slot_colors),
-                            legend=alt.Legend(title='Franja Horaria (click para filtrar)', orient='right')),
-            opacity=alt.condition(selection4, alt.value(0.6), alt.value(0.05)),
-            tooltip=[
-                alt.Tooltip('Franja Horaria:N', title='Hora'),
-                alt.Tooltip('Radiación (W/m²):Q', format='.2f'),
-                alt.Tooltip('Calefacción (W):Q', format='.2f')
-            ]
-        ).add_params(
-            selection4
-        ).properties(
-            height=400,
-            title=alt.TitleParams(text='Calefacción vs Radiación', fontSize=18, color='#2d3748', anchor='middle')
-        ).configure(
-            background='white'
-        ).configure_view(
-            strokeWidth=0,
-            fill='white'
-        ).configure_axis(
-            gridColor='#f7fafc',
-            domainColor='#e2e8f0'
-        ).configure_legend(
-            labelColor='#2d3748',
-            titleColor='#2d3748'
-        ).interactive()
+        def build_scatter_rad_heating():
+            scatter_rad_heating = correlation_scatter(
+                scatter_data(), version, 'consumo', selected_month,
+                'Radiación (W/m²)', 'Calefacción (W)', 'Consumo Calefacción (W)', 'Calefacción vs Radiación'
+            )
+            return scatter_rad_heating
         
-        st.altair_chart(scatter_rad_heating, width='stretch')
+        altair_chart('energetico.scatter_calefaccion_radiacion', (version, selected_month), build_scatter_rad_heating, width='stretch')
 
-    st.divider()
+
+@st.fragment
+@profiled('energetico.pv')
+def _pv_section(store):
+    """Generación PV vs meteorología"""
+    data, version = store.snapshot()
 
     # Scatter plots de Generación PV vs Variables Meteorológicas (solo cuando hay radiación)
     st.subheader("☀️ Generación Fotovoltaica vs Variables Meteorológicas")
@@ -662,7 +774,7 @@ def render(data):
         }
         
         # Obtener meses disponibles en los datos
-        available_months_pv = sorted(data['Datetime'].dt.month.unique())
+        available_months_pv = store.profile.months
         
         # Selector de mes (por defecto Enero)
         selected_month_pv = st.selectbox(
@@ -684,101 +796,42 @@ def render(data):
         </div>
         """, unsafe_allow_html=True)
 
-    # Filtrar datos donde hay radiación solar > 0 (cacheado)
-    pv_data_full = compute_pv_data(data)
-    
-    # Filtrar datos por el mes seleccionado
-    pv_data = pv_data_full[pv_data_full['Datetime'].dt.month == selected_month_pv].copy()
+    # Puntos con radiación solar > 0 del mes seleccionado: el filtrado solo se hace si falta alguna spec en caché
+    pv_data = functools.cache(lambda: month_rows(compute_pv_data(data, version), selected_month_pv))
+    points_pv = compute_month_counts(data, version, 'pv').get(selected_month_pv, 0)
     
     # Mostrar contador de puntos
-    st.markdown(f"<span style='color: #718096; font-size: 13px;'>Total de puntos en {month_names_pv[selected_month_pv]}: {len(pv_data):,}</span>", unsafe_allow_html=True)
+    st.markdown(f"<span style='color: #718096; font-size: 13px;'>Total de puntos en {month_names_pv[selected_month_pv]}: {points_pv:,}{density_mode_note(points_pv)}</span>", unsafe_allow_html=True)
     st.write("")
 
-    # Selecciones interactivas para los scatter plots de PV
-    selection_pv1 = alt.selection_point(fields=['Franja Horaria'], bind='legend')
-    selection_pv2 = alt.selection_point(fields=['Franja Horaria'], bind='legend')
-
     scatter_pv_cols = st.columns(2, gap='large')
 
     with scatter_pv_cols[0]:
-        scatter_pv_temp = alt.Chart(pv_data).mark_circle(
-            size=30
-        ).encode(
-            x=alt.X('Temperatura (°C):Q', 
-                    title='Temperatura (°C)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            y=alt.Y('Generación PV (W):Q', 
-                    title='Generación PV (W)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            color=alt.Color('Franja Horaria:N',
-                            scale=alt.Scale(domain=time_slot_domain, range=time_slot_colors),
-                            legend=alt.Legend(title='Franja Horaria (click para filtrar)', orient='right')),
-            opacity=alt.condition(selection_pv1, alt.value(0.6), alt.value(0.05)),
-            tooltip=[
-                alt.Tooltip('Franja Horaria:N', title='Hora'),
-                alt.Tooltip('Temperatura (°C):Q', format='.2f'),
-                alt.Tooltip('Generación PV (W):Q', format='.2f')
-            ]
-        ).add_params(
-            selection_pv1
-        ).properties(
-            height=400,
-            title=alt.TitleParams(text='Generación PV vs Temperatura', fontSize=18, color='#2d3748', anchor='middle')
-        ).configure(
-            background='white'
-        ).configure_view(
-            strokeWidth=0,
-            fill='white'
-        ).configure_axis(
-            gridColor='#f7fafc',
-            domainColor='#e2e8f0'
-        ).configure_legend(
-            labelColor='#2d3748',
-            titleColor='#2d3748'
-        ).interactive()
+        def build_scatter_pv_temp():
+            scatter_pv_temp = correlation_scatter(
+                pv_data(), version, 'pv', selected_month_pv,
+                'Temperatura (°C)', 'Generación PV (W)', 'Generación PV (W)', 'Generación PV vs Temperatura'
+            )
+            return scatter_pv_temp
         
-        st.altair_chart(scatter_pv_temp, width='stretch')
+        altair_chart('energetico.scatter_pv_temperatura', (version, selected_month_pv), build_scatter_pv_temp, width='stretch')
 
     with scatter_pv_cols[1]:
-        scatter_pv_rad = alt.Chart(pv_data).mark_circle(
-            size=30
-        ).encode(
-            x=alt.X('Radiación (W/m²):Q', 
-                    title='Radiación (W/m²)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            y=alt.Y('Generación PV (W):Q', 
-                    title='Generación PV (W)',
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            color=alt.Color('Franja Horaria:N',
-                            scale=alt.Scale(domain=time_slot_domain, range=time_slot_colors),
-                            legend=alt.Legend(title='Franja Horaria (click para filtrar)', orient='right')),
-            opacity=alt.condition(selection_pv2, alt.value(0.6), alt.value(0.05)),
-            tooltip=[
-                alt.Tooltip('Franja Horaria:N', title='Hora'),
-                alt.Tooltip('Radiación (W/m²):Q', format='.2f'),
-                alt.Tooltip('Generación PV (W):Q', format='.2f')
-            ]
-        ).add_params(
-            selection_pv2
-        ).properties(
-            height=400,
-            title=alt.TitleParams(text='Generación PV vs Radiación', fontSize=18, color='#2d3748', anchor='middle')
-        ).configure(
-            background='white'
-        ).configure_view(
-            strokeWidth=0,
-            fill='white'
-        ).configure_axis(
-            gridColor='#f7fafc',
-            domainColor='#e2e8f0'
-        ).configure_legend(
-            labelColor='#2d3748',
-            titleColor='#2d3748'
-        ).interactive()
+        def build_scatter_pv_rad():
+            scatter_pv_rad = correlation_scatter(
+                pv_data(), version, 'pv', selected_month_pv,
+                'Radiación (W/m²)', 'Generación PV (W)', 'Generación PV (W)', 'Generación PV vs Radiación'
+            )
+            return scatter_pv_rad
         
-        st.altair_chart(scatter_pv_rad, width='stretch')
+        altair_chart('energetico.scatter_pv_radiacion', (version, selected_month_pv), build_scatter_pv_rad, width='stretch')
 
-    st.divider()
+
+@st.fragment
+@profiled('energetico.combinado')
+def _combined_section(store):
+    """Vista combinada de todas las variables"""
+    data, version = store.snapshot()
 
     # Gráfico Combinado de Todas las Variables (Meteorología + Consumo)
     st.subheader("🌍 Vista Combinada - Todas las Variables")
@@ -794,14 +847,18 @@ def render(data):
             key="hist_combined_range_option"
         )
     
-    # Preparar datos raw (15 minutos)
-    hist_combined_raw = data[['Datetime', 'temperature', 'precipitation', 'radiation', 
-                                'TotalConsumption(W)', 'HeatingSystem(W)']].copy()
-    hist_combined_raw.columns = ['Fecha', 'Temperatura (°C)', 'Precipitación (mm/h)', 'Radiación (W/m²)',
-                                    'Consumo Total (W)', 'Calefacción (W)']
+    # Columnas raw (15 minutos) y sus nombres en el gráfico
+    hist_combined_columns = {
+        'Datetime': 'Fecha',
+        'temperature': 'Temperatura (°C)',
+        'precipitation': 'Precipitación (mm/h)',
+        'radiation': 'Radiación (W/m²)',
+        'TotalConsumption(W)': 'Consumo Total (W)',
+        'HeatingSystem(W)': 'Calefacción (W)'
+    }
     
-    min_date_hist = hist_combined_raw['Fecha'].min()
-    max_date_hist = hist_combined_raw['Fecha'].max()
+    min_date_hist = store.profile.start
+    max_date_hist = store.profile.end
     
     # Definir rango inicial de zoom
     x_range_start_hist = None
@@ -821,31 +878,24 @@ def render(data):
             x_range_start_hist = pd.to_datetime(hist_combined_date_range[0])
             x_range_end_hist = pd.to_datetime(hist_combined_date_range[1]) + pd.Timedelta(days=1)
             days_selected_hist = (hist_combined_date_range[1] - hist_combined_date_range[0]).days
-            
-            # Usar datos con granularidad de 15 minutos para rango personalizado
-            hist_combined_data = hist_combined_raw.copy()
-            hist_granularity_msg = f"📊 Granularidad: **15 minutos** ({days_selected_hist} días) - Arrastra para desplazarte"
         else:
             single_date_hist = hist_combined_date_range if not isinstance(hist_combined_date_range, tuple) else hist_combined_date_range[0]
             x_range_start_hist = pd.to_datetime(single_date_hist)
             x_range_end_hist = pd.to_datetime(single_date_hist) + pd.Timedelta(days=1)
-            
-            # Usar datos con granularidad de 15 minutos
-            hist_combined_data = hist_combined_raw.copy()
-            hist_granularity_msg = "📊 Granularidad: **15 minutos** (1 día) - Arrastra para desplazarte"
+            days_selected_hist = 1
+        
+        # Detalle de 15 minutos en el rango seleccionado, resumen fuera (cacheado)
+        hist_combined_data = frame_view(compute_downsampled(
+            data, version, tuple(list(hist_combined_columns)[1:]), x_range_start_hist, x_range_end_hist
+        ), hist_combined_columns)
+        hist_granularity_msg = downsampling_message(days_selected_hist)
     else:
         # Todo el periodo - agregar por día para mejor visualización
-        hist_combined_raw['Dia'] = hist_combined_raw['Fecha'].dt.date
-        hist_combined_data = hist_combined_raw.groupby('Dia').agg({
-            'Temperatura (°C)': 'mean',
-            'Precipitación (mm/h)': 'mean', 
-            'Radiación (W/m²)': 'mean',
-            'Consumo Total (W)': 'mean',
-            'Calefacción (W)': 'mean'
-        }).reset_index()
+        hist_combined_data = compute_daily_means(
+            data, version, ('temperature', 'precipitation', 'radiation', 'TotalConsumption(W)', 'HeatingSystem(W)')
+        )
         hist_combined_data.columns = ['Fecha', 'Temperatura (°C)', 'Precipitación (mm/h)', 
                                         'Radiación (W/m²)', 'Consumo Total (W)', 'Calefacción (W)']
-        hist_combined_data['Fecha'] = pd.to_datetime(hist_combined_data['Fecha'])
         hist_granularity_msg = "📊 Granularidad: **Diaria** (todo el periodo)"
     
     st.markdown(f"<span style='color: #2d3748; font-size: 14px;'>{hist_granularity_msg}</span>", unsafe_allow_html=True)
@@ -877,138 +927,172 @@ def render(data):
     # Crear gráfico con 3 ejes Y
     from plotly.subplots import make_subplots
     
-    fig_hist_combined = make_subplots(specs=[[{"secondary_y": True}]])
-    
-    # Temperatura
-    fig_hist_combined.add_trace(
-        go.Scatter(
-            x=hist_combined_data['Fecha'],
-            y=hist_combined_data['Temperatura (°C)'],
-            name='Temperatura (°C)',
-            line=dict(color='#EF4444', width=2.5, shape='spline'),
-            mode='lines'
-        ),
-        secondary_y=False
-    )
-    
-    # Consumo Total
-    fig_hist_combined.add_trace(
-        go.Scatter(
-            x=hist_combined_data['Fecha'],
-            y=hist_combined_data['Consumo Total (W)'],
-            name='Consumo Total (W)',
-            line=dict(color='#805AD5', width=2.5, shape='spline'),
-            mode='lines'
-        ),
-        secondary_y=True
-    )
-    
-    # Calefacción (tercer eje)
-    fig_hist_combined.add_trace(
-        go.Scatter(
-            x=hist_combined_data['Fecha'],
-            y=hist_combined_data['Calefacción (W)'],
-            name='Calefacción (W)',
-            line=dict(color='#38A169', width=2.5, shape='spline'),
-            mode='lines',
-            yaxis='y3'
+    def build_fig_hist_combined():
+        fig_hist_combined = make_subplots(specs=[[{"secondary_y": True}]])
+    
+        # Temperatura
+        fig_hist_combined.add_trace(
+            go.Scatter(
+                x=hist_combined_data['Fecha'],
+                y=hist_combined_data['Temperatura (°C)'],
+                name='Temperatura (°C)',
+                line=dict(color='#EF4444', width=2.5, shape='spline'),
+                mode='lines'
+            ),
+            secondary_y=False
         )
-    )
-    
-    # Radiación (cuarto eje)
-    fig_hist_combined.add_trace(
-        go.Scatter(
-            x=hist_combined_data['Fecha'],
-            y=hist_combined_data['Radiación (W/m²)'],
-            name='Radiación (W/m²)',
-            line=dict(color='#F97316', width=2, shape='spline', dash='dot'),
-            mode='lines',
-            yaxis='y4'
+    
+        # Consumo Total
+        fig_hist_combined.add_trace(
+            go.Scatter(
+                x=hist_combined_data['Fecha'],
+                y=hist_combined_data['Consumo Total (W)'],
+                name='Consumo Total (W)',
+                line=dict(color='#805AD5', width=2.5, shape='spline'),
+                mode='lines'
+            ),
+            secondary_y=True
         )
-    )
-    
-    fig_hist_combined.update_layout(
-        title={
-            'text': 'Variables Combinadas: Meteorología + Consumo',
-            'x': 0.5,
-            'xanchor': 'center',
-            'font': {'size': 20, 'color': '#2d3748', 'family': 'Poppins'}
-        },
-        xaxis=dict(
-            title=dict(text='Fecha', font=dict(color='#2d3748')),
-            tickfont=dict(color='#2d3748'),
-            gridcolor='rgba(200, 200, 200, 0.3)',
-            domain=[0.12, 0.82],
-            type='date',
-            range=[x_range_start_hist, x_range_end_hist] if x_range_start_hist is not None else None,
-            rangeslider=dict(visible=True, thickness=0.05)
-        ),
-        yaxis=dict(
-            title=dict(text='Temperatura (°C)', font=dict(color='#EF4444')),
-            tickfont=dict(color='#EF4444'),
-            gridcolor='rgba(200, 200, 200, 0.3)',
-            side='left',
-            range=[min_temp_range_hist, max_temp_range_hist],
-            fixedrange=False,
-            zeroline=True,
-            zerolinecolor='rgba(150, 150, 150, 0.5)',
-            zerolinewidth=1
-        ),
-        yaxis2=dict(
-            title=dict(text='Consumo Total (W)', font=dict(color='#805AD5')),
-            tickfont=dict(color='#805AD5'),
-            overlaying='y',
-            side='right',
-            position=0.82,
-            range=[min_consumption_range_hist, max_consumption_range_hist],
-            showgrid=False,
-            fixedrange=False,
-            zeroline=True,
-            zerolinecolor='rgba(150, 150, 150, 0.5)',
-            zerolinewidth=1
-        ),
-        yaxis3=dict(
-            title=dict(text='Calefacción (W)', font=dict(color='#38A169')),
-            tickfont=dict(color='#38A169'),
-            overlaying='y',
-            side='right',
-            position=0.91,
-            range=[min_consumption_range_hist, max_consumption_range_hist],
-            showgrid=False,
-            fixedrange=False,
-            zeroline=True,
-            zerolinecolor='rgba(150, 150, 150, 0.5)',
-            zerolinewidth=1
-        ),
-        yaxis4=dict(
-            title=dict(text='Radiación (W/m²)', font=dict(color='#F97316')),
-            tickfont=dict(color='#F97316'),
-            overlaying='y',
-            side='left',
-            position=0.05,
-            range=[min_rad_range_hist, max_rad_range_hist],
-            showgrid=False,
-            fixedrange=False,
-            zeroline=True,
-            zerolinecolor='rgba(150, 150, 150, 0.5)',
-            zerolinewidth=1
-        ),
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='center',
-            x=0.5,
-            font=dict(color='#2d3748')
-        ),
-        height=600,
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='white',
-        margin=dict(l=80, r=80, t=80, b=80),
-        hovermode='x unified'
-    )
-    
-    st.plotly_chart(fig_hist_combined, width='stretch')
+    
+        # Calefacción (tercer eje)
+        fig_hist_combined.add_trace(
+            go.Scatter(
+                x=hist_combined_data['Fecha'],
+                y=hist_combined_data['Calefacción (W)'],
+                name='Calefacción (W)',
+                line=dict(color='#38A169', width=2.5, shape='spline'),
+                mode='lines',
+                yaxis='y3'
+            )
+        )
+    
+        # Radiación (cuarto eje)
+        fig_hist_combined.add_trace(
+            go.Scatter(
+                x=hist_combined_data['Fecha'],
+                y=hist_combined_data['Radiación (W/m²)'],
+                name='Radiación (W/m²)',
+                line=dict(color='#F97316', width=2, shape='spline', dash='dot'),
+                mode='lines',
+                yaxis='y4'
+            )
+        )
+    
+        fig_hist_combined.update_layout(
+            title={
+                'text': 'Variables Combinadas: Meteorología + Consumo',
+                'x': 0.5,
+                'xanchor': 'center',
+                'font': {'size': 20, 'color': '#2d3748', 'family': 'Poppins'}
+            },
+            xaxis=dict(
+                title=dict(text='Fecha', font=dict(color='#2d3748')),
+                tickfont=dict(color='#2d3748'),
+                gridcolor='rgba(200, 200, 200, 0.3)',
+                domain=[0.12, 0.82],
+                type='date',
+                range=[x_range_start_hist, x_range_end_hist] if x_range_start_hist is not None else None,
+                rangeslider=dict(visible=True, thickness=0.05)
+            ),
+            yaxis=dict(
+                title=dict(text='Temperatura (°C)', font=dict(color='#EF4444')),
+                tickfont=dict(color='#EF4444'),
+                gridcolor='rgba(200, 200, 200, 0.3)',
+                side='left',
+                range=[min_temp_range_hist, max_temp_range_hist],
+                fixedrange=False,
+                zeroline=True,
+                zerolinecolor='rgba(150, 150, 150, 0.5)',
+                zerolinewidth=1
+            ),
+            yaxis2=dict(
+                title=dict(text='Consumo Total (W)', font=dict(color='#805AD5')),
+                tickfont=dict(color='#805AD5'),
+                overlaying='y',
+                side='right',
+                position=0.82,
+                range=[min_consumption_range_hist, max_consumption_range_hist],
+                showgrid=False,
+                fixedrange=False,
+                zeroline=True,
+                zerolinecolor='rgba(150, 150, 150, 0.5)',
+                zerolinewidth=1
+            ),
+            yaxis3=dict(
+                title=dict(text='Calefacción (W)', font=dict(color='#38A169')),
+                tickfont=dict(color='#38A169'),
+                overlaying='y',
+                side='right',
+                position=0.91,
+                range=[min_consumption_range_hist, max_consumption_range_hist],
+                showgrid=False,
+                fixedrange=False,
+                zeroline=True,
+                zerolinecolor='rgba(150, 150, 150, 0.5)',
+                zerolinewidth=1
+            ),
+            yaxis4=dict(
+                title=dict(text='Radiación (W/m²)', font=dict(color='#F97316')),
+                tickfont=dict(color='#F97316'),
+                overlaying='y',
+                side='left',
+                position=0.05,
+                range=[min_rad_range_hist, max_rad_range_hist],
+                showgrid=False,
+                fixedrange=False,
+                zeroline=True,
+                zerolinecolor='rgba(150, 150, 150, 0.5)',
+                zerolinewidth=1
+            ),
+            legend=dict(
+                orientation='h',
+                yanchor='bottom',
+                y=1.02,
+                xanchor='center',
+                x=0.5,
+                font=dict(color='#2d3748')
+            ),
+            height=600,
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='white',
+            margin=dict(l=80, r=80, t=80, b=80),
+            hovermode='x unified'
+        )
+        return fig_hist_combined
+    
+    plotly_chart('energetico.combinado', (version, hist_combined_range_option, x_range_start_hist, x_range_end_hist), build_fig_hist_combined, width='stretch')
+
+
+def render(store):
+    """Renderiza la página de datos energéticos"""
+    st.title("📊 Datos Energéticos")
+
+    # Menú de navegación
+    show_navigation_menu()
+    live_mode_toggle(store)
+
+    # Cada sección es un fragmento: sus widgets solo relanzan esa sección
+    _sankey_section(store)
+
+    st.divider()
+
+    _sources_section(store)
+
+    st.divider()
+
+    _consumption_section(store)
+
+    st.divider()
+
+    _correlation_section(store)
+
+    st.divider()
+
+    _pv_section(store)
+
+    st.divider()
+
+    _combined_section(store)
 
 
 # ============================================================================
@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 import altair as alt
 from datetime import datetime
@@ -8,7 +7,19 @@ import importlib.util
 import os
 from pathlib import Path
 from utils import show_navigation_menu
-import base64
+from schema import BATCH_SCHEMA, apply_schema
+from export import download_button
+from paged_table import paged_table
+from uploads import file_version, parse_timestamps, read_header, read_upload, recall_frame, remember_frame, upload_digest
+
+
+# Ficheros de cada modelo: su versión forma parte de la clave de las predicciones en caché
+OUTPUT_DIR = Path(__file__).parent.parent / "output"
+MODEL_FILES = {
+    "Time-of-Week (ToW)": [OUTPUT_DIR / "data_06_Changepoint_Pars_summ_TOW2.csv"],
+    "Cluster-PRED (CART)": [OUTPUT_DIR / "data_09_Changepoint_Pars_summ_CLUST_PRED.csv",
+                            OUTPUT_DIR / "data_09_cart_model.pkl"],
+}
 
 
 def render(data):
@@ -144,64 +155,85 @@ def render(data):
                 solar_column = st.text_input("Columna Irradiación", value="Solar Irradiation")
             
             try:
-                # Cargar CSV
-                df_batch = pd.read_csv(uploaded_file, sep=separator, encoding=encoding)
-                
-                st.success(f"✅ Archivo cargado: {len(df_batch)} filas, {len(df_batch.columns)} columnas")
+                # Cabecera del CSV (solo la primera línea)
+                header = read_header(uploaded_file, sep=separator, encoding=encoding)
                 
                 with st.expander("📋 Columnas disponibles"):
-                    st.write(", ".join(df_batch.columns.tolist()))
+                    st.write(", ".join(header))
                 
                 # Validar columnas
                 missing_cols = []
-                if time_column not in df_batch.columns:
+                if time_column not in header:
                     missing_cols.append(time_column)
-                if temp_column not in df_batch.columns:
+                if temp_column not in header:
                     missing_cols.append(temp_column)
-                if solar_column not in df_batch.columns:
+                if solar_column not in header:
                     missing_cols.append(solar_column)
                 
                 if missing_cols:
                     st.error(f"❌ Columnas no encontradas: {', '.join(missing_cols)}")
                 else:
-                    # Renombrar columnas
-                    df_batch = df_batch.rename(columns={
-                        time_column: 'time',
-                        temp_column: 'Temperature',
-                        solar_column: 'Solar Irradiation'
-                    })
+                    # Lote parseado en caché por contenido del fichero y opciones de lectura
+                    batch_key = (upload_digest(uploaded_file), separator, encoding,
+                                 time_column, temp_column, solar_column)
+                    df_batch = recall_frame(('batch', *batch_key))
+                    
+                    if df_batch is None:
+                        # Cargar solo las columnas del modelo con tipos explícitos
+                        df_batch = read_upload(
+                            uploaded_file, sep=separator, encoding=encoding,
+                            usecols=list(dict.fromkeys([time_column, temp_column, solar_column])),
+                            dtypes={temp_column: 'float64', solar_column: 'float64'},
+                            time_column=time_column
+                        )
+                        
+                        # Renombrar columnas
+                        df_batch = df_batch.rename(columns={
+                            time_column: 'time',
+                            temp_column: 'Temperature',
+                            solar_column: 'Solar Irradiation'
+                        })
+                        
+                        # Procesar timestamps
+                        with st.spinner("Procesando timestamps..."):
+                            try:
+                                df_batch['datetime'] = parse_timestamps(df_batch['time'])
+                                df_batch['timestamp_week'] = df_batch['datetime'].dt.dayofweek * 24 + df_batch['datetime'].dt.hour
+                                # Tipos declarados para los lotes
+                                df_batch = apply_schema(df_batch, BATCH_SCHEMA)
+                            except Exception as e:
+                                st.error(f"❌ Error procesando timestamps: {e}")
+                                st.stop()
+                        
+                        remember_frame(('batch', *batch_key), df_batch)
                     
+                    st.success(f"✅ Archivo cargado: {len(df_batch)} filas, {len(header)} columnas")
                     st.success("✅ Mapeo de columnas exitoso")
                     
                     with st.expander("📋 Vista previa (primeras 10 filas)"):
-                        st.dataframe(df_batch.head(10))
+                        st.dataframe(df_batch[['time', 'Temperature', 'Solar Irradiation']].head(10))
                     
-                    # Procesar timestamps
-                    with st.spinner("Procesando timestamps..."):
-                        try:
-                            df_batch['datetime'] = pd.to_datetime(df_batch['time'])
-                            df_batch['timestamp_week'] = df_batch['datetime'].dt.dayofweek * 24 + df_batch['datetime'].dt.hour
-                            st.success("✅ Timestamps procesados")
-                        except Exception as e:
-                            st.error(f"❌ Error procesando timestamps: {e}")
-                            st.stop()
+                    st.success("✅ Timestamps procesados")
                     
                     # Botón de predicción
+                    result_key = ('prediction', *batch_key, model_type, file_version(*MODEL_FILES[model_type]))
                     if st.button("🚀 Ejecutar Predicción por Lotes", type="primary", width='stretch'):
                         try:
                             with st.spinner("Generando predicciones..."):
+                                # El lote en caché no se modifica: las predicciones van en una copia
+                                df_result = df_batch.copy()
                                 if model_type == "Time-of-Week (ToW)":
                                     result = service.predict_batch_tow(
-                                        df_batch['timestamp_week'].values.tolist(),
-                                        df_batch['Temperature'].values.tolist(),
-                                        df_batch['Solar Irradiation'].values.tolist()
+                                        df_result['timestamp_week'].values.tolist(),
+                                        df_result['Temperature'].values.tolist(),
+                                        df_result['Solar Irradiation'].values.tolist()
                                     )
                                     predictions = np.array(result["predictions"])
                                 else:  # Cluster-PRED
                                     predictions = []
                                     cluster_predictions = []
                                     
-                                    for idx, row in df_batch.iterrows():
+                                    for idx, row in df_result.iterrows():
                                         result = service.predict_cluster_pred(
                                             row['datetime'].strftime("%Y-%m-%d %H:%M:%S"),
                                             row['Temperature'],
@@ -211,277 +243,261 @@ def render(data):
                                         cluster_predictions.append(result["cluster_hour"])
                                     
                                     predictions = np.array(predictions)
-                                    df_batch['predicted_cluster'] = cluster_predictions
+                                    df_result['predicted_cluster'] = cluster_predictions
                                 
                                 # Añadir predicciones (en W)
-                                df_batch['predicted_power_w'] = predictions
-                                df_batch['predicted_power_kw'] = predictions / 1000
+                                df_result['predicted_power_w'] = predictions
+                                df_result['predicted_power_kw'] = predictions / 1000
+                                remember_frame(result_key, df_result)
                                 
                                 st.success(f"✅ Predicciones completadas: {len(predictions)} puntos procesados")
-                                
-                                # Estadísticas
-                                st.markdown("#### 📈 Estadísticas de Predicción")
-                                col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
-                                
-                                with col_stat1:
-                                    st.metric("Media", f"{predictions.mean():.0f} W")
-                                with col_stat2:
-                                    st.metric("Desv. Est.", f"{predictions.std():.0f} W")
-                                with col_stat3:
-                                    st.metric("Mínimo", f"{predictions.min():.0f} W")
-                                with col_stat4:
-                                    st.metric("Máximo", f"{predictions.max():.0f} W")
-                                
-                                # Visualizaciones
-                                st.markdown("#### 📊 Visualización de Resultados")
-                                
-                                # Gráfico 1: Potencia Predicha en el Tiempo
-                                chart_power = alt.Chart(df_batch).mark_line(
-                                    color='#805AD5',
-                                    strokeWidth=2
-                                ).encode(
-                                    x=alt.X('datetime:T', 
-                                            title='Tiempo',
-                                            axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                    y=alt.Y('predicted_power_w:Q', 
-                                            title='Potencia (W)',
-                                            axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                    tooltip=[
-                                        alt.Tooltip('datetime:T', title='Tiempo', format='%Y-%m-%d %H:%M'),
-                                        alt.Tooltip('predicted_power_w:Q', title='Potencia (W)', format=',.0f'),
-                                        alt.Tooltip('predicted_power_kw:Q', title='Potencia (kW)', format='.2f')
-                                    ]
-                                ).properties(
-                                    title=alt.TitleParams(text='Carga Térmica Predicha en el Tiempo', fontSize=18, color='#2d3748', anchor='middle'),
-                                    height=300
-                                ).configure(
-                                    background='white'
-                                ).configure_view(
-                                    strokeWidth=0,
-                                    fill='white'
-                                ).configure_axis(
-                                    gridColor='#f7fafc',
-                                    domainColor='#e2e8f0'
-                                ).interactive()
-                                
-                                st.altair_chart(chart_power, width='stretch')
-                                
-                                # Gráfico 2: Temperatura
-                                chart_temp = alt.Chart(df_batch).mark_line(
-                                    color='#EF4444',
-                                    strokeWidth=2
-                                ).encode(
-                                    x=alt.X('datetime:T', 
-                                            title='Tiempo',
-                                            axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                    y=alt.Y('Temperature:Q', 
-                                            title='Temperatura (°C)',
-                                            axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                    tooltip=[
-                                        alt.Tooltip('datetime:T', title='Tiempo', format='%Y-%m-%d %H:%M'),
-                                        alt.Tooltip('Temperature:Q', title='Temperatura', format='.1f')
-                                    ]
-                                ).properties(
-                                    title=alt.TitleParams(text='Temperatura en el Tiempo', fontSize=18, color='#2d3748', anchor='middle'),
-                                    height=250
-                                ).configure(
-                                    background='white'
-                                ).configure_view(
-                                    strokeWidth=0,
-                                    fill='white'
-                                ).configure_axis(
-                                    gridColor='#f7fafc',
-                                    domainColor='#e2e8f0'
-                                ).interactive()
-                                
-                                st.altair_chart(chart_temp, width='stretch')
-                                
-                                # Gráfico 3: Irradiación Solar
-                                chart_solar = alt.Chart(df_batch).mark_line(
-                                    color='#F59E0B',
-                                    strokeWidth=2
-                                ).encode(
-                                    x=alt.X('datetime:T', 
-                                            title='Tiempo',
-                                            axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                    y=alt.Y('Solar Irradiation:Q', 
-                                            title='Irradiación Solar (W/m²)',
-                                            axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                    tooltip=[
-                                        alt.Tooltip('datetime:T', title='Tiempo', format='%Y-%m-%d %H:%M'),
-                                        alt.Tooltip('Solar Irradiation:Q', title='Irradiación', format='.1f')
-                                    ]
-                                ).properties(
-                                    title=alt.TitleParams(text='Irradiación Solar en el Tiempo', fontSize=18, color='#2d3748', anchor='middle'),
-                                    height=250
-                                ).configure(
-                                    background='white'
-                                ).configure_view(
-                                    strokeWidth=0,
-                                    fill='white'
-                                ).configure_axis(
-                                    gridColor='#f7fafc',
-                                    domainColor='#e2e8f0'
-                                ).interactive()
-                                
-                                st.altair_chart(chart_solar, width='stretch')
-                                
-                                # Scatter plots
-                                st.markdown("#### 🔬 Relaciones entre Variables")
-                                
-                                col_scatter1, col_scatter2 = st.columns(2)
-                                
-                                with col_scatter1:
-                                    scatter_temp = alt.Chart(df_batch).mark_circle(
-                                        size=60,
-                                        opacity=0.6,
-                                        color='#EF4444'
-                                    ).encode(
-                                        x=alt.X('Temperature:Q', 
-                                                title='Temperatura (°C)',
-                                                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                        y=alt.Y('predicted_power_w:Q', 
-                                                title='Potencia Predicha (W)',
-                                                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                        tooltip=[
-                                            alt.Tooltip('Temperature:Q', title='Temperatura', format='.1f'),
-                                            alt.Tooltip('predicted_power_w:Q', title='Potencia (W)', format=',.0f'),
-                                            alt.Tooltip('datetime:T', title='Tiempo', format='%Y-%m-%d %H:%M')
-                                        ]
-                                    ).properties(
-                                        title=alt.TitleParams(text='Potencia vs Temperatura', fontSize=18, color='#2d3748', anchor='middle'),
-                                        height=350
-                                    ).configure(
-                                        background='white'
-                                    ).configure_view(
-                                        strokeWidth=0,
-                                        fill='white'
-                                    ).configure_axis(
-                                        gridColor='#f7fafc',
-                                        domainColor='#e2e8f0'
-                                    ).interactive()
-                                    
-                                    st.altair_chart(scatter_temp, width='stretch')
-                                
-                                with col_scatter2:
-                                    scatter_solar = alt.Chart(df_batch).mark_circle(
-                                        size=60,
-                                        opacity=0.6,
-                                        color='#F59E0B'
-                                    ).encode(
-                                        x=alt.X('Solar Irradiation:Q', 
-                                                title='Irradiación Solar (W/m²)',
-                                                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                        y=alt.Y('predicted_power_w:Q', 
-                                                title='Potencia Predicha (W)',
-                                                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                        tooltip=[
-                                            alt.Tooltip('Solar Irradiation:Q', title='Irradiación', format='.1f'),
-                                            alt.Tooltip('predicted_power_w:Q', title='Potencia (W)', format=',.0f'),
-                                            alt.Tooltip('datetime:T', title='Tiempo', format='%Y-%m-%d %H:%M')
-                                        ]
-                                    ).properties(
-                                        title=alt.TitleParams(text='Potencia vs Irradiación Solar', fontSize=18, color='#2d3748', anchor='middle'),
-                                        height=350
-                                    ).configure(
-                                        background='white'
-                                    ).configure_view(
-                                        strokeWidth=0,
-                                        fill='white'
-                                    ).configure_axis(
-                                        gridColor='#f7fafc',
-                                        domainColor='#e2e8f0'
-                                    ).interactive()
-                                    
-                                    st.altair_chart(scatter_solar, width='stretch')
-                                
-                                # Distribución de clusters (si aplica)
-                                if model_type == "Cluster-PRED (CART)" and 'predicted_cluster' in df_batch.columns:
-                                    st.markdown("#### 🎯 Distribución de Clusters")
-                                    
-                                    cluster_counts = df_batch['predicted_cluster'].value_counts().reset_index()
-                                    cluster_counts.columns = ['cluster', 'count']
-                                    cluster_counts = cluster_counts.sort_values('cluster')
-                                    
-                                    chart_clusters = alt.Chart(cluster_counts).mark_bar(
-                                        color='#805AD5'
-                                    ).encode(
-                                        x=alt.X('cluster:O', 
-                                                title='Cluster-Hora',
-                                                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                        y=alt.Y('count:Q', 
-                                                title='Frecuencia',
-                                                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
-                                        tooltip=[
-                                            alt.Tooltip('cluster:O', title='Cluster'),
-                                            alt.Tooltip('count:Q', title='Frecuencia')
-                                        ]
-                                    ).properties(
-                                        title=alt.TitleParams(text='Distribución de Clusters Predichos', fontSize=18, color='#2d3748', anchor='middle'),
-                                        height=300
-                                    ).configure(
-                                        background='white'
-                                    ).configure_view(
-                                        strokeWidth=0,
-                                        fill='white'
-                                    ).configure_axis(
-                                        gridColor='#f7fafc',
-                                        domainColor='#e2e8f0'
-                                    ).interactive()
-                                    
-                                    st.altair_chart(chart_clusters, width='stretch')
-                                
-                                # Tabla de resultados
-                                st.markdown("#### 📋 Tabla de Resultados")
-                                
-                                display_cols = ['time', 'Temperature', 'Solar Irradiation', 
-                                              'predicted_power_w', 'predicted_power_kw']
-                                if 'predicted_cluster' in df_batch.columns:
-                                    display_cols.insert(3, 'predicted_cluster')
-                                
-                                st.dataframe(df_batch[display_cols], height=300)
-                                
-                                # Botones de descarga
-                                st.markdown("#### 💾 Descargar Resultados")
-                                
-                                col_download1, col_download2 = st.columns(2)
-                                
-                                with col_download1:
-                                    csv_output = df_batch[display_cols].to_csv(index=False)
-                                    # Enlace de descarga estilizado (fondo blanco, texto oscuro)
-                                    try:
-                                        b64 = base64.b64encode(csv_output.encode()).decode()
-                                        href = f"data:text/csv;base64,{b64}"
-                                        filename_dl = f"predicciones_{model_type.replace(' ', '_').lower()}.csv"
-                                        html = f'<a download="{filename_dl}" href="{href}" style="background: white; color: #2d3748; padding: 8px 12px; border-radius: 8px; border: 1px solid #e2e8f0; text-decoration: none; display: inline-block;">📥 Descargar CSV (Resultados)</a>'
-                                        st.markdown(html, unsafe_allow_html=True)
-                                    except Exception:
-                                        st.download_button(
-                                            label="📥 Descargar CSV (Resultados)",
-                                            data=csv_output,
-                                            file_name=f"predicciones_{model_type.replace(' ', '_').lower()}.csv",
-                                            mime="text/csv"
-                                        )
-                                
-                                with col_download2:
-                                    csv_full = df_batch.to_csv(index=False)
-                                    try:
-                                        b64_full = base64.b64encode(csv_full.encode()).decode()
-                                        href_full = f"data:text/csv;base64,{b64_full}"
-                                        filename_full = f"predicciones_completo_{model_type.replace(' ', '_').lower()}.csv"
-                                        html_full = f'<a download="{filename_full}" href="{href_full}" style="background: white; color: #2d3748; padding: 8px 12px; border-radius: 8px; border: 1px solid #e2e8f0; text-decoration: none; display: inline-block;">📥 Descargar CSV (Completo)</a>'
-                                        st.markdown(html_full, unsafe_allow_html=True)
-                                    except Exception:
-                                        st.download_button(
-                                            label="📥 Descargar CSV (Completo)",
-                                            data=csv_full,
-                                            file_name=f"predicciones_completo_{model_type.replace(' ', '_').lower()}.csv",
-                                            mime="text/csv"
-                                        )
                         
                         except Exception as e:
                             st.error(f"❌ Error en predicción: {e}")
                             st.exception(e)
+                    
+                    # Resultados en caché: siguen visibles en los reruns mientras no
+                    # cambien el fichero, las opciones de lectura ni el modelo
+                    df_result = recall_frame(result_key)
+                    if df_result is not None:
+                        predictions = df_result['predicted_power_w'].to_numpy()
+                        
+                        # Estadísticas
+                        st.markdown("#### 📈 Estadísticas de Predicción")
+                        col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
+                        
+                        with col_stat1:
+                            st.metric("Media", f"{predictions.mean():.0f} W")
+                        with col_stat2:
+                            st.metric("Desv. Est.", f"{predictions.std():.0f} W")
+                        with col_stat3:
+                            st.metric("Mínimo", f"{predictions.min():.0f} W")
+                        with col_stat4:
+                            st.metric("Máximo", f"{predictions.max():.0f} W")
+                        
+                        # Visualizaciones
+                        st.markdown("#### 📊 Visualización de Resultados")
+                        
+                        # Gráfico 1: Potencia Predicha en el Tiempo
+                        chart_power = alt.Chart(df_result).mark_line(
+                            color='#805AD5',
+                            strokeWidth=2
+                        ).encode(
+                            x=alt.X('datetime:T', 
+                                    title='Tiempo',
+                                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                            y=alt.Y('predicted_power_w:Q', 
+                                    title='Potencia (W)',
+                                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                            tooltip=[
+                                alt.Tooltip('datetime:T', title='Tiempo', format='%Y-%m-%d %H:%M'),
+                                alt.Tooltip('predicted_power_w:Q', title='Potencia (W)', format=',.0f'),
+                                alt.Tooltip('predicted_power_kw:Q', title='Potencia (kW)', format='.2f')
+                            ]
+                        ).properties(
+                            title=alt.TitleParams(text='Carga Térmica Predicha en el Tiempo', fontSize=18, color='#2d3748', anchor='middle'),
+                            height=300
+                        ).configure(
+                            background='white'
+                        ).configure_view(
+                            strokeWidth=0,
+                            fill='white'
+                        ).configure_axis(
+                            gridColor='#f7fafc',
+                            domainColor='#e2e8f0'
+                        ).interactive()
+                        
+                        st.altair_chart(chart_power, width='stretch')
+                        
+                        # Gráfico 2: Temperatura
+                        chart_temp = alt.Chart(df_result).mark_line(
+                            color='#EF4444',
+                            strokeWidth=2
+                        ).encode(
+                            x=alt.X('datetime:T', 
+                                    title='Tiempo',
+                                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                            y=alt.Y('Temperature:Q', 
+                                    title='Temperatura (°C)',
+                                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                            tooltip=[
+                                alt.Tooltip('datetime:T', title='Tiempo', format='%Y-%m-%d %H:%M'),
+                                alt.Tooltip('Temperature:Q', title='Temperatura', format='.1f')
+                            ]
+                        ).properties(
+                            title=alt.TitleParams(text='Temperatura en el Tiempo', fontSize=18, color='#2d3748', anchor='middle'),
+                            height=250
+                        ).configure(
+                            background='white'
+                        ).configure_view(
+                            strokeWidth=0,
+                            fill='white'
+                        ).configure_axis(
+                            gridColor='#f7fafc',
+                            domainColor='#e2e8f0'
+                        ).interactive()
+                        
+                        st.altair_chart(chart_temp, width='stretch')
+                        
+                        # Gráfico 3: Irradiación Solar
+                        chart_solar = alt.Chart(df_result).mark_line(
+                            color='#F59E0B',
+                            strokeWidth=2
+                        ).encode(
+                            x=alt.X('datetime:T', 
+                                    title='Tiempo',
+                                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                            y=alt.Y('Solar Irradiation:Q', 
+                                    title='Irradiación Solar (W/m²)',
+                                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                            tooltip=[
+                                alt.Tooltip('datetime:T', title='Tiempo', format='%Y-%m-%d %H:%M'),
+                                alt.Tooltip('Solar Irradiation:Q', title='Irradiación', format='.1f')
+                            ]
+                        ).properties(
+                            title=alt.TitleParams(text='Irradiación Solar en el Tiempo', fontSize=18, color='#2d3748', anchor='middle'),
+                            height=250
+                        ).configure(
+                            background='white'
+                        ).configure_view(
+                            strokeWidth=0,
+                            fill='white'
+                        ).configure_axis(
+                            gridColor='#f7fafc',
+                            domainColor='#e2e8f0'
+                        ).interactive()
+                        
+                        st.altair_chart(chart_solar, width='stretch')
+                        
+                        # Scatter plots
+                        st.markdown("#### 🔬 Relaciones entre Variables")
+                        
+                        col_scatter1, col_scatter2 = st.columns(2)
+                        
+                        with col_scatter1:
+                            scatter_temp = alt.Chart(df_result).mark_circle(
+                                size=60,
+                                opacity=0.6,
+                                color='#EF4444'
+                            ).encode(
+                                x=alt.X('Temperature:Q', 
+                                        title='Temperatura (°C)',
+                                        axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                                y=alt.Y('predicted_power_w:Q', 
+                                        title='Potencia Predicha (W)',
+                                        axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                                tooltip=[
+                                    alt.Tooltip('Temperature:Q', title='Temperatura', format='.1f'),
+                                    alt.Tooltip('predicted_power_w:Q', title='Potencia (W)', format=',.0f'),
+                                    alt.Tooltip('datetime:T', title='Tiempo', format='%Y-%m-%d %H:%M')
+                                ]
+                            ).properties(
+                                title=alt.TitleParams(text='Potencia vs Temperatura', fontSize=18, color='#2d3748', anchor='middle'),
+                                height=350
+                            ).configure(
+                                background='white'
+                            ).configure_view(
+                                strokeWidth=0,
+                                fill='white'
+                            ).configure_axis(
+                                gridColor='#f7fafc',
+                                domainColor='#e2e8f0'
+                            ).interactive()
+                            
+                            st.altair_chart(scatter_temp, width='stretch')
+                        
+                        with col_scatter2:
+                            scatter_solar = alt.Chart(df_result).mark_circle(
+                                size=60,
+                                opacity=0.6,
+                                color='#F59E0B'
+                            ).encode(
+                                x=alt.X('Solar Irradiation:Q', 
+                                        title='Irradiación Solar (W/m²)',
+                                        axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                                y=alt.Y('predicted_power_w:Q', 
+                                        title='Potencia Predicha (W)',
+                                        axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                                tooltip=[
+                                    alt.Tooltip('Solar Irradiation:Q', title='Irradiación', format='.1f'),
+                                    alt.Tooltip('predicted_power_w:Q', title='Potencia (W)', format=',.0f'),
+                                    alt.Tooltip('datetime:T', title='Tiempo', format='%Y-%m-%d %H:%M')
+                                ]
+                            ).properties(
+                                title=alt.TitleParams(text='Potencia vs Irradiación Solar', fontSize=18, color='#2d3748', anchor='middle'),
+                                height=350
+                            ).configure(
+                                background='white'
+                            ).configure_view(
+                                strokeWidth=0,
+                                fill='white'
+                            ).configure_axis(
+                                gridColor='#f7fafc',
+                                domainColor='#e2e8f0'
+                            ).interactive()
+                            
+                            st.altair_chart(scatter_solar, width='stretch')
+                        
+                        # Distribución de clusters (si aplica)
+                        if model_type == "Cluster-PRED (CART)" and 'predicted_cluster' in df_result.columns:
+                            st.markdown("#### 🎯 Distribución de Clusters")
+                            
+                            cluster_counts = df_result['predicted_cluster'].value_counts().reset_index()
+                            cluster_counts.columns = ['cluster', 'count']
+                            cluster_counts = cluster_counts.sort_values('cluster')
+                            
+                            chart_clusters = alt.Chart(cluster_counts).mark_bar(
+                                color='#805AD5'
+                            ).encode(
+                                x=alt.X('cluster:O', 
+                                        title='Cluster-Hora',
+                                        axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                                y=alt.Y('count:Q', 
+                                        title='Frecuencia',
+                                        axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748')),
+                                tooltip=[
+                                    alt.Tooltip('cluster:O', title='Cluster'),
+                                    alt.Tooltip('count:Q', title='Frecuencia')
+                                ]
+                            ).properties(
+                                title=alt.TitleParams(text='Distribución de Clusters Predichos', fontSize=18, color='#2d3748', anchor='middle'),
+                                height=300
+                            ).configure(
+                                background='white'
+                            ).configure_view(
+                                strokeWidth=0,
+                                fill='white'
+                            ).configure_axis(
+                                gridColor='#f7fafc',
+                                domainColor='#e2e8f0'
+                            ).interactive()
+                            
+                            st.altair_chart(chart_clusters, width='stretch')
+                        
+                        # Tabla de resultados
+                        st.markdown("#### 📋 Tabla de Resultados")
+                        
+                        display_cols = ['time', 'Temperature', 'Solar Irradiation', 
+                                      'predicted_power_w', 'predicted_power_kw']
+                        if 'predicted_cluster' in df_result.columns:
+                            display_cols.insert(3, 'predicted_cluster')
+                        
+                        paged_table(df_result, key="batch_results", columns=display_cols, version=result_key)
+                        
+                        # Botones de descarga
+                        st.markdown("#### 💾 Descargar Resultados")
+                        
+                        col_download1, col_download2 = st.columns(2)
+                        
+                        model_slug = model_type.replace(' ', '_').lower()
+                        # Exportación a fichero temporal al pulsar (sin CSV en base64 en la página)
+                        with col_download1:
+                            download_button("📥 Descargar CSV (Resultados)", df_result[display_cols],
+                                            f"predicciones_{model_slug}", key="download_results")
+                        
+                        with col_download2:
+                            download_button("📥 Descargar CSV (Completo)", df_result,
+                                            f"predicciones_completo_{model_slug}", key="download_full")
             
             except Exception as e:
                 st.error(f"❌ Error leyendo CSV: {e}")
@@ -1,12 +1,13 @@
-import base64
 from pathlib import Path
 
 import altair as alt
 import numpy as np
-import pandas as pd
 import streamlit as st
 
 from utils import show_navigation_menu
+from uploads import parse_timestamps, read_upload
+from export import download_button
+from paged_table import paged_table
 
 
 def render():
@@ -79,7 +80,8 @@ def render():
         enc = st.selectbox("Codificación", ["utf-8", "latin-1", "iso-8859-1", "cp1252"], index=0)
 
     try:
-        df = pd.read_csv(uploaded_csv, sep=sep, encoding=enc)
+        # Motor pyarrow; las medidas se quedan en float64 (entradas del modelo)
+        df = read_upload(uploaded_csv, sep=sep, encoding=enc)
     except Exception as exc:
         st.error(f"No se pudo leer el CSV: {exc}")
         return
@@ -174,7 +176,7 @@ def render():
 
         if time_col != "(ninguna)":
             try:
-                df_out["datetime_pred"] = pd.to_datetime(df_out[time_col])
+                df_out["datetime_pred"] = parse_timestamps(df_out[time_col])
                 chart = (
                     alt.Chart(df_out)
                     .mark_line(color="#805AD5", strokeWidth=2)
@@ -195,24 +197,7 @@ def render():
                 st.warning("No se pudo graficar con la columna seleccionada.")
 
         st.markdown("#### 📋 Resultados")
-        st.dataframe(df_out[required_features + ["pv_pred_w", "pv_pred_kw"]], height=300)
+        paged_table(df_out, key="pv_results", columns=required_features + ["pv_pred_w", "pv_pred_kw"])
 
-        csv_out = df_out.to_csv(index=False)
-        try:
-            b64 = base64.b64encode(csv_out.encode()).decode()
-            href = f"data:text/csv;base64,{b64}"
-            html = (
-                f'<a download="predicciones_pv.csv" href="{href}" '
-                "style='background: white; color: #2d3748; padding: 8px 12px; "
-                "border-radius: 8px; border: 1px solid #e2e8f0; text-decoration: none;'>"
-                "📥 Descargar CSV</a>"
-            )
-            st.markdown(html, unsafe_allow_html=True)
-        except Exception:
-            st.download_button(
-                label="📥 Descargar CSV",
-                data=csv_out,
-                file_name="predicciones_pv.csv",
-                mime="text/csv",
-            )
+        download_button("📥 Descargar CSV", df_out, "predicciones_pv", key="download_pv")
 
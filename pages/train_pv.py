@@ -9,6 +9,7 @@ from sklearn.model_selection import train_test_split
 from sklearn.svm import SVR
 
 from utils import show_navigation_menu
+from uploads import read_upload
 
 
 def render():
@@ -41,7 +42,7 @@ def render():
         return
 
     try:
-        df = pd.read_csv(uploaded)
+        df = read_upload(uploaded)
     except Exception as exc:
         st.error(f"No se pudo leer el CSV: {exc}")
         return
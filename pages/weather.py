@@ -3,69 +3,191 @@ import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import altair as alt
-from utils import show_navigation_menu
+from data_store import frame_view
+from chart_cache import altair_chart, plotly_chart
+from live import live_mode_toggle
+from paged_table import paged_table
+from prefetch import neighbor_days, prefetch_altair
+from profiler import profiled
+from utils import (
+    compute_daily_means,
+    compute_daily_weather,
+    compute_downsampled,
+    compute_weekly_weather,
+    downsampling_message,
+    show_navigation_menu,
+)
 
 
-def render(data, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, radiation_min, radiation_max):
-    """Renderiza la página de meteorología"""
-    st.title("🌤️ Datos Meteorológicos")
-    
-    # Menú de navegación
-    show_navigation_menu()
-    
-    # Sección de métricas
-    st.markdown("### 📊 Resumen de Datos")
-    
-    # Temperatura
-    with st.container():
-        cols = st.columns(4, gap='medium')
-        
-        with cols[0]:
-            st.metric("🌡️ Temp. Máxima", f"{temp_max:.2f} °C")
-        
-        with cols[1]:
-            st.metric("❄️ Temp. Mínima", f"{temp_min:.2f} °C")
-        
-        with cols[2]:
-            st.metric("💧 Precip. Máxima", f"{prec_max:.2f} mm/h")
-        
-        with cols[3]:
-            st.metric("💧 Precip. Mínima", f"{prec_min:.2f} mm/h")
-
-    # Viento y Radiación
-    with st.container():
-        cols = st.columns(4, gap='medium')
-        
-        with cols[0]:
-            st.metric("💨 Viento Máx.", f"{wind_max:.2f} km/h")
-        
-        with cols[1]:
-            st.metric("🍃 Viento Mín.", f"{wind_min:.2f} km/h")
-        
-        with cols[2]:
-            st.metric("☀️ Radiación Máx.", f"{radiation_max:.2f} W/m²")
-        
-        with cols[3]:
-            st.metric("🌤️ Radiación Mín.", f"{radiation_min:.2f} W/m²")
-
-    st.divider()
+@st.fragment
+@profiled('weather.datos')
+def _raw_data_section(store):
+    """Tabla de datos crudos"""
+    data, version = store.snapshot()
 
     # Checkbox para datos raw
     raw_data = st.checkbox("📋 Mostrar Datos Crudos")
 
     if raw_data:
-        st.dataframe(
-            data[['Datetime', 'temperature', 'precipitation', 'WindSpeed', 'radiation']],
-            width='stretch'
+        # Paginada: solo viaja al navegador la página visible
+        paged_table(
+            data, key="weather_raw", version=version,
+            columns=['Datetime', 'temperature', 'precipitation', 'WindSpeed', 'radiation']
         )
 
-    st.divider()
 
-    # Preparar datos para gráficos
-    data_copy = data.copy()
-    data_copy['Year'] = data_copy['Datetime'].dt.year
-    data_copy['Week'] = data_copy['Datetime'].dt.isocalendar().week
-    data_copy['YearWeek'] = data_copy['Datetime'].dt.to_period('W').apply(lambda r: r.start_time)
+def _temperature_chart(temp_data, weather_view_mode, date_format_weather, tooltip_date_format_weather):
+    """Área de temperatura (semanal o de un día)"""
+    chart = alt.Chart(temp_data).mark_area(
+        line={'color': '#EF4444'},
+        color=alt.Gradient(
+            gradient='linear',
+            stops=[
+                alt.GradientStop(color='#EF4444', offset=0),
+                alt.GradientStop(color='rgba(239,68,68,0.1)', offset=1)
+            ],
+            x1=0, x2=0, y1=0, y2=1
+        )
+    ).encode(
+        x=alt.X('Fecha:T', title='Fecha' if weather_view_mode == 'Semanal' else 'Hora', 
+                axis=alt.Axis(format=date_format_weather, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        y=alt.Y('Temperatura Media (°C):Q', title='Temperatura Media (°C)', 
+                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        tooltip=[
+            alt.Tooltip('Fecha:T', title='Semana' if weather_view_mode == 'Semanal' else 'Hora', 
+                        format=tooltip_date_format_weather),
+            alt.Tooltip('Temperatura Media (°C):Q', format='.2f', title='Temperatura (°C)')
+        ]
+    ).properties(
+        height=400,
+        title=alt.TitleParams(text='🌡️ Temperatura', fontSize=18, color='#2d3748', anchor='middle')
+    ).configure(
+        background='white'
+    ).configure_view(
+        strokeWidth=0,
+        fill='white'
+    ).configure_axis(
+        gridColor='#f7fafc',
+        domainColor='#e2e8f0'
+    ).interactive()
+    return chart
+
+
+def _precipitation_chart(prec_data, weather_view_mode, date_format_weather, tooltip_date_format_weather):
+    """Área de precipitación (semanal o de un día)"""
+    chart_prec = alt.Chart(prec_data).mark_area(
+        line={'color': '#3B82F6'},
+        color=alt.Gradient(
+            gradient='linear',
+            stops=[
+                alt.GradientStop(color='#3B82F6', offset=0),
+                alt.GradientStop(color='rgba(59,130,246,0.1)', offset=1)
+            ],
+            x1=0, x2=0, y1=0, y2=1
+        )
+    ).encode(
+        x=alt.X('Fecha:T', title='Fecha' if weather_view_mode == 'Semanal' else 'Hora', 
+                axis=alt.Axis(format=date_format_weather, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        y=alt.Y('Precipitación Media (mm/h):Q', title='Precipitación Media (mm/h)', 
+                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        tooltip=[
+            alt.Tooltip('Fecha:T', title='Semana' if weather_view_mode == 'Semanal' else 'Hora', 
+                        format=tooltip_date_format_weather),
+            alt.Tooltip('Precipitación Media (mm/h):Q', format='.2f', title='Precipitación (mm/h)')
+        ]
+    ).properties(
+        height=400,
+        title=alt.TitleParams(text='💧 Precipitación', fontSize=18, color='#2d3748', anchor='middle')
+    ).configure(
+        background='white'
+    ).configure_view(
+        strokeWidth=0,
+        fill='white'
+    ).configure_axis(
+        gridColor='#f7fafc',
+        domainColor='#e2e8f0'
+    ).interactive()
+    return chart_prec
+
+
+def _radiation_chart(rad_data, weather_view_mode, date_format_weather, tooltip_date_format_weather):
+    """Área de radiación (semanal o de un día)"""
+    chart_rad = alt.Chart(rad_data).mark_area(
+        line={'color': '#F97316'},
+        color=alt.Gradient(
+            gradient='linear',
+            stops=[
+                alt.GradientStop(color='#F97316', offset=0),
+                alt.GradientStop(color='rgba(249,115,22,0.1)', offset=1)
+            ],
+            x1=0, x2=0, y1=0, y2=1
+        )
+    ).encode(
+        x=alt.X('Fecha:T', title='Fecha' if weather_view_mode == 'Semanal' else 'Hora', 
+                axis=alt.Axis(format=date_format_weather, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        y=alt.Y('Radiación Media (W/m²):Q', title='Radiación Media (W/m²)', 
+                axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
+        tooltip=[
+            alt.Tooltip('Fecha:T', title='Semana' if weather_view_mode == 'Semanal' else 'Hora', 
+                        format=tooltip_date_format_weather),
+            alt.Tooltip('Radiación Media (W/m²):Q', format='.2f', title='Radiación (W/m²)')
+        ]
+    ).properties(
+        height=400,
+        title=alt.TitleParams(text='☀️ Radiación Solar', fontSize=18, color='#2d3748', anchor='middle')
+    ).configure(
+        background='white'
+    ).configure_view(
+        strokeWidth=0,
+        fill='white'
+    ).configure_axis(
+        gridColor='#f7fafc',
+        domainColor='#e2e8f0'
+    ).interactive()
+    return chart_rad
+
+
+def _daily_weather_frames(data, version, day, daily=compute_daily_weather):
+    """Temperatura, precipitación y radiación de un día con los nombres de los gráficos
+
+    `version` es la del día (range_version): las filas salen de la caché diaria.
+    """
+    daily_weather = daily(data, version, day)
+    
+    temp_data = daily_weather[['Datetime', 'temperature']].copy()
+    temp_data.columns = ['Fecha', 'Temperatura Media (°C)']
+    
+    prec_data = daily_weather[['Datetime', 'precipitation']].copy()
+    prec_data.columns = ['Fecha', 'Precipitación Media (mm/h)']
+    
+    rad_data = daily_weather[['Datetime', 'radiation']].copy()
+    rad_data.columns = ['Fecha', 'Radiación Media (W/m²)']
+    return temp_data, prec_data, rad_data
+
+
+def _prefetch_weather_days(store, data, selected_date):
+    """Precalcula los gráficos meteorológicos de los días vecinos del seleccionado"""
+    charts = (('weather.temperatura', _temperature_chart), ('weather.precipitacion', _precipitation_chart),
+              ('weather.radiacion', _radiation_chart))
+    for day in neighbor_days(selected_date, store.profile.start.date(), store.profile.end.date()):
+        day_version = store.range_version(pd.Timestamp(day) + pd.Timedelta(days=1))
+        key = (day_version, "Diario", day)
+        for position, (chart_id, build_chart) in enumerate(charts):
+            # Fuera del script se usa la función sin st.cache_data
+            prefetch_altair(
+                chart_id, key,
+                lambda day=day, day_version=day_version, position=position, build_chart=build_chart: build_chart(
+                    _daily_weather_frames(data, day_version, day, compute_daily_weather.__wrapped__)[position],
+                    "Diario", '%H:%M', '%H:%M'
+                )
+            )
+
+
+@st.fragment
+@profiled('weather.graficos')
+def _weather_charts_section(store):
+    """Gráficos de temperatura, precipitación y radiación"""
+    data, version = store.snapshot()
 
     # Gráficos de Temperatura y Precipitación
     st.markdown("### 📈 Temperatura y Precipitación (2024 - 2025)")
@@ -84,20 +206,20 @@ def render(data, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, rad
     
     if weather_view_mode == "Semanal":
         # Calcular datos semanales
-        weekly_temp = data_copy.groupby('YearWeek')['temperature'].mean().reset_index()
-        weekly_temp.columns = ['Fecha', 'Temperatura Media (°C)']
-        
-        weekly_prec = data_copy.groupby('YearWeek')['precipitation'].mean().reset_index()
-        weekly_prec.columns = ['Fecha', 'Precipitación Media (mm/h)']
+        weekly_weather = compute_weekly_weather(data, version)
+        weekly_temp = frame_view(weekly_weather, {'Fecha': 'Fecha', 'temperature': 'Temperatura Media (°C)'})
+        weekly_prec = frame_view(weekly_weather, {'Fecha': 'Fecha', 'precipitation': 'Precipitación Media (mm/h)'})
         
+        weather_selection = None
+        weather_version = version
         temp_data = weekly_temp
         prec_data = weekly_prec
         date_format_weather = '%b %Y'
         tooltip_date_format_weather = '%d %b %Y'
     elif weather_view_mode == "Diario":
         with col_weather2:
-            min_date = data['Datetime'].min().date()
-            max_date = data['Datetime'].max().date()
+            min_date = store.profile.start.date()
+            max_date = store.profile.end.date()
             
             selected_weather_date = st.date_input(
                 "Seleccionar día:",
@@ -107,20 +229,16 @@ def render(data, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, rad
                 key="weather_date_selector"
             )
             
-        daily_weather = data_copy[data_copy['Datetime'].dt.date == selected_weather_date].copy()
-        
-        temp_data = daily_weather[['Datetime', 'temperature']].copy()
-        temp_data.columns = ['Fecha', 'Temperatura Media (°C)']
-        
-        prec_data = daily_weather[['Datetime', 'precipitation']].copy()
-        prec_data.columns = ['Fecha', 'Precipitación Media (mm/h)']
+        weather_selection = selected_weather_date
+        weather_version = store.range_version(pd.Timestamp(selected_weather_date) + pd.Timedelta(days=1))
+        temp_data, prec_data, rad_data = _daily_weather_frames(data, weather_version, selected_weather_date)
         
         date_format_weather = '%H:%M'
         tooltip_date_format_weather = '%H:%M'
     else:  # Periodo Específico
         with col_weather2:
-            min_date = data['Datetime'].min().date()
-            max_date = data['Datetime'].max().date()
+            min_date = store.profile.start.date()
+            max_date = store.profile.end.date()
             
             date_range_weather = st.date_input(
                 "Seleccionar rango (zoom inicial):",
@@ -130,13 +248,6 @@ def render(data, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, rad
                 key="weather_range_selector"
             )
         
-        # Cargar TODOS los datos con granularidad de 15 minutos
-        temp_data = data_copy[['Datetime', 'temperature']].copy()
-        temp_data.columns = ['Fecha', 'Temperatura Media (°C)']
-        
-        prec_data = data_copy[['Datetime', 'precipitation']].copy()
-        prec_data.columns = ['Fecha', 'Precipitación Media (mm/h)']
-        
         # Establecer rango inicial de zoom
         if isinstance(date_range_weather, tuple) and len(date_range_weather) == 2:
             weather_x_range_start = pd.to_datetime(date_range_weather[0])
@@ -148,192 +259,113 @@ def render(data, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, rad
             weather_x_range_end = pd.to_datetime(single_date) + pd.Timedelta(days=1)
             days_weather = 1
         
-        st.markdown(f"<span style='color: #2d3748; font-size: 14px;'>📊 Granularidad: **15 minutos** ({days_weather} días) - Arrastra para desplazarte</span>", unsafe_allow_html=True)
+        # Detalle de 15 minutos en el rango seleccionado, resumen fuera (cacheado)
+        temp_data = frame_view(
+            compute_downsampled(data, version, ('temperature',), weather_x_range_start, weather_x_range_end),
+            {'Datetime': 'Fecha', 'temperature': 'Temperatura Media (°C)'}
+        )
+        prec_data = frame_view(
+            compute_downsampled(data, version, ('precipitation',), weather_x_range_start, weather_x_range_end),
+            {'Datetime': 'Fecha', 'precipitation': 'Precipitación Media (mm/h)'}
+        )
+        
+        st.markdown(f"<span style='color: #2d3748; font-size: 14px;'>{downsampling_message(days_weather)}</span>", unsafe_allow_html=True)
         
         # Usar Plotly para gráficos interactivos con rangeslider
         cols_plotly = st.columns([1, 1], gap='large')
         
         with cols_plotly[0]:
-            fig_temp = go.Figure()
-            fig_temp.add_trace(go.Scatter(
-                x=temp_data['Fecha'],
-                y=temp_data['Temperatura Media (°C)'],
-                mode='lines',
-                name='Temperatura',
-                line=dict(color='#EF4444', width=2),
-                fill='tozeroy',
-                fillcolor='rgba(239, 68, 68, 0.1)'
-            ))
-            fig_temp.update_layout(
-                title={'text': '🌡️ Temperatura', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
-                xaxis=dict(
-                    title=dict(text='Fecha', font=dict(color='#2d3748')),
-                    range=[weather_x_range_start, weather_x_range_end],
-                    rangeslider=dict(visible=True, thickness=0.05),
-                    tickfont=dict(color='#2d3748')
-                ),
-                yaxis=dict(
-                    title=dict(text='Temperatura (°C)', font=dict(color='#2d3748')),
-                    gridcolor='rgba(200,200,200,0.3)',
-                    tickfont=dict(color='#2d3748')
-                ),
-                height=450, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
-                margin=dict(l=60, r=20, t=60, b=80)
-            )
-            st.plotly_chart(fig_temp, width='stretch')
+            def build_fig_temp():
+                fig_temp = go.Figure()
+                fig_temp.add_trace(go.Scatter(
+                    x=temp_data['Fecha'],
+                    y=temp_data['Temperatura Media (°C)'],
+                    mode='lines',
+                    name='Temperatura',
+                    line=dict(color='#EF4444', width=2),
+                    fill='tozeroy',
+                    fillcolor='rgba(239, 68, 68, 0.1)'
+                ))
+                fig_temp.update_layout(
+                    title={'text': '🌡️ Temperatura', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
+                    xaxis=dict(
+                        title=dict(text='Fecha', font=dict(color='#2d3748')),
+                        range=[weather_x_range_start, weather_x_range_end],
+                        rangeslider=dict(visible=True, thickness=0.05),
+                        tickfont=dict(color='#2d3748')
+                    ),
+                    yaxis=dict(
+                        title=dict(text='Temperatura (°C)', font=dict(color='#2d3748')),
+                        gridcolor='rgba(200,200,200,0.3)',
+                        tickfont=dict(color='#2d3748')
+                    ),
+                    height=450, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
+                    margin=dict(l=60, r=20, t=60, b=80)
+                )
+                return fig_temp
+            
+            plotly_chart('weather.temperatura_periodo', (version, weather_x_range_start, weather_x_range_end), build_fig_temp, width='stretch')
         
         with cols_plotly[1]:
-            fig_prec = go.Figure()
-            fig_prec.add_trace(go.Scatter(
-                x=prec_data['Fecha'],
-                y=prec_data['Precipitación Media (mm/h)'],
-                mode='lines',
-                name='Precipitación',
-                line=dict(color='#3B82F6', width=2),
-                fill='tozeroy',
-                fillcolor='rgba(59, 130, 246, 0.1)'
-            ))
-            fig_prec.update_layout(
-                title={'text': '💧 Precipitación', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
-                xaxis=dict(
-                    title=dict(text='Fecha', font=dict(color='#2d3748')),
-                    range=[weather_x_range_start, weather_x_range_end],
-                    rangeslider=dict(visible=True, thickness=0.05),
-                    tickfont=dict(color='#2d3748')
-                ),
-                yaxis=dict(
-                    title=dict(text='Precipitación (mm/h)', font=dict(color='#2d3748')),
-                    gridcolor='rgba(200,200,200,0.3)',
-                    tickfont=dict(color='#2d3748')
-                ),
-                height=450, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
-                margin=dict(l=60, r=20, t=60, b=80)
-            )
-            st.plotly_chart(fig_prec, width='stretch')
+            def build_fig_prec():
+                fig_prec = go.Figure()
+                fig_prec.add_trace(go.Scatter(
+                    x=prec_data['Fecha'],
+                    y=prec_data['Precipitación Media (mm/h)'],
+                    mode='lines',
+                    name='Precipitación',
+                    line=dict(color='#3B82F6', width=2),
+                    fill='tozeroy',
+                    fillcolor='rgba(59, 130, 246, 0.1)'
+                ))
+                fig_prec.update_layout(
+                    title={'text': '💧 Precipitación', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
+                    xaxis=dict(
+                        title=dict(text='Fecha', font=dict(color='#2d3748')),
+                        range=[weather_x_range_start, weather_x_range_end],
+                        rangeslider=dict(visible=True, thickness=0.05),
+                        tickfont=dict(color='#2d3748')
+                    ),
+                    yaxis=dict(
+                        title=dict(text='Precipitación (mm/h)', font=dict(color='#2d3748')),
+                        gridcolor='rgba(200,200,200,0.3)',
+                        tickfont=dict(color='#2d3748')
+                    ),
+                    height=450, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
+                    margin=dict(l=60, r=20, t=60, b=80)
+                )
+                return fig_prec
+            
+            plotly_chart('weather.precipitacion_periodo', (version, weather_x_range_start, weather_x_range_end), build_fig_prec, width='stretch')
     
     # Solo mostrar Altair si no es Periodo Específico
     if weather_view_mode != "Periodo Específico":
         cols = st.columns([1, 1], gap='large')
 
         with cols[0]:
-            chart = alt.Chart(temp_data).mark_area(
-                line={'color': '#EF4444'},
-                color=alt.Gradient(
-                    gradient='linear',
-                    stops=[
-                        alt.GradientStop(color='#EF4444', offset=0),
-                        alt.GradientStop(color='rgba(239,68,68,0.1)', offset=1)
-                    ],
-                    x1=0, x2=0, y1=0, y2=1
-                )
-            ).encode(
-                x=alt.X('Fecha:T', title='Fecha' if weather_view_mode == 'Semanal' else 'Hora', 
-                        axis=alt.Axis(format=date_format_weather, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-                y=alt.Y('Temperatura Media (°C):Q', title='Temperatura Media (°C)', 
-                        axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-                tooltip=[
-                    alt.Tooltip('Fecha:T', title='Semana' if weather_view_mode == 'Semanal' else 'Hora', 
-                                format=tooltip_date_format_weather),
-                    alt.Tooltip('Temperatura Media (°C):Q', format='.2f', title='Temperatura (°C)')
-                ]
-            ).properties(
-                height=400,
-                title=alt.TitleParams(text='🌡️ Temperatura', fontSize=18, color='#2d3748', anchor='middle')
-            ).configure(
-                background='white'
-            ).configure_view(
-                strokeWidth=0,
-                fill='white'
-            ).configure_axis(
-                gridColor='#f7fafc',
-                domainColor='#e2e8f0'
-            ).interactive()
-        
-            st.altair_chart(chart, width='stretch')
+            altair_chart('weather.temperatura', (weather_version, weather_view_mode, weather_selection),
+                         lambda: _temperature_chart(temp_data, weather_view_mode, date_format_weather, tooltip_date_format_weather),
+                         width='stretch')
 
         with cols[1]:
-            chart_prec = alt.Chart(prec_data).mark_area(
-                line={'color': '#3B82F6'},
-                color=alt.Gradient(
-                    gradient='linear',
-                    stops=[
-                        alt.GradientStop(color='#3B82F6', offset=0),
-                        alt.GradientStop(color='rgba(59,130,246,0.1)', offset=1)
-                    ],
-                    x1=0, x2=0, y1=0, y2=1
-                )
-            ).encode(
-                x=alt.X('Fecha:T', title='Fecha' if weather_view_mode == 'Semanal' else 'Hora', 
-                        axis=alt.Axis(format=date_format_weather, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-                y=alt.Y('Precipitación Media (mm/h):Q', title='Precipitación Media (mm/h)', 
-                        axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-                tooltip=[
-                    alt.Tooltip('Fecha:T', title='Semana' if weather_view_mode == 'Semanal' else 'Hora', 
-                                format=tooltip_date_format_weather),
-                    alt.Tooltip('Precipitación Media (mm/h):Q', format='.2f', title='Precipitación (mm/h)')
-                ]
-            ).properties(
-                height=400,
-                title=alt.TitleParams(text='💧 Precipitación', fontSize=18, color='#2d3748', anchor='middle')
-            ).configure(
-                background='white'
-            ).configure_view(
-                strokeWidth=0,
-                fill='white'
-            ).configure_axis(
-                gridColor='#f7fafc',
-                domainColor='#e2e8f0'
-            ).interactive()
-            
-            st.altair_chart(chart_prec, width='stretch')
+            altair_chart('weather.precipitacion', (weather_version, weather_view_mode, weather_selection),
+                         lambda: _precipitation_chart(prec_data, weather_view_mode, date_format_weather, tooltip_date_format_weather),
+                         width='stretch')
 
         st.divider()        # Gráfico de Radiación (solo para Semanal/Diario)
         st.markdown("### ☀️ Radiación (2024 - 2025)")
         st.write("")
         
         if weather_view_mode == "Semanal":
-            weekly_rad = data_copy.groupby('YearWeek')['radiation'].mean().reset_index()
-            weekly_rad.columns = ['Fecha', 'Radiación Media (W/m²)']
+            weekly_rad = frame_view(compute_weekly_weather(data, version), {'Fecha': 'Fecha', 'radiation': 'Radiación Media (W/m²)'})
             rad_data = weekly_rad
-        else:  # Diario
-            daily_rad = data_copy[data_copy['Datetime'].dt.date == selected_weather_date].copy()
-            rad_data = daily_rad[['Datetime', 'radiation']].copy()
-            rad_data.columns = ['Fecha', 'Radiación Media (W/m²)']
         
-        chart_rad = alt.Chart(rad_data).mark_area(
-            line={'color': '#F97316'},
-            color=alt.Gradient(
-                gradient='linear',
-                stops=[
-                    alt.GradientStop(color='#F97316', offset=0),
-                    alt.GradientStop(color='rgba(249,115,22,0.1)', offset=1)
-                ],
-                x1=0, x2=0, y1=0, y2=1
-            )
-        ).encode(
-            x=alt.X('Fecha:T', title='Fecha' if weather_view_mode == 'Semanal' else 'Hora', 
-                    axis=alt.Axis(format=date_format_weather, labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            y=alt.Y('Radiación Media (W/m²):Q', title='Radiación Media (W/m²)', 
-                    axis=alt.Axis(labelColor='#2d3748', titleColor='#2d3748', titlePadding=15)),
-            tooltip=[
-                alt.Tooltip('Fecha:T', title='Semana' if weather_view_mode == 'Semanal' else 'Hora', 
-                            format=tooltip_date_format_weather),
-                alt.Tooltip('Radiación Media (W/m²):Q', format='.2f', title='Radiación (W/m²)')
-            ]
-        ).properties(
-            height=400,
-            title=alt.TitleParams(text='☀️ Radiación Solar', fontSize=18, color='#2d3748', anchor='middle')
-        ).configure(
-            background='white'
-        ).configure_view(
-            strokeWidth=0,
-            fill='white'
-        ).configure_axis(
-            gridColor='#f7fafc',
-            domainColor='#e2e8f0'
-        ).interactive()
+        altair_chart('weather.radiacion', (weather_version, weather_view_mode, weather_selection),
+                     lambda: _radiation_chart(rad_data, weather_view_mode, date_format_weather, tooltip_date_format_weather),
+                     width='stretch')
         
-        st.altair_chart(chart_rad, width='stretch')
+        if weather_view_mode == "Diario":
+            _prefetch_weather_days(store, data, selected_weather_date)
     
     else:
         # Gráfico de Radiación para Periodo Específico (Plotly)
@@ -341,38 +373,48 @@ def render(data, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, rad
         st.markdown("### ☀️ Radiación (2024 - 2025)")
         st.write("")
         
-        rad_data_full = data_copy[['Datetime', 'radiation']].copy()
-        rad_data_full.columns = ['Fecha', 'Radiación (W/m²)']
-        
-        fig_rad = go.Figure()
-        fig_rad.add_trace(go.Scatter(
-            x=rad_data_full['Fecha'],
-            y=rad_data_full['Radiación (W/m²)'],
-            mode='lines',
-            name='Radiación',
-            line=dict(color='#F97316', width=2),
-            fill='tozeroy',
-            fillcolor='rgba(249, 115, 22, 0.1)'
-        ))
-        fig_rad.update_layout(
-            title={'text': '☀️ Radiación Solar', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
-            xaxis=dict(
-                title=dict(text='Fecha', font=dict(color='#2d3748')),
-                range=[weather_x_range_start, weather_x_range_end],
-                rangeslider=dict(visible=True, thickness=0.05),
-                tickfont=dict(color='#2d3748')
-            ),
-            yaxis=dict(
-                title=dict(text='Radiación (W/m²)', font=dict(color='#2d3748')),
-                gridcolor='rgba(200,200,200,0.3)',
-                tickfont=dict(color='#2d3748')
-            ),
-            height=450, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(l=60, r=20, t=60, b=80)
+        rad_data_full = frame_view(
+            compute_downsampled(data, version, ('radiation',), weather_x_range_start, weather_x_range_end),
+            {'Datetime': 'Fecha', 'radiation': 'Radiación (W/m²)'}
         )
-        st.plotly_chart(fig_rad, width='stretch')
+        
+        def build_fig_rad():
+            fig_rad = go.Figure()
+            fig_rad.add_trace(go.Scatter(
+                x=rad_data_full['Fecha'],
+                y=rad_data_full['Radiación (W/m²)'],
+                mode='lines',
+                name='Radiación',
+                line=dict(color='#F97316', width=2),
+                fill='tozeroy',
+                fillcolor='rgba(249, 115, 22, 0.1)'
+            ))
+            fig_rad.update_layout(
+                title={'text': '☀️ Radiación Solar', 'x': 0.5, 'font': {'size': 18, 'color': '#2d3748'}},
+                xaxis=dict(
+                    title=dict(text='Fecha', font=dict(color='#2d3748')),
+                    range=[weather_x_range_start, weather_x_range_end],
+                    rangeslider=dict(visible=True, thickness=0.05),
+                    tickfont=dict(color='#2d3748')
+                ),
+                yaxis=dict(
+                    title=dict(text='Radiación (W/m²)', font=dict(color='#2d3748')),
+                    gridcolor='rgba(200,200,200,0.3)',
+                    tickfont=dict(color='#2d3748')
+                ),
+                height=450, plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)',
+                margin=dict(l=60, r=20, t=60, b=80)
+            )
+            return fig_rad
+        
+        plotly_chart('weather.radiacion_periodo', (version, weather_x_range_start, weather_x_range_end), build_fig_rad, width='stretch')
 
-    st.divider()
+
+@st.fragment
+@profiled('weather.combinado')
+def _combined_section(store):
+    """Vista combinada de variables meteorológicas"""
+    data, version = store.snapshot()
 
     # Gráfico Combinado de Variables Meteorológicas
     st.markdown("### 🌍 Vista Combinada - Variables Meteorológicas")
@@ -388,12 +430,16 @@ def render(data, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, rad
             key="combined_range_option"
         )
     
-    # Preparar datos raw (15 minutos)
-    combined_weather_raw = data_copy[['Datetime', 'temperature', 'precipitation', 'radiation']].copy()
-    combined_weather_raw.columns = ['Fecha', 'Temperatura (°C)', 'Precipitación (mm/h)', 'Radiación (W/m²)']
+    # Columnas raw (15 minutos) y sus nombres en el gráfico
+    combined_weather_columns = {
+        'Datetime': 'Fecha',
+        'temperature': 'Temperatura (°C)',
+        'precipitation': 'Precipitación (mm/h)',
+        'radiation': 'Radiación (W/m²)'
+    }
     
-    min_date_combined = combined_weather_raw['Fecha'].min()
-    max_date_combined = combined_weather_raw['Fecha'].max()
+    min_date_combined = store.profile.start
+    max_date_combined = store.profile.end
     
     # Definir rango inicial de zoom
     x_range_start = None
@@ -413,28 +459,21 @@ def render(data, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, rad
             x_range_start = pd.to_datetime(combined_date_range[0])
             x_range_end = pd.to_datetime(combined_date_range[1]) + pd.Timedelta(days=1)
             days_selected = (combined_date_range[1] - combined_date_range[0]).days
-            
-            # Usar datos con granularidad de 15 minutos para rango personalizado
-            combined_weather = combined_weather_raw.copy()
-            granularity_msg = f"📊 Granularidad: **15 minutos** ({days_selected} días) - Arrastra para desplazarte"
         else:
             single_date = combined_date_range if not isinstance(combined_date_range, tuple) else combined_date_range[0]
             x_range_start = pd.to_datetime(single_date)
             x_range_end = pd.to_datetime(single_date) + pd.Timedelta(days=1)
-            
-            # Usar datos con granularidad de 15 minutos
-            combined_weather = combined_weather_raw.copy()
-            granularity_msg = "📊 Granularidad: **15 minutos** (1 día) - Arrastra para desplazarte"
+            days_selected = 1
+        
+        # Detalle de 15 minutos en el rango seleccionado, resumen fuera (cacheado)
+        combined_weather = frame_view(compute_downsampled(
+            data, version, ('temperature', 'precipitation', 'radiation'), x_range_start, x_range_end
+        ), combined_weather_columns)
+        granularity_msg = downsampling_message(days_selected)
     else:
         # Todo el periodo - agregar por día para mejor visualización
-        combined_weather_raw['Dia'] = combined_weather_raw['Fecha'].dt.date
-        combined_weather = combined_weather_raw.groupby('Dia').agg({
-            'Temperatura (°C)': 'mean',
-            'Precipitación (mm/h)': 'mean', 
-            'Radiación (W/m²)': 'mean'
-        }).reset_index()
+        combined_weather = compute_daily_means(data, version, ('temperature', 'precipitation', 'radiation'))
         combined_weather.columns = ['Fecha', 'Temperatura (°C)', 'Precipitación (mm/h)', 'Radiación (W/m²)']
-        combined_weather['Fecha'] = pd.to_datetime(combined_weather['Fecha'])
         granularity_msg = "📊 Granularidad: **Diaria** (todo el periodo)"
     
     st.markdown(f"<span style='color: #2d3748; font-size: 14px;'>{granularity_msg}</span>", unsafe_allow_html=True)
@@ -473,113 +512,172 @@ def render(data, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, rad
     # Crear gráfico con múltiples ejes Y usando Plotly
     from plotly.subplots import make_subplots
     
-    fig_combined = make_subplots(specs=[[{"secondary_y": True}]])
+    def build_fig_combined():
+        fig_combined = make_subplots(specs=[[{"secondary_y": True}]])
     
-    # Línea de Temperatura (eje Y izquierdo) - Rojo
-    fig_combined.add_trace(
-        go.Scatter(
-            x=combined_weather['Fecha'],
-            y=combined_weather['Temperatura (°C)'],
-            name='Temperatura (°C)',
-            line=dict(color='#EF4444', width=2.5, shape='spline'),
-            mode='lines',
-            fill='tozeroy',
-            fillcolor='rgba(239, 68, 68, 0.1)'
-        ),
-        secondary_y=False
-    )
+        # Línea de Temperatura (eje Y izquierdo) - Rojo
+        fig_combined.add_trace(
+            go.Scatter(
+                x=combined_weather['Fecha'],
+                y=combined_weather['Temperatura (°C)'],
+                name='Temperatura (°C)',
+                line=dict(color='#EF4444', width=2.5, shape='spline'),
+                mode='lines',
+                fill='tozeroy',
+                fillcolor='rgba(239, 68, 68, 0.1)'
+            ),
+            secondary_y=False
+        )
     
-    # Línea de Precipitación (eje Y derecho) - Azul
-    fig_combined.add_trace(
-        go.Scatter(
-            x=combined_weather['Fecha'],
-            y=combined_weather['Precipitación (mm/h)'],
-            name='Precipitación (mm/h)',
-            line=dict(color='#3B82F6', width=2.5, shape='spline'),
-            mode='lines'
-        ),
-        secondary_y=True
-    )
+        # Línea de Precipitación (eje Y derecho) - Azul
+        fig_combined.add_trace(
+            go.Scatter(
+                x=combined_weather['Fecha'],
+                y=combined_weather['Precipitación (mm/h)'],
+                name='Precipitación (mm/h)',
+                line=dict(color='#3B82F6', width=2.5, shape='spline'),
+                mode='lines'
+            ),
+            secondary_y=True
+        )
     
-    # Para la Radiación, creamos un tercer eje Y - Naranja
-    fig_combined.add_trace(
-        go.Scatter(
-            x=combined_weather['Fecha'],
-            y=combined_weather['Radiación (W/m²)'],
-            name='Radiación (W/m²)',
-            line=dict(color='#F97316', width=2.5, shape='spline'),
-            mode='lines',
-            yaxis='y3'
+        # Para la Radiación, creamos un tercer eje Y - Naranja
+        fig_combined.add_trace(
+            go.Scatter(
+                x=combined_weather['Fecha'],
+                y=combined_weather['Radiación (W/m²)'],
+                name='Radiación (W/m²)',
+                line=dict(color='#F97316', width=2.5, shape='spline'),
+                mode='lines',
+                yaxis='y3'
+            )
         )
-    )
     
-    # Configurar el layout con 3 ejes Y - todos empiezan en 0
-    fig_combined.update_layout(
-        title={
-            'text': 'Variables Meteorológicas Combinadas',
-            'x': 0.5,
-            'xanchor': 'center',
-            'font': {'size': 20, 'color': '#2d3748', 'family': 'Poppins'}
-        },
-        xaxis=dict(
-            title=dict(text='Fecha', font=dict(color='#2d3748')),
-            tickfont=dict(color='#2d3748'),
-            gridcolor='rgba(200, 200, 200, 0.3)',
-            domain=[0.1, 0.85],
-            type='date',
-            range=[x_range_start, x_range_end] if x_range_start is not None else None,
-            rangeslider=dict(visible=True, thickness=0.05)
-        ),
-        yaxis=dict(
-            title=dict(text='Temperatura (°C)', font=dict(color='#EF4444')),
-            tickfont=dict(color='#EF4444'),
-            gridcolor='rgba(200, 200, 200, 0.3)',
-            side='left',
-            range=[min_temp_range, max_temp_range],
-            fixedrange=False,
-            zeroline=True,
-            zerolinecolor='rgba(150, 150, 150, 0.5)',
-            zerolinewidth=1
-        ),
-        yaxis2=dict(
-            title=dict(text='Precipitación (mm/h)', font=dict(color='#3B82F6')),
-            tickfont=dict(color='#3B82F6'),
-            overlaying='y',
-            side='right',
-            position=0.85,
-            range=[min_prec_range, max_prec_range],
-            showgrid=False,
-            fixedrange=False,
-            zeroline=True,
-            zerolinecolor='rgba(150, 150, 150, 0.5)',
-            zerolinewidth=1
-        ),
-        yaxis3=dict(
-            title=dict(text='Radiación (W/m²)', font=dict(color='#F97316')),
-            tickfont=dict(color='#F97316'),
-            overlaying='y',
-            side='right',
-            position=0.95,
-            range=[min_rad_range, max_rad_range],
-            showgrid=False,
-            fixedrange=False,
-            zeroline=True,
-            zerolinecolor='rgba(150, 150, 150, 0.5)',
-            zerolinewidth=1
-        ),
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='center',
-            x=0.5,
-            font=dict(color='#2d3748')
-        ),
-        height=550,
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='white',
-        margin=dict(l=60, r=100, t=80, b=60),
-        hovermode='x unified'
-    )
+        # Configurar el layout con 3 ejes Y - todos empiezan en 0
+        fig_combined.update_layout(
+            title={
+                'text': 'Variables Meteorológicas Combinadas',
+                'x': 0.5,
+                'xanchor': 'center',
+                'font': {'size': 20, 'color': '#2d3748', 'family': 'Poppins'}
+            },
+            xaxis=dict(
+                title=dict(text='Fecha', font=dict(color='#2d3748')),
+                tickfont=dict(color='#2d3748'),
+                gridcolor='rgba(200, 200, 200, 0.3)',
+                domain=[0.1, 0.85],
+                type='date',
+                range=[x_range_start, x_range_end] if x_range_start is not None else None,
+                rangeslider=dict(visible=True, thickness=0.05)
+            ),
+            yaxis=dict(
+                title=dict(text='Temperatura (°C)', font=dict(color='#EF4444')),
+                tickfont=dict(color='#EF4444'),
+                gridcolor='rgba(200, 200, 200, 0.3)',
+                side='left',
+                range=[min_temp_range, max_temp_range],
+                fixedrange=False,
+                zeroline=True,
+                zerolinecolor='rgba(150, 150, 150, 0.5)',
+                zerolinewidth=1
+            ),
+            yaxis2=dict(
+                title=dict(text='Precipitación (mm/h)', font=dict(color='#3B82F6')),
+                tickfont=dict(color='#3B82F6'),
+                overlaying='y',
+                side='right',
+                position=0.85,
+                range=[min_prec_range, max_prec_range],
+                showgrid=False,
+                fixedrange=False,
+                zeroline=True,
+                zerolinecolor='rgba(150, 150, 150, 0.5)',
+                zerolinewidth=1
+            ),
+            yaxis3=dict(
+                title=dict(text='Radiación (W/m²)', font=dict(color='#F97316')),
+                tickfont=dict(color='#F97316'),
+                overlaying='y',
+                side='right',
+                position=0.95,
+                range=[min_rad_range, max_rad_range],
+                showgrid=False,
+                fixedrange=False,
+                zeroline=True,
+                zerolinecolor='rgba(150, 150, 150, 0.5)',
+                zerolinewidth=1
+            ),
+            legend=dict(
+                orientation='h',
+                yanchor='bottom',
+                y=1.02,
+                xanchor='center',
+                x=0.5,
+                font=dict(color='#2d3748')
+            ),
+            height=550,
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='white',
+            margin=dict(l=60, r=100, t=80, b=60),
+            hovermode='x unified'
+        )
+        return fig_combined
     
-    st.plotly_chart(fig_combined, width='stretch')
+    plotly_chart('weather.combinado', (version, combined_range_option, x_range_start, x_range_end), build_fig_combined, width='stretch')
+
+
+def render(store, temp_min, temp_max, prec_min, prec_max, wind_min, wind_max, radiation_min, radiation_max):
+    """Renderiza la página de meteorología"""
+    st.title("🌤️ Datos Meteorológicos")
+
+    # Menú de navegación
+    show_navigation_menu()
+    live_mode_toggle(store)
+
+    # Sección de métricas
+    st.markdown("### 📊 Resumen de Datos")
+    
+    # Temperatura
+    with st.container():
+        cols = st.columns(4, gap='medium')
+        
+        with cols[0]:
+            st.metric("🌡️ Temp. Máxima", f"{temp_max:.2f} °C")
+        
+        with cols[1]:
+            st.metric("❄️ Temp. Mínima", f"{temp_min:.2f} °C")
+        
+        with cols[2]:
+            st.metric("💧 Precip. Máxima", f"{prec_max:.2f} mm/h")
+        
+        with cols[3]:
+            st.metric("💧 Precip. Mínima", f"{prec_min:.2f} mm/h")
+
+    # Viento y Radiación
+    with st.container():
+        cols = st.columns(4, gap='medium')
+        
+        with cols[0]:
+            st.metric("💨 Viento Máx.", f"{wind_max:.2f} km/h")
+        
+        with cols[1]:
+            st.metric("🍃 Viento Mín.", f"{wind_min:.2f} km/h")
+        
+        with cols[2]:
+            st.metric("☀️ Radiación Máx.", f"{radiation_max:.2f} W/m²")
+        
+        with cols[3]:
+            st.metric("🌤️ Radiación Mín.", f"{radiation_min:.2f} W/m²")
+
+    st.divider()
+
+    # Cada sección es un fragmento: sus widgets solo relanzan esa sección
+    _raw_data_section(store)
+
+    st.divider()
+
+    _weather_charts_section(store)
+
+    st.divider()
+
+    _combined_section(store)
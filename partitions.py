@@ -0,0 +1,213 @@
+"""Almacenamiento del dataset en Parquet particionado por año y mes
+
+Uso:
+    python partitions.py [--data data/inversor_data_with_heating.csv] [--out data/particiones]
+
+Estructura: <raíz>/year=2024/month=01/part-0.parquet. Una consulta por rango
+solo abre las particiones que se solapan con él y lee las columnas pedidas;
+dentro de cada fichero el filtro por fecha se aplica con las estadísticas de
+los row groups. Requiere pyarrow (opcional: la app funciona sin él).
+
+El dashboard usa las particiones de DATA_PARTITIONS (si está definida) para
+las consultas que lo permiten; sin ella todo sale del almacén en memoria.
+"""
+import argparse
+import importlib.util
+import os
+import threading
+
+import pandas as pd
+
+from cleaning import clean_readings
+from data_store import DEFAULT_DATA_PATH
+from schema import DATASET_SCHEMA, apply_schema
+
+
+DEFAULT_PARTITIONS_PATH = "data/particiones"
+DATA_PARTITIONS = os.environ.get('DATA_PARTITIONS')
+
+# Filas por row group: un día de lecturas de 15 minutos
+ROW_GROUP_SIZE = 96
+
+
+def _require_pyarrow():
+    if importlib.util.find_spec('pyarrow') is None:
+        raise ImportError("El almacenamiento particionado requiere pyarrow (pip install pyarrow)")
+
+
+def _partition_dir(root: str, year: int, month: int):
+    return os.path.join(root, f"year={year}", f"month={month:02d}")
+
+
+def write_partitions(df: pd.DataFrame, root: str = DEFAULT_PARTITIONS_PATH):
+    """Escribe (o reescribe) las particiones año/mes que contienen filas de `df`
+
+    Devuelve la lista de particiones escritas como tuplas (año, mes).
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    timestamps = df['Datetime']
+    written = []
+    for (year, month), rows in df.groupby([timestamps.dt.year, timestamps.dt.month], sort=True):
+        directory = _partition_dir(root, int(year), int(month))
+        os.makedirs(directory, exist_ok=True)
+        table = pa.Table.from_pandas(rows.reset_index(drop=True), preserve_index=False)
+        # Escritura atómica: una consulta concurrente nunca ve un fichero a medias
+        path = os.path.join(directory, "part-0.parquet")
+        pq.write_table(table, path + ".tmp", row_group_size=ROW_GROUP_SIZE)
+        os.replace(path + ".tmp", path)
+        written.append((int(year), int(month)))
+    return written
+
+
+def append_partitions(df: pd.DataFrame, root: str = DEFAULT_PARTITIONS_PATH):
+    """Añade filas nuevas reescribiendo solo los meses afectados"""
+    dataset = PartitionedDataset(root)
+    months = sorted(set(zip(df['Datetime'].dt.year, df['Datetime'].dt.month)))
+    existing = [dataset.read_partition(year, month) for year, month in months if (year, month) in dataset.partitions]
+    combined = pd.concat([*existing, df], ignore_index=True)
+    combined = combined.sort_values('Datetime', kind='stable').drop_duplicates('Datetime', keep='last')
+    return write_partitions(combined, root)
+
+
+class PartitionedDataset:
+    """Consultas por rango de fechas sobre las particiones año/mes"""
+
+    def __init__(self, root: str = DEFAULT_PARTITIONS_PATH):
+        _require_pyarrow()
+        self.root = root
+        self._tree = self._tree_stamp()
+        self.partitions, complete = self._discover()
+        if not complete:
+            self._tree = None
+        self._high_water_mark = (None, None)
+
+    def _tree_stamp(self):
+        # Años y mtime de su directorio: crear un mes o un año cambia alguno
+        if not os.path.isdir(self.root):
+            return None
+        with os.scandir(self.root) as entries:
+            return tuple(sorted((entry.name, entry.stat().st_mtime_ns) for entry in entries
+                                if entry.name.startswith("year=") and entry.is_dir()))
+
+    def _discover(self):
+        # (particiones, completo): un mes sin fichero es una escritura a medias
+        partitions, complete = {}, True
+        if not os.path.isdir(self.root):
+            return partitions, complete
+        for year_dir in sorted(os.listdir(self.root)):
+            if not year_dir.startswith("year="):
+                continue
+            for month_dir in sorted(os.listdir(os.path.join(self.root, year_dir))):
+                if not month_dir.startswith("month="):
+                    continue
+                path = os.path.join(self.root, year_dir, month_dir, "part-0.parquet")
+                if os.path.exists(path):
+                    partitions[(int(year_dir[5:]), int(month_dir[6:]))] = path
+                else:
+                    complete = False
+        return partitions, complete
+
+    def refresh(self):
+        """Vuelve a descubrir las particiones solo si se han creado meses o años"""
+        tree = self._tree_stamp()
+        if tree is None or tree != self._tree:
+            self.partitions, complete = self._discover()
+            # Con un mes a medias se vuelve a recorrer en la siguiente llamada
+            self._tree = tree if complete else None
+
+    def _overlapping(self, start=None, end=None):
+        # Particiones [primer día del mes, primer día del mes siguiente) que tocan [start, end)
+        selected = []
+        for (year, month), path in sorted(self.partitions.items()):
+            month_start = pd.Timestamp(year=year, month=month, day=1)
+            month_end = month_start + pd.offsets.MonthBegin(1)
+            if (start is None or month_end > pd.Timestamp(start)) and (end is None or month_start < pd.Timestamp(end)):
+                selected.append(path)
+        return selected
+
+    def read_partition(self, year: int, month: int, columns=None):
+        import pyarrow.parquet as pq
+        return pq.read_table(self.partitions[(year, month)], columns=columns).to_pandas()
+
+    def query(self, start=None, end=None, columns=None):
+        """Filas con start <= Datetime < end, solo con las columnas pedidas
+
+        Solo se abren los ficheros de los meses que se solapan con el rango y
+        el filtro por fecha descarta row groups completos por sus estadísticas.
+        """
+        import pyarrow.dataset as ds
+
+        paths = self._overlapping(start, end)
+        if columns is not None and 'Datetime' not in columns:
+            columns = ['Datetime', *columns]
+        if not paths:
+            return apply_schema(pd.DataFrame(columns=columns or list(DATASET_SCHEMA)), DATASET_SCHEMA)
+
+        dataset = ds.dataset(paths, format='parquet')
+        condition = None
+        if start is not None:
+            condition = ds.field('Datetime') >= pd.Timestamp(start)
+        if end is not None:
+            before_end = ds.field('Datetime') < pd.Timestamp(end)
+            condition = before_end if condition is None else condition & before_end
+        table = dataset.to_table(columns=columns, filter=condition)
+        return table.to_pandas().sort_values('Datetime', kind='stable', ignore_index=True)
+
+    def bounds(self):
+        """Primer y último mes disponibles (None si no hay particiones)"""
+        if not self.partitions:
+            return None
+        return min(self.partitions), max(self.partitions)
+
+    def high_water_mark(self):
+        """Última fecha guardada (None si no hay particiones)
+
+        Comprueba si hay particiones nuevas (las escribe otro proceso) y solo
+        relee la columna de fechas del último mes si su fichero ha cambiado.
+        """
+        self.refresh()
+        if not self.partitions:
+            return None
+        path = self.partitions[max(self.partitions)]
+        stamp = (path, os.stat(path).st_mtime_ns)
+        if self._high_water_mark[0] != stamp:
+            import pyarrow.parquet as pq
+            timestamps = pq.read_table(path, columns=['Datetime'])['Datetime'].to_pandas()
+            self._high_water_mark = (stamp, timestamps.max() if len(timestamps) else None)
+        return self._high_water_mark[1]
+
+
+_dataset = None
+_dataset_lock = threading.Lock()
+
+
+def get_partitioned_dataset():
+    """Particiones de DATA_PARTITIONS, o None si no está definida o falta pyarrow
+
+    No usa st.cache_resource para poder llamarse desde los hilos de fondo.
+    """
+    global _dataset
+    if DATA_PARTITIONS is None or importlib.util.find_spec('pyarrow') is None:
+        return None
+    with _dataset_lock:
+        if _dataset is None:
+            _dataset = PartitionedDataset(DATA_PARTITIONS)
+        return _dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera las particiones Parquet año/mes del dataset")
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="CSV del dataset")
+    parser.add_argument('--out', default=DEFAULT_PARTITIONS_PATH, help="Directorio raíz de las particiones")
+    args = parser.parse_args()
+
+    df = apply_schema(clean_readings(pd.read_csv(args.data)), DATASET_SCHEMA, compact=True)
+    written = write_partitions(df, args.out)
+    print(f"{len(written)} particiones escritas en {args.out} ({len(df):,} filas)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Precálculo en segundo plano de los días vecinos de la selección
+
+Tras elegir un día en una vista diaria casi siempre se pasa al día anterior o
+al siguiente. Al pintar un día se programan en un hilo de fondo los agregados
+y las specs de los gráficos de los días vecinos y del mismo día de las semanas
+vecinas. Las specs quedan en la caché de precálculo (acotada por memoria) y
+cached_spec las recoge al pedir ese día.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import streamlit as st
+
+from chart_cache import _altair_spec, _plotly_spec, get_chart_cache, get_prefetch_cache
+
+
+# Desplazamientos en días respecto a la selección: día anterior/siguiente y semana anterior/siguiente
+PREFETCH_OFFSETS = (1, -1, 7, -7)
+PREFETCH_WORKERS = 1
+# Tareas en cola como máximo: al pasar días muy rápido se descartan las nuevas
+PREFETCH_MAX_PENDING = 32
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Cola de precálculo de specs con un pool de hilos de fondo"""
+
+    def __init__(self, chart_cache, prefetch_cache, workers: int = PREFETCH_WORKERS,
+                 max_pending: int = PREFETCH_MAX_PENDING):
+        self.chart_cache = chart_cache
+        self.prefetch_cache = prefetch_cache
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, cache_key: tuple, build, serialize):
+        """Programa una spec si no está ya en caché ni en cola; devuelve si se programó"""
+        with self._lock:
+            if (cache_key in self._pending or cache_key in self.chart_cache
+                    or cache_key in self.prefetch_cache or len(self._pending) >= self.max_pending):
+                return False
+            self._pending.add(cache_key)
+            self.submitted += 1
+        self._executor.submit(self._run, cache_key, build, serialize)
+        return True
+
+    def _run(self, cache_key, build, serialize):
+        try:
+            spec, size = serialize(build())
+            self.prefetch_cache.put(cache_key, (spec, size), size)
+            self.completed += 1
+        except Exception:
+            self.failed += 1
+            _LOGGER.exception("Error precalculando %s", cache_key[0])
+        finally:
+            with self._lock:
+                self._pending.discard(cache_key)
+
+    def stats(self):
+        return {
+            'pending': len(self._pending),
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+        }
+
+
+@st.cache_resource
+def get_prefetcher():
+    """Precálculo compartido por todas las sesiones"""
+    return Prefetcher(get_chart_cache(), get_prefetch_cache())
+
+
+def neighbor_days(selected, first, last, offsets=PREFETCH_OFFSETS):
+    """Días vecinos de `selected` dentro de [first, last], por orden de prioridad"""
+    days = []
+    for offset in offsets:
+        day = selected + timedelta(days=offset)
+        if first <= day <= last:
+            days.append(day)
+    return days
+
+
+def prefetch_altair(chart_id: str, key: tuple, build):
+    """Precalcula en segundo plano la spec que pediría altair_chart(chart_id, key, build)
+
+    `build` se ejecuta fuera del script: no puede usar elementos de Streamlit
+    ni funciones con st.cache_data (se usa la función original, __wrapped__).
+    """
+    return get_prefetcher().submit((chart_id, *key), build, _altair_spec)
+
+
+def prefetch_plotly(chart_id: str, key: tuple, build):
+    """Precalcula en segundo plano la spec que pediría plotly_chart(chart_id, key, build)"""
+    return get_prefetcher().submit((chart_id, *key), build, _plotly_spec)
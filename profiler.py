@@ -0,0 +1,226 @@
+"""Perfil de tiempos de renderizado por sección (?profile=1)
+
+Con el parámetro profile=1 cada rerun registra el tiempo de sus secciones con
+nombre: fragmentos de página, preparación de datos, agregados (funciones
+cacheadas de utils), construcción y serialización de specs y envío de los
+gráficos, además de los bytes de cada gráfico. El panel muestra la cascada del
+último rerun y permite descargar el historial en JSON Lines para comparar
+builds. Con RENDER_PROFILE_LOG cada rerun se añade también a ese fichero.
+
+Sin el parámetro las secciones no registran nada. Fuera de un script de
+Streamlit (hilos de precálculo, scripts) tampoco.
+"""
+import contextlib
+import functools
+import json
+import os
+import platform
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+RENDER_PROFILE_LOG = os.environ.get('RENDER_PROFILE_LOG')
+# Identificador del build con el que se etiqueta cada rerun en el log
+BUILD_ID = os.environ.get('BUILD_ID', 'local')
+# Reruns guardados por sesión
+PROFILE_HISTORY = 50
+
+# Tipos de sección y su color en la cascada
+SECTION_KINDS = {
+    'página': '#4C78A8',
+    'datos': '#72B7B2',
+    'agregación': '#F58518',
+    'spec': '#E45756',
+    'serialización': '#B279A2',
+    'envío': '#54A24B',
+}
+
+_STATE_KEY = '_render_profile'
+_log_lock = threading.Lock()
+
+
+def profiling_enabled():
+    """Si el rerun actual se está perfilando"""
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return False
+    return bool(st.query_params.get('profile'))
+
+
+def _state():
+    return st.session_state.setdefault(_STATE_KEY, {'current': None, 'runs': deque(maxlen=PROFILE_HISTORY)})
+
+
+def _new_run(page: str, fragment: bool = False):
+    return {
+        'build': BUILD_ID,
+        'page': page,
+        'fragment': fragment,
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'origin': time.perf_counter(),
+        'sections': [],
+        'payloads': [],
+        'depth': 0,
+    }
+
+
+def start_run(page: str):
+    """Abre el registro de un rerun completo de la página"""
+    if profiling_enabled():
+        _state()['current'] = _new_run(page)
+
+
+def finish_run():
+    """Cierra el rerun actual, lo guarda en el historial y en el log; devuelve el rerun"""
+    if not profiling_enabled():
+        return None
+    state = _state()
+    run = state['current']
+    if run is None:
+        return None
+    state['current'] = None
+    run['total_ms'] = round((time.perf_counter() - run.pop('origin')) * 1000, 2)
+    run.pop('depth')
+    state['runs'].append(run)
+    if RENDER_PROFILE_LOG:
+        with _log_lock, open(RENDER_PROFILE_LOG, 'a', encoding='utf-8') as log:
+            log.write(json.dumps(run, default=str) + '\n')
+    return run
+
+
+@contextlib.contextmanager
+def section(name: str, kind: str = 'página'):
+    """Mide el bloque como una sección del rerun
+
+    Si no hay un rerun abierto (rerun de un fragmento) una sección de página
+    abre uno propio, que se cierra al salir de ella; las demás no se miden.
+    """
+    if not profiling_enabled():
+        yield
+        return
+    state = _state()
+    implicit = state['current'] is None
+    if implicit and kind != 'página':
+        yield
+        return
+    if implicit:
+        state['current'] = _new_run(name, fragment=True)
+    run = state['current']
+    depth = run['depth']
+    run['depth'] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        run['depth'] -= 1
+        run['sections'].append({
+            'name': name,
+            'kind': kind,
+            'depth': depth,
+            'start_ms': round((start - run['origin']) * 1000, 2),
+            'ms': round((end - start) * 1000, 2),
+        })
+        if implicit:
+            finish_run()
+
+
+def profiled(name: str = None, kind: str = 'página'):
+    """Decorador: mide cada llamada a la función como una sección"""
+    def decorator(function):
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with section(label, kind):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_payload(chart_id: str, size: int, origin: str):
+    """Bytes de la spec enviada por un gráfico y de dónde salió (caché, precálculo o cálculo)"""
+    if not profiling_enabled():
+        return
+    run = _state()['current']
+    if run is not None:
+        run['payloads'].append({'chart': chart_id, 'bytes': int(size or 0), 'origin': origin})
+
+
+def _sections_frame(run):
+    sections = pd.DataFrame(run['sections'], columns=['name', 'kind', 'depth', 'start_ms', 'ms'])
+    if sections.empty:
+        return sections
+    sections = sections.sort_values('start_ms', kind='stable').reset_index(drop=True)
+    sections['end_ms'] = sections['start_ms'] + sections['ms']
+    # Tiempo propio: duración menos la de las secciones hijas directas
+    own = sections['ms'].copy()
+    for i, row in sections.iterrows():
+        children = sections[(sections['depth'] == row['depth'] + 1)
+                            & (sections['start_ms'] >= row['start_ms'])
+                            & (sections['end_ms'] <= row['end_ms'])]
+        own[i] -= children['ms'].sum()
+    sections['own_ms'] = own.clip(lower=0).round(2)
+    sections['label'] = ['  ' * depth + name for depth, name in zip(sections['depth'], sections['name'])]
+    return sections
+
+
+def _waterfall(sections):
+    # altair solo se importa al mostrar el panel: no entra en el arranque en frío
+    import altair as alt
+
+    return alt.Chart(sections).mark_bar().encode(
+        x=alt.X('start_ms:Q', title='ms desde el inicio del rerun'),
+        x2='end_ms:Q',
+        y=alt.Y('label:N', sort=None, title=None, axis=alt.Axis(labelLimit=320)),
+        color=alt.Color('kind:N', title='Tipo',
+                        scale=alt.Scale(domain=list(SECTION_KINDS), range=list(SECTION_KINDS.values()))),
+        tooltip=[alt.Tooltip('name:N', title='Sección'), alt.Tooltip('kind:N', title='Tipo'),
+                 alt.Tooltip('ms:Q', title='Duración (ms)'), alt.Tooltip('own_ms:Q', title='Propio (ms)')],
+    ).properties(height=max(120, 18 * len(sections)))
+
+
+def _export_lines(runs):
+    header = {'python': platform.python_version(), 'streamlit': st.__version__, 'pandas': pd.__version__}
+    return ''.join(json.dumps({**header, **run}, default=str) + '\n' for run in runs)
+
+
+def render_profile():
+    """Cascada del último rerun, bytes por gráfico, resumen por tipo y exportación"""
+    runs = list(_state()['runs'])
+    if not runs:
+        st.info("Todavía no hay reruns perfilados.")
+        return
+    full_runs = [run for run in runs if not run['fragment']]
+    run = full_runs[-1] if full_runs else runs[-1]
+    payload_bytes = sum(payload['bytes'] for payload in run['payloads'])
+    st.caption(f"Rerun de {run['page']} a las {run['started']}: {run['total_ms']:.0f} ms, "
+               f"{len(run['payloads'])} gráficos, {payload_bytes / 1024:,.0f} KB de specs · build {run['build']}")
+
+    sections = _sections_frame(run)
+    if not sections.empty:
+        st.altair_chart(_waterfall(sections), width='stretch')
+        by_kind = sections.groupby('kind', sort=False)['own_ms'].sum().round(1)
+        st.dataframe(by_kind.rename('Tiempo propio (ms)').rename_axis('Tipo').reset_index(), hide_index=True)
+
+    if run['payloads']:
+        payloads = pd.DataFrame(run['payloads']).rename(columns={'chart': 'Gráfico', 'bytes': 'Bytes', 'origin': 'Origen'})
+        st.dataframe(payloads.sort_values('Bytes', ascending=False), hide_index=True)
+
+    fragments = [run for run in runs if run['fragment']]
+    if fragments:
+        st.dataframe(pd.DataFrame([
+            {'Fragmento': run['page'], 'Inicio': run['started'], 'Total (ms)': run['total_ms']}
+            for run in fragments[-10:]
+        ]), hide_index=True)
+
+    st.download_button("Descargar perfil (JSON Lines)", _export_lines(runs),
+                       file_name=f"render_profile_{BUILD_ID}.jsonl", mime='application/json')
+
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+
+# Franjas horarias de los scatter plots de correlación
+TIME_SLOTS = ['00:00 - 04:00', '04:00 - 08:00', '08:00 - 12:00',
+              '12:00 - 16:00', '16:00 - 20:00', '20:00 - 24:00']
+TIME_SLOT_DTYPE = pd.CategoricalDtype(TIME_SLOTS, ordered=True)
+
+# Tipos del dataset del inversor. Datetime se guarda como datetime64[ns]: por
+# debajo es un epoch int64 (8 bytes por fila) y conserva los accesores .dt
+DATASET_SCHEMA = {
+    'Datetime': 'datetime64[ns]',
+    'DirectConsumption(W)': 'float32',
+    'BatteryDischarging(W)': 'float32',
+    'ExternalEnergySupply(W)': 'float32',
+    'TotalConsumption(W)': 'float32',
+    'HeatingSystem(W)': 'float32',
+    'PV_PowerGeneration(W)': 'float32',
+    'temperature': 'float32',
+    'precipitation': 'float32',
+    'WindSpeed': 'float32',
+    'radiation': 'float32',
+    'ApparentTemperature': 'float32',
+    'CloudCover': 'float32',
+    'Quality': 'uint8',
+}
+
+# Tipos de los lotes subidos en Predicciones (tras el mapeo de columnas). Las
+# entradas de los modelos se quedan en float64: en float32 llegarían con ruido
+# (21.3 -> 21.299999237060547) y cambiarían las predicciones
+BATCH_SCHEMA = {
+    'datetime': 'datetime64[ns]',
+    'Temperature': 'float64',
+    'Solar Irradiation': 'float64',
+    'timestamp_week': 'Int16',
+}
+
+
+def apply_schema(df: pd.DataFrame, schema: dict, compact: bool = False):
+    """Convierte las columnas a los tipos declarados
+
+    Con `compact` las columnas fuera del esquema también se compactan: float64
+    pasa a float32 y los enteros a entero nullable. Solo para el dataset del
+    dashboard; las entradas de los modelos conservan su precisión. Lanza
+    ValueError si una columna declarada no admite su tipo.
+    """
+    converted = {}
+    for name in df.columns:
+        values = df[name]
+        dtype = schema.get(name)
+        if dtype is None and compact:
+            if pd.api.types.is_float_dtype(values) and values.dtype != np.float32:
+                dtype = 'float32'
+            elif pd.api.types.is_integer_dtype(values) and not isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+                dtype = 'Int64'
+        if dtype is None or values.dtype == dtype:
+            converted[name] = values
+            continue
+        try:
+            if dtype == 'datetime64[ns]':
+                converted[name] = pd.to_datetime(values).astype(dtype)
+            elif dtype in ('Int16', 'Int32', 'Int64') and pd.api.types.is_float_dtype(values):
+                # Los floats enteros (NaN incluido) se convierten sin perder los nulos
+                converted[name] = values.round().astype(dtype)
+            else:
+                converted[name] = values.astype(dtype)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"La columna '{name}' no se puede convertir a {dtype}: {e}") from e
+    return pd.DataFrame(converted, index=df.index)
+
+
+def time_slots(timestamps: pd.Series):
+    """Franja horaria de 4 horas de cada fecha como categórica (1 byte por fila)"""
+    codes = (timestamps.dt.hour.to_numpy() // 4).astype('int8')
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=TIME_SLOT_DTYPE), index=timestamps.index)
+
+
+def memory_report(frames: dict):
+    """Memoria ocupada por cada DataFrame (filas, columnas, bytes y bytes por fila)"""
+    rows = []
+    for name, df in frames.items():
+        total = int(df.memory_usage(index=True, deep=True).sum())
+        rows.append({
+            'DataFrame': name,
+            'Filas': len(df),
+            'Columnas': len(df.columns),
+            'Memoria (MB)': round(total / 1024 ** 2, 2),
+            'Bytes por fila': round(total / len(df), 1) if len(df) else 0.0,
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,263 @@
+"""Generador de datasets sintéticos de varios edificios y años para pruebas de escala
+
+Uso:
+    python synthetic_data.py [--buildings 3] [--years 5] [--start 2024-01-01] [--out data/sintetico] [--seed 0]
+
+Por cada edificio escribe en <out>/edificio_NN/ los dos ficheros con el mismo
+esquema que los originales:
+    inversor_data_with_heating.csv  (lecturas de 15 minutos del inversor y meteorología)
+    data_01_formatted.csv           (entrada de los modelos de predicción, separador ';')
+
+La meteorología es común a todos los edificios (misma ubicación): estacionalidad
+anual y diaria, anomalías de varios días, nubosidad, lluvia y viento. Cada
+edificio tiene su propio consumo base, ocupación, calefacción, potencia
+fotovoltaica y batería. Los festivos nacionales de fecha fija y los fines de
+semana bajan la ocupación, y en cada año se quitan algunos tramos de lecturas
+(cortes de comunicación) como en los datos reales.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_SYNTHETIC_PATH = "data/sintetico"
+STEP = pd.Timedelta(minutes=15)
+STEP_HOURS = 0.25
+
+# Latitud de la ubicación simulada (radiación solar)
+LATITUDE = 40.4
+
+# Festivos nacionales de fecha fija (mes, día)
+HOLIDAYS = [(1, 1), (1, 6), (5, 1), (8, 15), (10, 12), (11, 1), (12, 6), (12, 8), (12, 25)]
+
+# Cortes de lecturas por año y duración media en lecturas de 15 minutos
+GAPS_PER_YEAR = 6
+MEAN_GAP_STEPS = 24
+
+INVERTER_COLUMNS = [
+    'Datetime', 'DirectConsumption(W)', 'BatteryDischarging(W)', 'ExternalEnergySupply(W)',
+    'TotalConsumption(W)', 'HeatingSystem(W)', 'PV_PowerGeneration(W)', 'temperature',
+    'precipitation', 'WindSpeed', 'radiation', 'ApparentTemperature', 'CloudCover',
+]
+
+
+def time_grid(start, years: int):
+    """Rejilla de 15 minutos desde `start` durante `years` años (extremo final excluido)"""
+    start = pd.Timestamp(start)
+    return pd.date_range(start, start + pd.DateOffset(years=years), freq=STEP, inclusive='left')
+
+
+def holiday_mask(index: pd.DatetimeIndex):
+    """True en las lecturas de días festivos"""
+    month_day = index.month * 100 + index.day
+    return np.isin(month_day, [month * 100 + day for month, day in HOLIDAYS])
+
+
+def _daily_ar1(days: int, rng, phi: float, sigma: float):
+    # Anomalía diaria autocorrelacionada (AR(1)) con desviación estacionaria `sigma`
+    noise = rng.normal(0.0, sigma * np.sqrt(1 - phi ** 2), days)
+    values = np.empty(days)
+    values[0] = rng.normal(0.0, sigma)
+    for day in range(1, days):
+        values[day] = phi * values[day - 1] + noise[day]
+    return values
+
+
+def _per_step(daily: np.ndarray, day_index: np.ndarray, day_fraction: np.ndarray):
+    # Interpola linealmente un valor diario a cada lectura (sin saltos a medianoche)
+    following = np.minimum(day_index + 1, len(daily) - 1)
+    return daily[day_index] * (1 - day_fraction) + daily[following] * day_fraction
+
+
+def generate_weather(index: pd.DatetimeIndex, rng):
+    """Meteorología en la rejilla: temperatura, lluvia, viento, radiación, sensación térmica y nubosidad"""
+    n = len(index)
+    day_of_year = index.dayofyear.to_numpy()
+    hour = index.hour.to_numpy() + index.minute.to_numpy() / 60
+    day_index = ((index - index[0].normalize()) // pd.Timedelta(days=1)).to_numpy()
+    days = int(day_index[-1]) + 1
+    day_fraction = hour / 24
+
+    seasonal = 13.0 - 9.5 * np.cos(2 * np.pi * (day_of_year - 18) / 365.25)
+    diurnal_amplitude = 4.0 + 2.0 * np.cos(2 * np.pi * (day_of_year - 196) / 365.25)
+    diurnal = diurnal_amplitude * np.cos(2 * np.pi * (hour - 15) / 24)
+    anomaly = _per_step(_daily_ar1(days, rng, 0.8, 2.5), day_index, day_fraction)
+    temperature = seasonal + diurnal + anomaly + rng.normal(0.0, 0.3, n)
+
+    # Nubosidad: anomalía diaria en escala logística, más nubes en invierno
+    cloud_logit = (0.3 * np.cos(2 * np.pi * (day_of_year - 15) / 365.25)
+                   + _per_step(_daily_ar1(days, rng, 0.6, 1.6), day_index, day_fraction)
+                   + rng.normal(0.0, 0.4, n))
+    cloud_cover = 100 / (1 + np.exp(-cloud_logit))
+
+    # Radiación de cielo despejado por la altura solar (hora solar ≈ UTC)
+    declination = np.radians(23.44) * np.sin(2 * np.pi * (284 + day_of_year) / 365)
+    hour_angle = np.radians(15 * (hour - 12))
+    latitude = np.radians(LATITUDE)
+    sin_elevation = (np.sin(latitude) * np.sin(declination)
+                     + np.cos(latitude) * np.cos(declination) * np.cos(hour_angle))
+    clear_sky = 1000 * np.clip(sin_elevation, 0, None) ** 1.15
+    radiation = clear_sky * (1 - 0.75 * (cloud_cover / 100) ** 3)
+
+    rain_probability = np.clip((cloud_cover - 70) / 30, 0, None) * 0.15
+    precipitation = np.where(rng.random(n) < rain_probability, rng.exponential(0.8, n), 0.0)
+
+    wind_daily = rng.gamma(4.0, 2.5, days)
+    wind_speed = np.clip(_per_step(wind_daily, day_index, day_fraction) + rng.normal(0.0, 1.5, n), 0, None)
+    apparent_temperature = temperature - 0.12 * wind_speed * (temperature < 18)
+
+    return pd.DataFrame({
+        'temperature': temperature,
+        'precipitation': precipitation,
+        'WindSpeed': wind_speed,
+        'radiation': radiation,
+        'ApparentTemperature': apparent_temperature,
+        'CloudCover': cloud_cover,
+    }, index=index)
+
+
+def building_profile(rng, scale: float = None):
+    """Parámetros de un edificio elegidos al azar (potencias en W)"""
+    scale = rng.uniform(0.6, 1.8) if scale is None else scale
+    return {
+        'base_load': rng.uniform(150, 300) * scale,
+        'occupancy_load': rng.uniform(500, 1000) * scale,
+        'occupancy_hours': (int(rng.integers(6, 9)), int(rng.integers(17, 21))),
+        'heating_per_degree': rng.uniform(50, 90) * scale,
+        'heating_setpoint': rng.uniform(15, 17),
+        'pv_capacity': rng.uniform(2000, 5000) * scale,
+        'battery_wh': rng.uniform(3000, 10000) * scale,
+        'battery_efficiency': 0.9,
+    }
+
+
+def generate_inverter(weather: pd.DataFrame, profile: dict, rng, holidays: np.ndarray = None):
+    """Lecturas del inversor de un edificio para la meteorología dada (sin huecos)"""
+    index = weather.index
+    n = len(index)
+    hour = index.hour.to_numpy()
+    holidays = holiday_mask(index) if holidays is None else holidays
+    working_day = (index.dayofweek.to_numpy() < 5) & ~holidays
+    opens, closes = profile['occupancy_hours']
+    occupied = (hour >= opens) & (hour < closes)
+    occupancy = np.where(occupied, np.where(working_day, 1.0, 0.2), 0.0)
+
+    temperature = weather['temperature'].to_numpy()
+    radiation = weather['radiation'].to_numpy()
+    heating_demand = np.clip(profile['heating_setpoint'] - temperature, 0, None)
+    heating = profile['heating_per_degree'] * heating_demand * np.where(occupied, 1.0, 0.5)
+    noise = rng.lognormal(0.0, 0.05, n)
+    heating = heating * noise
+    total = (profile['base_load'] + profile['occupancy_load'] * occupancy) * noise + heating
+
+    cell_temperature = temperature + 0.03 * radiation
+    pv = profile['pv_capacity'] * radiation / 1000 * (1 - 0.004 * (cell_temperature - 25))
+    pv = np.clip(pv, 0, None)
+    direct = np.minimum(pv, total)
+
+    # Batería: el excedente solar del día la carga (hasta su capacidad) y por
+    # la tarde cubre el déficit hasta agotar lo cargado
+    day = pd.Series(index.normalize(), index=index)
+    surplus_wh = pd.Series((pv - direct) * STEP_HOURS, index=index).groupby(day).transform('sum').to_numpy()
+    stored_wh = np.minimum(surplus_wh * profile['battery_efficiency'], profile['battery_wh'])
+    deficit_wh = np.where(hour >= 12, (total - direct) * STEP_HOURS, 0.0)
+    used_before = pd.Series(deficit_wh, index=index).groupby(day).cumsum().to_numpy() - deficit_wh
+    battery = np.clip(np.minimum(deficit_wh, stored_wh - used_before), 0, None) / STEP_HOURS
+    external = total - direct - battery
+
+    frame = weather.copy()
+    frame['DirectConsumption(W)'] = direct
+    frame['BatteryDischarging(W)'] = battery
+    frame['ExternalEnergySupply(W)'] = external
+    frame['TotalConsumption(W)'] = total
+    frame['HeatingSystem(W)'] = heating
+    frame['PV_PowerGeneration(W)'] = pv
+    return frame.rename_axis('Datetime').reset_index()[INVERTER_COLUMNS]
+
+
+def drop_gaps(df: pd.DataFrame, rng, gaps_per_year: float = GAPS_PER_YEAR, mean_gap_steps: int = MEAN_GAP_STEPS):
+    """Quita tramos de lecturas seguidas (cortes), de longitud geométrica"""
+    years = len(df) * STEP_HOURS / (24 * 365.25)
+    gaps = rng.poisson(gaps_per_year * years)
+    keep = np.ones(len(df), dtype=bool)
+    for start, length in zip(rng.integers(0, len(df), gaps), rng.geometric(1 / mean_gap_steps, gaps)):
+        keep[start:start + length] = False
+    return df[keep].reset_index(drop=True)
+
+
+def formatted_frame(inverter: pd.DataFrame):
+    """Dataset de entrada de los modelos (esquema de data_01_formatted.csv) a partir del inversor"""
+    timestamps = inverter['Datetime']
+    dates = timestamps.dt
+    day_week = dates.dayofweek
+    hour_week = day_week * 24 + dates.hour
+    return pd.DataFrame({
+        'DATE': timestamps.dt.strftime('%Y-%m-%d %H:%M:%S+00:00'),
+        'Holiday': holiday_mask(pd.DatetimeIndex(timestamps)),
+        'Temperature': inverter['temperature'],
+        'Solar_Irradiation': inverter['radiation'],
+        'Power': inverter['TotalConsumption(W)'],
+        'DATE_YYYY_MM_DD': dates.strftime('%Y-%m-%d'),
+        'DATE_year': dates.year,
+        'DATE_month_year': dates.month,
+        'DATE_week_year': dates.isocalendar().week.astype('int64'),
+        'DATE_day_year': dates.dayofyear,
+        'DATE_day_month': dates.day,
+        'DATE_day_week': day_week,
+        'DATE_hour_year': (dates.dayofyear - 1) * 24 + dates.hour,
+        'DATE_hour_week': hour_week,
+        'DATE_hour_day': dates.hour,
+        'DATE_weekday': day_week < 5,
+        'DATE_timestamp_week': hour_week * 4 + dates.minute // 15,
+    })
+
+
+def generate_dataset(buildings: int = 1, years: int = 1, start='2024-01-01', seed: int = 0, gaps: bool = True):
+    """Genera (inversor, formateado) de cada edificio; devuelve una lista de tuplas de DataFrames"""
+    rng = np.random.default_rng(seed)
+    index = time_grid(start, years)
+    weather = generate_weather(index, rng)
+    holidays = holiday_mask(index)
+    datasets = []
+    for _ in range(buildings):
+        building_rng = np.random.default_rng(rng.integers(2 ** 63))
+        inverter = generate_inverter(weather, building_profile(building_rng), building_rng, holidays)
+        if gaps:
+            inverter = drop_gaps(inverter, building_rng)
+        datasets.append((inverter, formatted_frame(inverter)))
+    return datasets
+
+
+def write_dataset(datasets, root: str = DEFAULT_SYNTHETIC_PATH):
+    """Escribe los CSV de cada edificio en <root>/edificio_NN/; devuelve las carpetas escritas"""
+    written = []
+    for number, (inverter, formatted) in enumerate(datasets, start=1):
+        directory = os.path.join(root, f"edificio_{number:02d}")
+        os.makedirs(directory, exist_ok=True)
+        inverter.to_csv(os.path.join(directory, 'inversor_data_with_heating.csv'), index=False,
+                        float_format='%.3f', date_format='%Y-%m-%d %H:%M:%S')
+        formatted.to_csv(os.path.join(directory, 'data_01_formatted.csv'), sep=';', index=False, float_format='%.3f')
+        written.append(directory)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datasets sintéticos de inversor y meteorología")
+    parser.add_argument('--buildings', type=int, default=3, help="Número de edificios")
+    parser.add_argument('--years', type=int, default=5, help="Años de lecturas de 15 minutos")
+    parser.add_argument('--start', default='2024-01-01', help="Fecha de la primera lectura")
+    parser.add_argument('--out', default=DEFAULT_SYNTHETIC_PATH, help="Directorio de salida")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla (misma semilla, mismos datos)")
+    parser.add_argument('--no-gaps', action='store_true', help="No quitar tramos de lecturas")
+    args = parser.parse_args()
+
+    datasets = generate_dataset(args.buildings, args.years, args.start, args.seed, gaps=not args.no_gaps)
+    written = write_dataset(datasets, args.out)
+    rows = sum(len(inverter) for inverter, _ in datasets)
+    print(f"{len(written)} edificios escritos en {args.out} ({rows:,} filas de inversor)")
+
+
+if __name__ == '__main__':
+    main()
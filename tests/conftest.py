@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos de la app están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cleaning import clean_readings
+from schema import DATASET_SCHEMA, apply_schema
+from synthetic_data import generate_dataset
+
+
+@pytest.fixture(scope='session')
+def dataset():
+    """Un año sintético de un edificio, con cortes, limpio y tipado como lo carga get_store"""
+    inverter, _ = generate_dataset(buildings=1, years=1, seed=0)[0]
+    return apply_schema(clean_readings(inverter), DATASET_SCHEMA, compact=True)
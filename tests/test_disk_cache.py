@@ -0,0 +1,32 @@
+"""Caché en disco compartida por sesiones y réplicas"""
+import threading
+
+from disk_cache import DiskCache
+
+
+def test_counters_do_not_lose_updates_across_threads(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"))
+    cache.put('present', 1)
+    threads, calls = 8, 200
+
+    def worker():
+        for i in range(calls):
+            cache.get('present')
+            cache.get(f'missing-{i}')
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (threads * calls, threads * calls)
+
+
+def test_evictions_are_counted(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"), max_bytes=10_000)
+    for i in range(20):
+        cache.put(f'entry-{i}', b'x' * 2_000)
+    stats = cache.stats()
+    assert stats['bytes'] <= 10_000
+    assert stats['entries'] + stats['evictions'] == 20
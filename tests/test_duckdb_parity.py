@@ -0,0 +1,95 @@
+"""Paridad de las agregaciones DuckDB con la versión pandas de utils"""
+import inspect
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('duckdb')
+
+import utils
+from duckdb_backend import (MEAN_RTOL, WEEKLY_CONSUMPTION_RTOL, WEEKLY_SOURCES_RTOL, WEEKLY_WEATHER_RTOL,
+                            DuckDBBackend, compare_frames, parity_report)
+
+
+MEANS = ('temperature', 'TotalConsumption(W)', 'radiation')
+
+
+@pytest.fixture(scope='module', params=['frame', 'partitions'])
+def backend(request, dataset, tmp_path_factory):
+    if request.param == 'frame':
+        return DuckDBBackend.from_frame(dataset)
+    pytest.importorskip('pyarrow')
+    from partitions import write_partitions
+
+    root = str(tmp_path_factory.mktemp('particiones'))
+    write_partitions(dataset, root)
+    return DuckDBBackend.from_partitions(root)
+
+
+@pytest.fixture(scope='module')
+def pandas_version(dataset):
+    def run(function, *args):
+        configured, utils.DATA_BACKEND = utils.DATA_BACKEND, 'pandas'
+        try:
+            return inspect.unwrap(function)(dataset, 'test', *args)
+        finally:
+            utils.DATA_BACKEND = configured
+
+    return run
+
+
+def _days(dataset):
+    timestamps = dataset['Datetime']
+    # La limpieza rellena la rejilla de 15 minutos: los cortes quedan como NaN
+    missing = dataset['TotalConsumption(W)'].isna().groupby(timestamps.dt.date).sum()
+    return {
+        'primero': timestamps.iloc[0].date(),
+        'fin de mes': timestamps.iloc[len(dataset) // 3].to_period('M').end_time.date(),
+        'con corte': missing.idxmax(),
+    }
+
+
+@pytest.mark.parametrize('aggregation, function, rtol', [
+    ('weekly_sources', utils.compute_weekly_sources, WEEKLY_SOURCES_RTOL),
+    ('weekly_consumption', utils.compute_weekly_consumption, WEEKLY_CONSUMPTION_RTOL),
+    ('weekly_weather', utils.compute_weekly_weather, WEEKLY_WEATHER_RTOL),
+])
+def test_weekly(backend, pandas_version, aggregation, function, rtol):
+    expected = pandas_version(function)
+    assert compare_frames(expected, getattr(backend, aggregation)(), rtol) is None
+
+
+def test_daily_means(backend, pandas_version):
+    expected = pandas_version(utils.compute_daily_means, MEANS)
+    assert compare_frames(expected, backend.daily_means(MEANS), {name: MEAN_RTOL for name in MEANS}) is None
+
+
+@pytest.mark.parametrize('day', ['primero', 'fin de mes', 'con corte'])
+@pytest.mark.parametrize('aggregation, function', [
+    ('daily_stack', utils.compute_daily_stack),
+    ('daily_consumption', utils.compute_daily_consumption),
+])
+def test_daily_rows_exact(dataset, backend, pandas_version, day, aggregation, function):
+    # Lecturas de un día sin agregar: mismos valores bit a bit
+    selected_date = _days(dataset)[day]
+    expected = pandas_version(function, selected_date)
+    assert len(expected)
+    assert compare_frames(expected, getattr(backend, aggregation)(selected_date)) is None
+
+
+def test_parity_report(dataset, backend):
+    assert [difference for _, difference in parity_report(dataset, backend)] == [None] * 8
+
+
+def test_compare_frames_checks_dtypes():
+    expected = pd.DataFrame({'Fecha': pd.date_range('2024-01-01', periods=3), 'x': np.ones(3, dtype='float32')})
+    actual = expected.astype({'x': 'float64'})
+    assert compare_frames(expected, actual, {'x': MEAN_RTOL}) is not None
+
+
+def test_compare_frames_tolerance_only_where_given():
+    expected = pd.DataFrame({'x': np.array([1.0, 2.0]), 'y': np.array([1.0, 2.0])})
+    actual = pd.DataFrame({'x': np.array([1.0, 2.0 + 1e-9]), 'y': np.array([1.0, 2.0])})
+    assert compare_frames(expected, actual, {'x': MEAN_RTOL}) is None
+    assert compare_frames(expected, actual) is not None
@@ -0,0 +1,37 @@
+"""Exportación por bloques de las descargas"""
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+import export
+from export import export_frame
+
+
+@pytest.fixture
+def frame(dataset, monkeypatch):
+    # Varios bloques y uno final incompleto
+    monkeypatch.setattr(export, 'EXPORT_CHUNK_ROWS', 1000)
+    return dataset.head(3500)
+
+
+def test_csv_matches_to_csv(frame):
+    assert export_frame(frame, 'csv') == frame.to_csv(index=False).encode()
+
+
+def test_gzip_csv_matches_to_csv(frame):
+    assert gzip.decompress(export_frame(frame, 'csv.gz')) == frame.to_csv(index=False).encode()
+
+
+def test_parquet_round_trip(frame):
+    pytest.importorskip('pyarrow')
+    pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(export_frame(frame, 'parquet'))),
+                                  frame.reset_index(drop=True))
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'csv.gz', 'parquet'])
+def test_empty_frame(dataset, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    assert export_frame(dataset.head(0), fmt)
@@ -0,0 +1,24 @@
+"""Caché de posiciones de las tablas paginadas"""
+import numpy as np
+import pandas as pd
+
+from paged_table import get_order_cache, table_positions
+
+
+def test_tables_sharing_a_version_do_not_share_positions():
+    get_order_cache().clear()
+    weather = pd.DataFrame({'value': [3.0, 1.0, 2.0]})
+    results = pd.DataFrame({'value': [1.0, 2.0, 3.0, 0.0]})
+    first = table_positions(weather, 'value', version='v1', table='weather_raw', columns=['value'])
+    second = table_positions(results, 'value', version='v1', table='batch_results', columns=['value'])
+    np.testing.assert_array_equal(first, [1, 2, 0])
+    np.testing.assert_array_equal(second, [3, 0, 1, 2])
+
+
+def test_column_subset_is_part_of_the_key():
+    get_order_cache().clear()
+    df = pd.DataFrame({'a': [2.0, 1.0], 'b': [1.0, 2.0]})
+    table_positions(df, 'a', version='v1', table='t', columns=['a'])
+    assert len(get_order_cache()) == 1
+    table_positions(df, 'a', version='v1', table='t', columns=['a', 'b'])
+    assert len(get_order_cache()) == 2
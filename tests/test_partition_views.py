@@ -0,0 +1,90 @@
+"""Vistas diarias y de rango servidas desde las particiones Parquet"""
+import inspect
+import math
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import partitions
+import utils
+from data_store import DatasetStore
+from partitions import write_partitions
+
+
+@pytest.fixture(scope='module')
+def root(dataset, tmp_path_factory):
+    root = str(tmp_path_factory.mktemp('particiones'))
+    write_partitions(dataset, root)
+    return root
+
+
+@pytest.fixture
+def configured(root, monkeypatch):
+    monkeypatch.setattr(partitions, 'DATA_PARTITIONS', root)
+    monkeypatch.setattr(partitions, '_dataset', None)
+    monkeypatch.setattr(utils, 'DATA_BACKEND', 'pandas')
+
+
+def _from_frame(function, *args, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(partitions, 'DATA_PARTITIONS', None)
+        return function(*args)
+
+
+def test_day_rows_match_the_store(dataset, configured, monkeypatch):
+    day = dataset['Datetime'].iloc[len(dataset) // 2].date()
+    columns = ['TotalConsumption(W)', 'HeatingSystem(W)']
+    assert utils._partition_rows(dataset, pd.Timestamp(day), pd.Timestamp(day) + pd.Timedelta(days=1)) is not None
+    expected = _from_frame(utils.day_rows, dataset, day, columns, monkeypatch=monkeypatch)
+    pd.testing.assert_frame_equal(utils.day_rows(dataset, day, columns), expected.reset_index(drop=True),
+                                  check_exact=True)
+
+
+@pytest.mark.parametrize('function', [utils.compute_daily_stack, utils.compute_daily_consumption])
+def test_daily_views_match_the_store(dataset, configured, monkeypatch, function):
+    day = dataset['Datetime'].iloc[len(dataset) // 3].date()
+    raw = inspect.unwrap(function)
+    expected = _from_frame(raw, dataset, 'test', day, monkeypatch=monkeypatch)
+    pd.testing.assert_frame_equal(raw(dataset, 'test', day).reset_index(drop=True),
+                                  expected.reset_index(drop=True), check_exact=True)
+
+
+def test_partitions_behind_the_store_are_not_used(dataset, configured):
+    # Filas del modo en vivo que aún no están en Parquet
+    extra = dataset.tail(1).assign(Datetime=dataset['Datetime'].iloc[-1] + pd.Timedelta(minutes=15))
+    store_frame = pd.concat([dataset, extra], ignore_index=True)
+    last_day = extra['Datetime'].iloc[0].normalize()
+    assert utils._partition_rows(store_frame, last_day, last_day + pd.Timedelta(days=1)) is None
+    assert utils._partition_rows(store_frame, last_day - pd.Timedelta(days=1), last_day) is not None
+
+
+@pytest.mark.parametrize('days', [1, 45])
+def test_range_totals_match_the_prefix_sums(dataset, configured, days):
+    store = DatasetStore(dataset)
+    start = pd.Timestamp(dataset['Datetime'].iloc[len(dataset) // 2].date())
+    end = start + pd.Timedelta(days=days)
+    assert utils._partition_rows(dataset, start, end) is not None
+    count, totals, means = inspect.unwrap(utils.compute_range_totals)(store, 'test', start, end)
+    prefix_sums = store.prefix_sums
+    assert count == prefix_sums.count(start, end)
+    for name, total in prefix_sums.totals(start, end).items():
+        assert totals[name] == pytest.approx(total, rel=1e-9)
+    for name, mean in prefix_sums.means(start, end).items():
+        assert (math.isnan(means[name]) and math.isnan(mean)) or means[name] == pytest.approx(mean, rel=1e-9)
+
+
+def test_refresh_only_rediscovers_when_months_are_added(dataset, tmp_path, monkeypatch):
+    root = str(tmp_path)
+    write_partitions(dataset[dataset['Datetime'] < '2024-03-01'], root)
+    partitioned = partitions.PartitionedDataset(root)
+    walks = []
+    discover = partitioned._discover
+    monkeypatch.setattr(partitioned, '_discover', lambda: walks.append(1) or discover())
+    partitioned.refresh()
+    partitioned.high_water_mark()
+    assert walks == [] and len(partitioned.partitions) == 2
+    write_partitions(dataset[dataset['Datetime'].dt.month == 3], root)
+    assert partitioned.high_water_mark() == dataset.loc[dataset['Datetime'].dt.month == 3, 'Datetime'].max()
+    assert walks == [1] and len(partitioned.partitions) == 3
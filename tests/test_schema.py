@@ -0,0 +1,30 @@
+"""Tipos del dataset del dashboard y de las entradas de los modelos"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from schema import BATCH_SCHEMA, DATASET_SCHEMA, apply_schema
+from uploads import read_upload
+
+
+def test_undeclared_columns_are_only_compacted_on_request():
+    df = pd.DataFrame({'Datetime': pd.date_range('2024-01-01', periods=2), 'extra': [0.1, 0.2], 'count': [1, 2]})
+    kept = apply_schema(df, DATASET_SCHEMA)
+    assert kept['extra'].dtype == np.float64 and kept['count'].dtype == np.int64
+    compacted = apply_schema(df, DATASET_SCHEMA, compact=True)
+    assert compacted['extra'].dtype == np.float32 and compacted['count'].dtype == 'Int64'
+
+
+def test_batch_features_keep_their_values():
+    upload = io.BytesIO(b"time,temp,solar,other\n2024-01-01 10:00,21.3,512.7,0.35\n2024-01-01 11:00,22.1,600.2,0.4\n")
+    df = read_upload(upload, usecols=['time', 'temp', 'solar', 'other'],
+                     dtypes={'temp': 'float64', 'solar': 'float64'}, time_column='time')
+    assert df['other'].dtype == np.float64
+    df = df.rename(columns={'temp': 'Temperature', 'solar': 'Solar Irradiation'})
+    df['datetime'] = df['time']
+    df['timestamp_week'] = df['datetime'].dt.dayofweek * 24 + df['datetime'].dt.hour
+    df = apply_schema(df, BATCH_SCHEMA)
+    # Lo que recibe el servicio de predicción: los valores del CSV, sin ruido de float32
+    assert df['Temperature'].values.tolist() == [21.3, 22.1]
+    assert df['Solar Irradiation'].values.tolist() == [512.7, 600.2]
@@ -0,0 +1,128 @@
+import hashlib
+import importlib.util
+import io
+import os
+
+import pandas as pd
+import streamlit as st
+
+from chart_cache import LRUCache
+from disk_cache import cache_key, get_disk_cache
+from schema import apply_schema
+
+
+# Lotes parseados y resultados de predicción en caché (compartida entre sesiones)
+UPLOAD_CACHE_MAX_ENTRIES = 32
+UPLOAD_CACHE_MAX_BYTES = 512 * 1024 ** 2
+
+
+# Codificaciones que el motor CSV de pyarrow lee directamente
+_PYARROW_ENCODINGS = {'utf-8', 'utf8', 'latin-1', 'iso-8859-1', 'cp1252'}
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def read_header(source, sep: str = ',', encoding: str = 'utf-8'):
+    """Nombres de columna del CSV leyendo solo la primera línea"""
+    header = pd.read_csv(_rewind(source), sep=sep, encoding=encoding, nrows=0).columns.tolist()
+    _rewind(source)
+    return header
+
+
+def parse_timestamps(values: pd.Series):
+    """Fechas ISO-8601 (p. ej. 2025-11-01T00:00) sin inferir el formato fila a fila"""
+    try:
+        return pd.to_datetime(values, format='ISO8601')
+    except (TypeError, ValueError):
+        # Formatos no ISO: inferencia genérica como antes
+        return pd.to_datetime(values)
+
+
+def read_upload(source, sep: str = ',', encoding: str = 'utf-8', usecols=None, dtypes: dict = None,
+                time_column: str = None):
+    """Lee un CSV subido con el motor de pyarrow y tipos explícitos
+
+    Solo se leen las columnas de `usecols` (todas si es None) con los tipos de
+    `dtypes`; el resto conserva los tipos inferidos (sin compactar: son
+    entradas de los modelos). Arrow reconoce las fechas
+    ISO-8601 al leer; si no lo ha hecho, `time_column` se parsea con el camino
+    rápido ISO-8601. Si pyarrow no está o no puede leer el fichero se usa el
+    motor C de pandas.
+    """
+    dtypes = dict(dtypes or {})
+    options = dict(sep=sep, encoding=encoding, usecols=usecols, dtype=dtypes or None)
+    df = None
+    if importlib.util.find_spec('pyarrow') is not None and encoding.lower() in _PYARROW_ENCODINGS and len(sep) == 1:
+        try:
+            df = pd.read_csv(_rewind(source), engine='pyarrow', **options)
+        except (ValueError, TypeError, pd.errors.ParserError, io.UnsupportedOperation):
+            df = None
+        except Exception as exc:
+            # Errores de parseo propios de Arrow (ArrowInvalid): se reintenta con el motor C
+            if type(exc).__module__.split('.')[0] != 'pyarrow':
+                raise
+            df = None
+    if df is None:
+        df = pd.read_csv(_rewind(source), **options)
+    _rewind(source)
+
+    if usecols is not None:
+        # El motor de pyarrow no garantiza el orden de usecols
+        df = df[[name for name in usecols if name in df.columns]]
+    if time_column is not None and time_column in df.columns:
+        df[time_column] = parse_timestamps(df[time_column])
+    return apply_schema(df, dtypes)
+
+
+def upload_digest(uploaded_file):
+    """Hash del contenido del fichero subido (se calcula una vez por fichero y sesión)"""
+    digests = st.session_state.setdefault('upload_digests', {})
+    file_id = getattr(uploaded_file, 'file_id', None)
+    if file_id is None or file_id not in digests:
+        digest = hashlib.blake2b(uploaded_file.getvalue(), digest_size=16).hexdigest()
+        if file_id is None:
+            return digest
+        digests[file_id] = digest
+    return digests[file_id]
+
+
+def file_version(*paths):
+    """Versión de unos ficheros de modelo a partir de su tamaño y fecha de modificación"""
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{path}:missing")
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+
+
+@st.cache_resource
+def get_upload_cache():
+    """Caché LRU de lotes parseados y predicciones, por hash de contenido"""
+    return LRUCache(UPLOAD_CACHE_MAX_ENTRIES, UPLOAD_CACHE_MAX_BYTES)
+
+
+def remember_frame(key: tuple, df: pd.DataFrame):
+    """Guarda un DataFrame en la caché de subidas (y en disco si está activa)"""
+    get_upload_cache().put(key, df, int(df.memory_usage(index=True, deep=True).sum()))
+    disk = get_disk_cache()
+    if disk is not None:
+        disk.put(cache_key('upload', *key), df)
+    return df
+
+
+def recall_frame(key: tuple):
+    """DataFrame guardado con remember_frame, de memoria o de disco; None si no está"""
+    df = get_upload_cache().get(key)
+    disk = get_disk_cache()
+    if df is None and disk is not None:
+        df = disk.get(cache_key('upload', *key))
+        if df is not None:
+            get_upload_cache().put(key, df, int(df.memory_usage(index=True, deep=True).sum()))
+    return df
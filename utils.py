@@ -1,23 +1,163 @@
+import os
+import threading
+from collections import OrderedDict
+
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
+
+from data_store import DEFAULT_DATA_PATH, INDEXED_COLUMNS, frame_view, get_store
+from downsampling import WINDOW_POINTS, downsample_frame
+from schema import TIME_SLOTS, time_slots
+from duckdb_backend import DuckDBBackend, duckdb_available
+from partitions import get_partitioned_dataset
+from disk_cache import disk_cached
+from cache_stats import tracked_cache_data
+from profiler import profiled
+
+
+
+# Motor de las agregaciones: 'pandas' (por defecto) o 'duckdb' si está instalado
+DATA_BACKEND = os.environ.get('DATA_BACKEND', 'pandas')
+
+# Backends DuckDB abiertos a la vez (uno por versión del dataset)
+SQL_BACKEND_MAX_ENTRIES = 2
+
+# Días distintos que guardan las cachés de las vistas diarias (una entrada por día o rango elegido)
+DAILY_CACHE_MAX_ENTRIES = int(os.environ.get('DAILY_CACHE_MAX_ENTRIES', 64))
+
+# Por encima de este número de puntos los scatter plots pasan a modo densidad
+SCATTER_POINT_THRESHOLD = 5000
+SCATTER_BINS = 40
 
 
-@st.cache_data
-def load_data(path: str = "data/inversor_data_with_heating.csv"):
-    df = pd.read_csv(path)
-    df['Datetime'] = pd.to_datetime(df['Datetime'])
-    return df
+def load_data(path: str = DEFAULT_DATA_PATH):
+    """Vista de solo lectura del dataset compartido (sin copia por sesión)"""
+    return get_store(path).frame
 
 
 # =====================
 # Cached data processors
 # =====================
-@st.cache_data
-def compute_weekly_sources(df: pd.DataFrame):
-    data_stack = df.copy()
-    data_stack['YearWeek'] = data_stack['Datetime'].dt.to_period('W').apply(lambda r: r.start_time)
-    weekly_sources = data_stack.groupby('YearWeek')[['DirectConsumption(W)', 'ExternalEnergySupply(W)', 'BatteryDischarging(W)']].mean().reset_index()
+# El DataFrame se pasa como `_df` para que Streamlit no lo hashee: la clave de
+# caché es (versión del dataset, parámetros), una búsqueda O(1). Las
+# agregaciones de todo el periodo se guardan además en la caché en disco
+# (disk_cache.py), compartida entre réplicas y reinicios.
+def _backend_name():
+    # El motor forma parte de la clave en disco: pandas y DuckDB difieren en el último bit
+    return DATA_BACKEND
+
+
+def _covering_partitions(_df: pd.DataFrame, start=None, end=None):
+    """Particiones configuradas si tienen todas las filas del almacén en [start, end)
+
+    None si no hay particiones, si empiezan después del rango o si van por
+    detrás del almacén (p. ej. filas del modo en vivo aún no escritas en Parquet).
+    """
+    dataset = get_partitioned_dataset()
+    if dataset is None or not len(_df):
+        return None
+    first, last = _df['Datetime'].iloc[0], _df['Datetime'].iloc[-1]
+    if start is not None:
+        first = max(first, pd.Timestamp(start))
+    if end is not None:
+        last = min(last, pd.Timestamp(end) - pd.Timedelta(minutes=15))
+    high_water_mark = dataset.high_water_mark()
+    bounds = dataset.bounds()
+    if high_water_mark is None or high_water_mark < last:
+        return None
+    if pd.Timestamp(year=bounds[0][0], month=bounds[0][1], day=1) > first:
+        return None
+    return dataset
+
+
+def _partition_rows(_df: pd.DataFrame, start, end, columns=None):
+    """Filas de [start, end) leídas de las particiones, o None si no lo cubren
+
+    Se acota a la última fecha del almacén: las particiones pueden ir por
+    delante y las vistas cacheadas por versión no deben mezclar filas nuevas.
+    """
+    partitions = _covering_partitions(_df, start, end)
+    if partitions is None:
+        return None
+    end = min(pd.Timestamp(end), _df['Datetime'].iloc[-1] + pd.Timedelta(1, 'ns'))
+    return partitions.query(start, end, columns)
+
+
+_sql_backends = OrderedDict()
+_sql_backends_lock = threading.Lock()
+
+
+def _sql_backend(_df: pd.DataFrame, version: str):
+    """Backend DuckDB de esta versión del dataset, o None si se usa pandas
+
+    Se crea una vez por versión: sobre las particiones si cubren el almacén
+    (acotadas a su última fecha) y si no sobre el DataFrame, que se pasa a
+    Arrow una sola vez.
+    """
+    if DATA_BACKEND != 'duckdb' or not duckdb_available():
+        return None
+    with _sql_backends_lock:
+        backend = _sql_backends.get(version)
+        if backend is None:
+            partitions = _covering_partitions(_df)
+            if partitions is not None:
+                backend = DuckDBBackend.from_partitions(partitions.root, until=_df['Datetime'].iloc[-1])
+            else:
+                backend = DuckDBBackend.from_frame(_df)
+            _sql_backends[version] = backend
+            while len(_sql_backends) > SQL_BACKEND_MAX_ENTRIES:
+                _sql_backends.popitem(last=False)
+        else:
+            _sql_backends.move_to_end(version)
+        return backend
+
+
+def day_rows(df: pd.DataFrame, selected_date, columns=None):
+    """Filas de un día (con Datetime y `columns`, o todas las columnas)
+
+    Salen de las particiones configuradas si cubren el día (solo se lee ese
+    mes); si no, por búsqueda binaria (el dataset está ordenado por fecha).
+    """
+    start = pd.Timestamp(selected_date)
+    end = start + pd.Timedelta(days=1)
+    rows = _partition_rows(df, start, end, columns)
+    if rows is not None:
+        return rows
+    i, j = np.searchsorted(df['Datetime'].to_numpy(), np.array([start, end], dtype='datetime64[ns]'))
+    rows = df.iloc[i:j]
+    return rows if columns is None else rows[['Datetime', *columns]]
+
+
+@tracked_cache_data(max_entries=DAILY_CACHE_MAX_ENTRIES)
+def compute_range_totals(_store, version: str, start=None, end=None):
+    """(lecturas, totales, medias) de las columnas indexadas en [start, end)
+
+    Un rango acotado que cubren las particiones se lee de ellas (solo sus
+    meses); si no, sale del índice de sumas acumuladas del almacén. En ambos
+    casos las sumas omiten los NaN y las medias dividen entre los no nulos.
+    """
+    if start is not None and end is not None:
+        rows = _partition_rows(_store.frame, start, end, INDEXED_COLUMNS)
+        if rows is not None:
+            values = rows[list(INDEXED_COLUMNS)].astype('float64')
+            totals = {name: float(total) for name, total in values.sum().items()}
+            means = {name: float(mean) for name, mean in values.mean().items()}
+            return len(rows), totals, means
+    prefix_sums = _store.prefix_sums
+    return prefix_sums.count(start, end), prefix_sums.totals(start, end), prefix_sums.means(start, end)
+
+
+def _week_start(df: pd.DataFrame):
+    return df['Datetime'].dt.to_period('W').dt.start_time
+
+
+@tracked_cache_data
+@disk_cached('weekly_sources', context=_backend_name)
+def compute_weekly_sources(_df: pd.DataFrame, version: str):
+    if (backend := _sql_backend(_df, version)) is not None:
+        return backend.weekly_sources()
+    weekly_sources = _df.groupby(_week_start(_df))[['DirectConsumption(W)', 'ExternalEnergySupply(W)', 'BatteryDischarging(W)']].mean().reset_index()
     weekly_sources.columns = ['Fecha', 'Consumo Directo (W)', 'Suministro Externo (W)', 'Descarga Batería (W)']
     stack_data = pd.melt(
         weekly_sources,
@@ -29,9 +169,11 @@ def compute_weekly_sources(df: pd.DataFrame):
     return stack_data
 
 
-@st.cache_data
-def compute_daily_stack(df: pd.DataFrame, selected_date):
-    daily_stack_data = df[df['Datetime'].dt.date == selected_date].copy()
+@tracked_cache_data(max_entries=DAILY_CACHE_MAX_ENTRIES)
+def compute_daily_stack(_df: pd.DataFrame, version: str, selected_date):
+    if (backend := _sql_backend(_df, version)) is not None:
+        return backend.daily_stack(selected_date)
+    daily_stack_data = day_rows(_df, selected_date, ['DirectConsumption(W)', 'ExternalEnergySupply(W)', 'BatteryDischarging(W)'])
     daily_stack_data = daily_stack_data[['Datetime', 'DirectConsumption(W)', 'ExternalEnergySupply(W)', 'BatteryDischarging(W)']].copy()
     daily_stack_data.columns = ['Fecha', 'Consumo Directo (W)', 'Suministro Externo (W)', 'Descarga Batería (W)']
     stack_data = pd.melt(
@@ -44,92 +186,177 @@ def compute_daily_stack(df: pd.DataFrame, selected_date):
     return stack_data
 
 
-@st.cache_data
+@profiled(kind='datos')
 def compute_stack_full(df: pd.DataFrame):
-    stack_data_full = df[['Datetime', 'DirectConsumption(W)', 'ExternalEnergySupply(W)', 'BatteryDischarging(W)']].copy()
-    stack_data_full.columns = ['Fecha', 'Consumo Directo (W)', 'Suministro Externo (W)', 'Descarga Batería (W)']
-    return stack_data_full
+    # Vista renombrada sobre el almacén: no se copia ni se serializa
+    return frame_view(df, {
+        'Datetime': 'Fecha',
+        'DirectConsumption(W)': 'Consumo Directo (W)',
+        'ExternalEnergySupply(W)': 'Suministro Externo (W)',
+        'BatteryDischarging(W)': 'Descarga Batería (W)'
+    })
 
 
-@st.cache_data
-def compute_weekly_consumption(df: pd.DataFrame):
-    data_hist = df.copy()
-    data_hist['YearWeek'] = data_hist['Datetime'].dt.to_period('W').apply(lambda r: r.start_time)
-    weekly_consumption = data_hist.groupby('YearWeek')[['TotalConsumption(W)', 'HeatingSystem(W)']].mean().reset_index()
+@tracked_cache_data
+@disk_cached('weekly_consumption', context=_backend_name)
+def compute_weekly_consumption(_df: pd.DataFrame, version: str):
+    if (backend := _sql_backend(_df, version)) is not None:
+        return backend.weekly_consumption()
+    weekly_consumption = _df.groupby(_week_start(_df))[['TotalConsumption(W)', 'HeatingSystem(W)']].mean().reset_index()
     weekly_consumption.columns = ['Fecha', 'Consumo Total (W)', 'Calefacción (W)']
     return weekly_consumption
 
 
-@st.cache_data
-def compute_daily_consumption(df: pd.DataFrame, selected_date):
-    daily_data = df[df['Datetime'].dt.date == selected_date].copy()
+@tracked_cache_data(max_entries=DAILY_CACHE_MAX_ENTRIES)
+def compute_daily_consumption(_df: pd.DataFrame, version: str, selected_date):
+    if (backend := _sql_backend(_df, version)) is not None:
+        return backend.daily_consumption(selected_date)
+    daily_data = day_rows(_df, selected_date, ['TotalConsumption(W)', 'HeatingSystem(W)'])
     daily_data = daily_data[['Datetime', 'TotalConsumption(W)', 'HeatingSystem(W)']].copy()
     daily_data.columns = ['Fecha', 'Consumo Total (W)', 'Calefacción (W)']
     return daily_data
 
 
-@st.cache_data
+@profiled(kind='datos')
 def compute_consumption_full(df: pd.DataFrame):
-    consumption_data_full = df[['Datetime', 'TotalConsumption(W)', 'HeatingSystem(W)']].copy()
-    consumption_data_full.columns = ['Fecha', 'Consumo Total (W)', 'Calefacción (W)']
-    return consumption_data_full
+    return frame_view(df, {
+        'Datetime': 'Fecha',
+        'TotalConsumption(W)': 'Consumo Total (W)',
+        'HeatingSystem(W)': 'Calefacción (W)'
+    })
 
 
-@st.cache_data
-def compute_scatter_data(df: pd.DataFrame):
-    scatter_data = df[['Datetime', 'TotalConsumption(W)', 'HeatingSystem(W)', 'temperature', 'radiation']].copy()
-    scatter_data.columns = ['Datetime', 'Consumo Total (W)', 'Calefacción (W)', 'Temperatura (°C)', 'Radiación (W/m²)']
+@tracked_cache_data
+@disk_cached('weekly_weather', context=_backend_name)
+def compute_weekly_weather(_df: pd.DataFrame, version: str):
+    if (backend := _sql_backend(_df, version)) is not None:
+        return backend.weekly_weather()
+    weekly_weather = _df.groupby(_week_start(_df))[['temperature', 'precipitation', 'radiation']].mean().reset_index()
+    weekly_weather.columns = ['Fecha', 'temperature', 'precipitation', 'radiation']
+    return weekly_weather
+
+
+@tracked_cache_data
+@disk_cached('daily_means', context=_backend_name)
+def compute_daily_means(_df: pd.DataFrame, version: str, columns: tuple):
+    """Medias diarias de las columnas indicadas (vistas de todo el periodo)"""
+    if (backend := _sql_backend(_df, version)) is not None:
+        return backend.daily_means(columns)
+    daily_means = _df.groupby(_df['Datetime'].dt.floor('D'))[list(columns)].mean().reset_index()
+    daily_means.columns = ['Fecha'] + list(columns)
+    return daily_means
+
+
+@tracked_cache_data(max_entries=DAILY_CACHE_MAX_ENTRIES)
+def compute_daily_weather(_df: pd.DataFrame, version: str, selected_date):
+    """Temperatura, precipitación y radiación de un día (vista diaria de Weather)"""
+    return day_rows(_df, selected_date, ['temperature', 'precipitation', 'radiation']).reset_index(drop=True)
+
+
+@tracked_cache_data(max_entries=64)
+@disk_cached('downsampled', context=_backend_name)
+def compute_downsampled(_df: pd.DataFrame, version: str, columns: tuple, start=None, end=None):
+    """Serie de 15 minutos reducida para gráficos: detalle en [start, end) y resumen fuera"""
+    return downsample_frame(_df[['Datetime', *columns]], 'Datetime', list(columns), start, end)
 
-    def get_time_slot_inner(hour):
-        if 0 <= hour < 4:
-            return '00:00 - 04:00'
-        elif 4 <= hour < 8:
-            return '04:00 - 08:00'
-        elif 8 <= hour < 12:
-            return '08:00 - 12:00'
-        elif 12 <= hour < 16:
-            return '12:00 - 16:00'
-        elif 16 <= hour < 20:
-            return '16:00 - 20:00'
-        else:
-            return '20:00 - 24:00'
 
-    scatter_data['Franja Horaria'] = scatter_data['Datetime'].dt.hour.apply(get_time_slot_inner)
+def downsampling_message(days: int):
+    """Texto de granularidad para los gráficos con rango inicial"""
+    if days * 96 <= WINDOW_POINTS:
+        return f"📊 Granularidad: **15 minutos** ({days} días) - Arrastra para desplazarte, cambia el rango para ver detalle en otra zona"
+    return f"📊 Granularidad: **adaptativa** ({days} días, máx. {WINDOW_POINTS:,} puntos por serie, picos conservados) - Reduce el rango para ver 15 minutos"
+
+
+@tracked_cache_data
+@disk_cached('scatter_data', context=_backend_name)
+def compute_scatter_data(_df: pd.DataFrame, version: str):
+    scatter_data = _df[['Datetime', 'TotalConsumption(W)', 'HeatingSystem(W)', 'temperature', 'radiation']].copy()
+    scatter_data.columns = ['Datetime', 'Consumo Total (W)', 'Calefacción (W)', 'Temperatura (°C)', 'Radiación (W/m²)']
+
+    scatter_data['Franja Horaria'] = time_slots(scatter_data['Datetime'])
     return scatter_data
 
 
-@st.cache_data
-def compute_pv_data(df: pd.DataFrame):
-    pv_data = df[df['radiation'] > 0][['Datetime', 'PV_PowerGeneration(W)', 'temperature', 'radiation']].copy()
+@tracked_cache_data
+@disk_cached('pv_data', context=_backend_name)
+def compute_pv_data(_df: pd.DataFrame, version: str):
+    pv_data = _df[_df['radiation'] > 0][['Datetime', 'PV_PowerGeneration(W)', 'temperature', 'radiation']].copy()
     pv_data.columns = ['Datetime', 'Generación PV (W)', 'Temperatura (°C)', 'Radiación (W/m²)']
 
-    def get_time_slot_inner(hour):
-        if 0 <= hour < 4:
-            return '00:00 - 04:00'
-        elif 4 <= hour < 8:
-            return '04:00 - 08:00'
-        elif 8 <= hour < 12:
-            return '08:00 - 12:00'
-        elif 12 <= hour < 16:
-            return '12:00 - 16:00'
-        elif 16 <= hour < 20:
-            return '16:00 - 20:00'
-        else:
-            return '20:00 - 24:00'
-
-    pv_data['Franja Horaria'] = pv_data['Datetime'].dt.hour.apply(get_time_slot_inner)
+    pv_data['Franja Horaria'] = time_slots(pv_data['Datetime'])
     return pv_data
 
 
-@st.cache_data
-def create_sankey_diagram(df):
-    """Crea un diagrama Sankey mostrando las fuentes de consumo total"""
+@tracked_cache_data
+def compute_month_counts(_df: pd.DataFrame, version: str, source: str):
+    """Puntos por mes del año de los scatter de `source` ('consumo' o 'pv')"""
+    points = compute_pv_data(_df, version) if source == 'pv' else compute_scatter_data(_df, version)
+    return {int(month): int(count) for month, count in points['Datetime'].dt.month.value_counts().items()}
+
+
+def month_rows(points: pd.DataFrame, month: int):
+    """Filas de un mes del año (vista filtrada, sin copia: nadie la modifica)"""
+    return points[points['Datetime'].dt.month == month]
+
+
+@tracked_cache_data(max_entries=128)
+@disk_cached('scatter_bins', context=_backend_name)
+def compute_scatter_bins(_df: pd.DataFrame, version: str, source: str, period, x_col: str, y_col: str,
+                         bins: int = SCATTER_BINS):
+    """Conteo de puntos por celda (x × y) y franja horaria para scatters densos
+
+    El resultado tiene como máximo bins × bins × 6 filas, independientemente
+    del número de puntos de entrada.
+    """
+    x = _df[x_col].to_numpy(dtype='float64')
+    y = _df[y_col].to_numpy(dtype='float64')
+    slot_codes = _df['Franja Horaria'].cat.codes.to_numpy()
+    valid = ~(np.isnan(x) | np.isnan(y)) & (slot_codes >= 0)
+    x, y, slot_codes = x[valid], y[valid], slot_codes[valid]
+
+    if len(x) == 0:
+        return pd.DataFrame({x_col: [], y_col: [], 'Franja Horaria': [], 'Puntos': []})
+
+    def cell_index(values):
+        low, high = values.min(), values.max()
+        if high <= low:
+            return np.zeros(len(values), dtype='int64'), np.full(bins, low)
+        edges = np.linspace(low, high, bins + 1)
+        index = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, bins - 1)
+        return index, (edges[:-1] + edges[1:]) / 2
+
+    x_index, x_centers = cell_index(x)
+    y_index, y_centers = cell_index(y)
+
+    keys = (slot_codes.astype('int64') * bins + x_index) * bins + y_index
+    counts = np.bincount(keys, minlength=len(TIME_SLOTS) * bins * bins)
+    occupied = np.flatnonzero(counts)
+    slot, cell = np.divmod(occupied, bins * bins)
+    x_cell, y_cell = np.divmod(cell, bins)
+
+    return pd.DataFrame({
+        x_col: x_centers[x_cell],
+        y_col: y_centers[y_cell],
+        'Franja Horaria': np.asarray(TIME_SLOTS)[slot],
+        'Puntos': counts[occupied]
+    })
+
+
+@tracked_cache_data(max_entries=DAILY_CACHE_MAX_ENTRIES)
+def create_sankey_diagram(totals: dict):
+    """Crea un diagrama Sankey mostrando las fuentes de consumo total
+
+    `totals` son las sumas por columna del intervalo (ver PrefixSumIndex.totals)
+    """
     
     # Calcular totales
-    total_direct = df['DirectConsumption(W)'].sum() / 1000
-    total_battery = df['BatteryDischarging(W)'].sum() / 1000
-    total_external = df['ExternalEnergySupply(W)'].sum() / 1000
+    total_direct = totals['DirectConsumption(W)'] / 1000
+    total_battery = totals['BatteryDischarging(W)'] / 1000
+    total_external = totals['ExternalEnergySupply(W)'] / 1000
     
+    # Plotly se importa solo al dibujar el diagrama
+    import plotly.graph_objects as go
+
     # Crear Sankey
     fig = go.Figure(data=[go.Sankey(
         node=dict(
@@ -177,17 +404,17 @@ def create_sankey_diagram(df):
     return fig
 
 
-def create_sankey_diagram_heating_system(df):
+def create_sankey_diagram_heating_system(totals: dict):
     """Crea un diagrama Sankey mostrando las fuentes del sistema de calefacción"""
     
     # Calcular el consumo total de calefacción
-    total_heating = df['HeatingSystem(W)'].sum() / 1000
+    total_heating = totals['HeatingSystem(W)'] / 1000
     
     # Calcular totales de cada fuente
-    total_direct = df['DirectConsumption(W)'].sum() / 1000
-    total_battery = df['BatteryDischarging(W)'].sum() / 1000
-    total_external = df['ExternalEnergySupply(W)'].sum() / 1000
-    total_consumption = df['TotalConsumption(W)'].sum() / 1000
+    total_direct = totals['DirectConsumption(W)'] / 1000
+    total_battery = totals['BatteryDischarging(W)'] / 1000
+    total_external = totals['ExternalEnergySupply(W)'] / 1000
+    total_consumption = totals['TotalConsumption(W)'] / 1000
     
     # Calcular proporción de cada fuente destinada a calefacción
     heating_ratio = total_heating / total_consumption if total_consumption > 0 else 0
@@ -196,6 +423,9 @@ def create_sankey_diagram_heating_system(df):
     heating_battery = total_battery * heating_ratio
     heating_external = total_external * heating_ratio
     
+    # Plotly se importa solo al dibujar el diagrama
+    import plotly.graph_objects as go
+
     # Crear Sankey
     fig = go.Figure(data=[go.Sankey(
         node=dict(